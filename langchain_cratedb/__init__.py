@@ -8,6 +8,8 @@ patch_sqlalchemy_dialect()
 from langchain_cratedb.cache import CrateDBCache, CrateDBSemanticCache
 from langchain_cratedb.chat_history import CrateDBChatMessageHistory
 from langchain_cratedb.loaders import CrateDBLoader
+from langchain_cratedb.refresh import RefreshPolicy
+from langchain_cratedb.storage import CrateDBByteStore
 from langchain_cratedb.vectorstores import (
     CrateDBVectorStore,
     CrateDBVectorStoreMultiCollection,
@@ -21,11 +23,13 @@ except metadata.PackageNotFoundError:  # pragma: no cover
 del metadata  # optional, avoids polluting the results of dir(__package__)
 
 __all__ = [
+    "CrateDBByteStore",
     "CrateDBCache",
     "CrateDBChatMessageHistory",
     "CrateDBLoader",
     "CrateDBSemanticCache",
     "CrateDBVectorStore",
     "CrateDBVectorStoreMultiCollection",
+    "RefreshPolicy",
     "__version__",
 ]
@@ -7,8 +7,13 @@ from langchain_core.embeddings import Embeddings
 from langchain_core.load import dumps, loads
 from langchain_core.outputs import Generation
 from sqlalchemy.ext.asyncio import AsyncEngine
-from sqlalchemy_cratedb.support import refresh_after_dml
 
+from langchain_cratedb.refresh import (
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_REFRESH_POLICY,
+    Refresher,
+    RefreshPolicy,
+)
 from langchain_cratedb.vectorstores import CrateDBVectorStore
 from langchain_cratedb.vectorstores.main import DBConnection
 
@@ -20,11 +25,29 @@ class CrateDBCache(SQLAlchemyCache):
     """
 
     def __init__(
-        self, engine: sa.Engine, cache_schema: t.Type[FullLLMCache] = FullLLMCache
+        self,
+        engine: sa.Engine,
+        cache_schema: t.Type[FullLLMCache] = FullLLMCache,
+        refresh_policy: t.Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
     ):
-        refresh_after_dml(engine)
+        self.refresher = Refresher(policy=refresh_policy, interval=refresh_interval)
         super().__init__(engine, cache_schema)
 
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Update based on prompt and llm_string."""
+        super().update(prompt, llm_string, return_val)
+        self._refresh()
+
+    def clear(self, **kwargs: t.Any) -> None:
+        """Clear cache."""
+        super().clear(**kwargs)
+        self._refresh()
+
+    def _refresh(self) -> None:
+        with self.engine.connect() as connection:
+            self.refresher.refresh(connection, self.cache_schema)
+
 
 class CrateDBSemanticCache(BaseCache):
     """
@@ -39,6 +62,8 @@ class CrateDBSemanticCache(BaseCache):
         connection: t.Union[None, DBConnection, sa.Engine, AsyncEngine, str] = None,
         cache_table_prefix: str = "cache_",
         search_threshold: float = 0.2,
+        refresh_policy: t.Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
         **kwargs: t.Any,
     ):
         """Initialize with necessary components.
@@ -49,6 +74,10 @@ class CrateDBSemanticCache(BaseCache):
                 Defaults to "cache_".
             search_threshold (float, optional): The minimum similarity score for
                 a search result to be considered a match. Defaults to 0.2.
+            refresh_policy (RefreshPolicy, optional): When to invoke
+                `REFRESH TABLE` after writing to the cache. Defaults to "immediate".
+            refresh_interval (float, optional): Minimum number of seconds between
+                refreshes, when using the "interval" refresh policy. Defaults to 1.0.
 
         Examples:
             Basic Usage:
@@ -87,6 +116,8 @@ class CrateDBSemanticCache(BaseCache):
         self.connection = connection
         self.cache_table_prefix = cache_table_prefix
         self.search_threshold = search_threshold
+        self.refresh_policy = refresh_policy
+        self.refresh_interval = refresh_interval
 
         # Pass the rest of the kwargs to the connection.
         self.connection_kwargs = kwargs
@@ -104,13 +135,14 @@ class CrateDBSemanticCache(BaseCache):
                 embeddings=self.embedding,
                 connection=self.connection,
                 collection_name=index_name,
+                refresh_policy=self.refresh_policy,
+                refresh_interval=self.refresh_interval,
                 **self.connection_kwargs,
             )
             _embedding = self.embedding.embed_query(text="test")
             vs._init_models(_embedding)
-            vs.create_tables_if_not_exists()
         llm_cache = self._cache_dict[index_name]
-        llm_cache.create_collection()
+        llm_cache._ensure_storage()
         return llm_cache
 
     def lookup(self, prompt: str, llm_string: str) -> t.Optional[RETURN_VAL_TYPE]:
@@ -160,6 +192,7 @@ class CrateDBSemanticCache(BaseCache):
                     collection = vs.get_collection(session)
                     collection.embeddings.clear()
                     session.commit()
+                    vs.refresher.refresh(session, vs.EmbeddingStore, hooked=True)
                 del self._cache_dict[index_name]
         else:
             raise NotImplementedError(
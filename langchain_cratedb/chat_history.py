@@ -9,7 +9,13 @@ from langchain_community.chat_message_histories.sql import (
     SQLChatMessageHistory,
 )
 from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
-from sqlalchemy_cratedb.support import refresh_after_dml, refresh_table
+
+from langchain_cratedb.refresh import (
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_REFRESH_POLICY,
+    Refresher,
+    RefreshPolicy,
+)
 
 
 def create_message_model(table_name, DynamicBase):  # type: ignore
@@ -81,6 +87,8 @@ class CrateDBChatMessageHistory(SQLChatMessageHistory):
         connection: t.Union[None, DBConnection] = None,
         engine_args: t.Optional[t.Dict[str, t.Any]] = None,
         async_mode: t.Optional[bool] = None,  # Use only if connection is a string
+        refresh_policy: t.Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
     ):
         custom_message_converter = custom_message_converter or CrateDBMessageConverter(
             table_name
@@ -106,14 +114,29 @@ class CrateDBChatMessageHistory(SQLChatMessageHistory):
             async_mode=async_mode,
         )
 
-        # Patch dialect to invoke `REFRESH TABLE` after each DML operation.
-        refresh_after_dml(self.session_maker)
+        # Patch dialect to invoke `REFRESH TABLE` after each DML operation,
+        # when using the `immediate` refresh policy.
+        self.refresher = Refresher(policy=refresh_policy, interval=refresh_interval)
+        self.refresher.install(self.session_maker)
+
+    def add_message(self, message: BaseMessage) -> None:
+        """Append the message to the record in the database."""
+        super().add_message(message)
+        self._refresh(hooked=True)
+
+    def add_messages(self, messages: t.Sequence[BaseMessage]) -> None:
+        """Append the messages to the record in the database."""
+        super().add_messages(messages)
+        self._refresh(hooked=True)
 
     def clear(self) -> None:
         """
         Needed for CrateDB to synchronize data because `on_flush` did not catch it.
         """
         outcome = super().clear()
-        with self.session_maker() as session:
-            refresh_table(session, self.sql_model_class)
+        self._refresh()
         return outcome
+
+    def _refresh(self, hooked: bool = False) -> None:
+        with self.session_maker() as session:
+            self.refresher.refresh(session, self.sql_model_class, hooked=hooked)
@@ -15,6 +15,17 @@ def ddl_compiler_visit_create_index(self, create, **kw) -> str:  # type: ignore[
     return "SELECT 1"
 
 
+def ddl_compiler_visit_fulltext_index(self, constraint, **kw) -> str:  # type: ignore[no-untyped-def]
+    """
+    Render a named fulltext index within `CREATE TABLE`, see `FulltextIndex`.
+    """
+    columns = ", ".join(self.preparer.quote(column.name) for column in constraint)
+    return (
+        f"INDEX {self.preparer.quote(constraint.name)} USING FULLTEXT ({columns}) "
+        f"WITH (analyzer = '{constraint.analyzer}')"
+    )
+
+
 def patch_sqlalchemy_dialect() -> None:
     """
     Fixes `AttributeError: 'CrateCompilerSA20' object has no attribute 'visit_on_conflict_do_update'`
@@ -28,6 +39,7 @@ def patch_sqlalchemy_dialect() -> None:
     CrateCompiler.visit_on_conflict_do_update = PGCompiler.visit_on_conflict_do_update
     CrateCompiler._on_conflict_target = PGCompiler._on_conflict_target
     CrateDDLCompiler.visit_create_index = ddl_compiler_visit_create_index
+    CrateDDLCompiler.visit_fulltext_index = ddl_compiler_visit_fulltext_index
 
 
 patch_sqlalchemy_dialect()
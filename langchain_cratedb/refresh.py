@@ -0,0 +1,191 @@
+"""Control when written data is synchronized using `REFRESH TABLE`."""
+
+import enum
+import logging
+import threading
+import time
+import typing as t
+import weakref
+
+import sqlalchemy as sa
+from sqlalchemy_cratedb.support import refresh_after_dml, refresh_table
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshPolicy(str, enum.Enum):
+    """
+    When to invoke `REFRESH TABLE`, to make written data visible to readers.
+
+    CrateDB is eventually consistent: Written records become visible to
+    searches after the next refresh of the table, which happens periodically
+    according to the table's `refresh_interval` setting. Each explicit refresh
+    is carried out on all shards of the table, so refreshing too often creates
+    considerable load on the cluster.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/dql/refresh.html
+    """
+
+    IMMEDIATE = "immediate"
+    """Refresh after each DML operation. Readers will see data immediately."""
+
+    JOB = "job"
+    """Refresh once after each write operation, e.g. `add_texts`."""
+
+    INTERVAL = "interval"
+    """
+    Like `job`, but refresh each table at most once per interval. A refresh
+    skipped within the interval is carried out at its end, in the background.
+    """
+
+    NEVER = "never"
+    """Never refresh explicitly, but rely on the table's `refresh_interval`."""
+
+
+DEFAULT_REFRESH_POLICY = RefreshPolicy.IMMEDIATE
+
+# Minimum number of seconds between two refreshes of the same table,
+# when using the `interval` refresh policy.
+DEFAULT_REFRESH_INTERVAL = 1.0
+
+# Sessions which already have been equipped with DML hooks.
+_hooked_targets: "weakref.WeakSet[t.Any]" = weakref.WeakSet()
+_hooked_lock = threading.Lock()
+
+
+def refresh_after_dml_session(session: t.Any) -> None:
+    """
+    Run `REFRESH TABLE` after each DML operation carried out using the session.
+
+    `refresh_after_dml` only covers ORM flushes of sessions. Statements invoked
+    using `Session.execute`, e.g. `INSERT ... ON CONFLICT`, are covered as well.
+    """
+    refresh_after_dml(session)
+
+    def receive_do_orm_execute(state: sa.orm.ORMExecuteState) -> t.Any:
+        statement = state.statement
+        if not isinstance(statement, (sa.Insert, sa.Update, sa.Delete)):
+            return None
+        if isinstance(statement.table, sa.Join):
+            return None
+        result = state.invoke_statement()
+        refresh_table(state.session, statement.table)
+        return result
+
+    sa.event.listen(session, "do_orm_execute", receive_do_orm_execute)
+
+
+class Refresher:
+    """
+    Invoke `REFRESH TABLE` according to a refresh policy.
+    """
+
+    def __init__(
+        self,
+        policy: t.Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        interval: float = DEFAULT_REFRESH_INTERVAL,
+    ):
+        self.policy = RefreshPolicy(policy)
+        self.interval = interval
+        self._last_refresh: t.Dict[str, float] = {}
+        # Trailing refreshes scheduled for the end of the interval, by table.
+        self._pending: t.Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def install(self, target: t.Any) -> None:
+        """
+        Using the `immediate` policy, refresh tables after each DML operation.
+
+        The target is an SQLAlchemy session, or scoped session. Hooks are not
+        installed on engines, because they would also apply to all other users
+        of the same engine, regardless of their refresh policies.
+
+        Hooks are installed once per session, so calling this repeatedly does
+        not stack up refresh operations.
+        """
+        if isinstance(target, sa.Engine):
+            raise TypeError("DML hooks can only be installed on sessions")
+        if self.policy is not RefreshPolicy.IMMEDIATE:
+            return
+        with _hooked_lock:
+            if target in _hooked_targets:
+                return
+            refresh_after_dml_session(target)
+            _hooked_targets.add(target)
+
+    def refresh(
+        self,
+        connection: t.Union[sa.Connection, sa.orm.Session],
+        target: t.Any,
+        hooked: bool = False,
+    ) -> bool:
+        """
+        Signal that a write operation on the target table has completed,
+        and refresh the table if the policy demands it.
+
+        Args:
+            connection: Connection or session to invoke `REFRESH TABLE` with.
+            target: Table name, table object, or ORM model class.
+            hooked: Whether the operation has been carried out using statements
+                which are already covered by DML hooks installed using `install`.
+
+        Returns:
+            Whether the table has been refreshed.
+        """
+        if self.policy is RefreshPolicy.NEVER:
+            return False
+        if self.policy is RefreshPolicy.IMMEDIATE and hooked:
+            return False
+        if self.policy is RefreshPolicy.INTERVAL:
+            name = getattr(target, "__tablename__", None) or str(target)
+            now = time.monotonic()
+            with self._lock:
+                last = self._last_refresh.get(name)
+                if last is not None and now - last < self.interval:
+                    # Do not leave the last writes of a burst unrefreshed.
+                    if name not in self._pending:
+                        self._schedule(
+                            name, connection, target, last + self.interval - now
+                        )
+                    return False
+                self._last_refresh[name] = now
+                pending = self._pending.pop(name, None)
+            if pending is not None:
+                pending.cancel()
+        refresh_table(connection, target)
+        return True
+
+    def _schedule(
+        self,
+        name: str,
+        connection: t.Union[sa.Connection, sa.orm.Session],
+        target: t.Any,
+        delay: float,
+    ) -> None:
+        """
+        Refresh the table after the delay, using a connection of its own.
+
+        The connection of the write operation is released before, so a new one
+        is acquired from the same engine. Must be called holding the lock.
+        """
+        if isinstance(connection, sa.Connection):
+            engine = connection.engine
+        else:
+            engine = connection.get_bind().engine
+
+        def trailing_refresh() -> None:
+            with self._lock:
+                if self._pending.get(name) is not timer:
+                    return
+                del self._pending[name]
+                self._last_refresh[name] = time.monotonic()
+            try:
+                with engine.connect() as trailing:
+                    refresh_table(trailing, target)
+            except Exception:
+                logger.exception(f"Failed to refresh table {name}")
+
+        timer = threading.Timer(delay, trailing_refresh)
+        timer.daemon = True
+        self._pending[name] = timer
+        timer.start()
@@ -0,0 +1,207 @@
+import base64
+import typing as t
+
+import sqlalchemy as sa
+from langchain_core.stores import ByteStore
+
+from langchain_cratedb.refresh import (
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_REFRESH_POLICY,
+    Refresher,
+    RefreshPolicy,
+)
+from langchain_cratedb.vectorstores.bulk import batched, insert_bulk, upsert_statement
+
+DEFAULT_TABLE_NAME = "langchain_bytestore"
+
+# Number of keys per statement when reading, writing, or deleting values.
+DEFAULT_BATCH_SIZE = 1000
+
+
+def create_key_value_model(table_name, DynamicBase):  # type: ignore
+    """
+    Create a key-value model for a given table name.
+
+    Values are stored base64-encoded, in a text column which is neither indexed
+    nor stored in the column store, so values of arbitrary size can be stored.
+
+    Args:
+        table_name: The name of the table to use.
+        DynamicBase: The base class to use for the model.
+
+    Returns:
+        The model class.
+    """
+
+    # Model is declared inside a function to be able to use a dynamic table name.
+    class KeyValue(DynamicBase):
+        __tablename__ = table_name
+        namespace = sa.Column(sa.String, primary_key=True)
+        key = sa.Column(sa.String, primary_key=True)
+        value = sa.Column(
+            sa.String, nullable=False, crate_index=False, crate_columnstore=False
+        )
+
+    return KeyValue
+
+
+class CrateDBByteStore(ByteStore):
+    """
+    Key-value store for bytes, backed by CrateDB.
+
+    Values are read, written, and deleted in batches, using a single statement
+    per `batch_size` keys. Reading values by key uses primary key lookups, so
+    values are visible immediately after writing them, independently of the
+    refresh policy. Only `yield_keys` depends on refreshed tables.
+
+    It can be used to persist embeddings computed by `CacheBackedEmbeddings`,
+    so they are shared across pipelines and processes.
+
+    Synopsis::
+
+        from langchain_classic.embeddings import CacheBackedEmbeddings
+        from langchain_cratedb import CrateDBByteStore
+
+        store = CrateDBByteStore(connection="crate://crate@localhost/")
+        embeddings = CacheBackedEmbeddings.from_bytes_store(
+            underlying_embeddings, store, namespace=underlying_embeddings.model
+        )
+    """
+
+    def __init__(
+        self,
+        connection: t.Union[sa.Engine, str],
+        *,
+        namespace: str = "default",
+        table_name: str = DEFAULT_TABLE_NAME,
+        engine_args: t.Optional[t.Dict[str, t.Any]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        refresh_policy: t.Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    ):
+        """Initialize the store.
+
+        Args:
+            connection: SQLAlchemy engine or connection string.
+            namespace: Namespace of keys, to share a table between multiple stores.
+            table_name: Name of the table to store values in.
+            engine_args: Additional arguments when creating an engine.
+            batch_size: Number of keys per statement.
+            refresh_policy: When to invoke `REFRESH TABLE` after writing data,
+                see `RefreshPolicy`. (default: immediate)
+            refresh_interval: Minimum number of seconds between refreshes,
+                when using the `interval` refresh policy. (default: 1.0)
+        """
+        if isinstance(connection, str):
+            connection = sa.create_engine(connection, **(engine_args or {}))
+        self.engine = connection
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.model = create_key_value_model(table_name, sa.orm.declarative_base())
+        self.refresher = Refresher(policy=refresh_policy, interval=refresh_interval)
+        self._schema_created = False
+
+    def create_schema(self) -> None:
+        """Create the table, if it does not exist."""
+        self.model.metadata.create_all(self.engine)
+        self._schema_created = True
+
+    def drop(self) -> None:
+        """Drop the table."""
+        self.model.metadata.drop_all(self.engine)
+        self._schema_created = False
+
+    def mget(self, keys: t.Sequence[str]) -> t.List[t.Optional[bytes]]:
+        """Get the values associated with the given keys."""
+        values: t.Dict[str, str] = {}
+        with self.engine.connect() as connection:
+            try:
+                for batch in batched(keys, self.batch_size):
+                    rows = connection.execute(
+                        sa.select(self.model.key, self.model.value)
+                        .where(self.model.namespace == self.namespace)
+                        .where(self.model.key.in_(batch))
+                    )
+                    values.update(rows.tuples())
+            except sa.exc.ProgrammingError as ex:
+                if "RelationUnknown" not in str(ex):
+                    raise
+        return [
+            base64.b64decode(values[key]) if key in values else None for key in keys
+        ]
+
+    def mset(self, key_value_pairs: t.Sequence[t.Tuple[str, bytes]]) -> None:
+        """Set the values for the given keys."""
+        if not key_value_pairs:
+            return
+        if not self._schema_created:
+            self.create_schema()
+        # The last value wins when a key is given multiple times.
+        records = [
+            {
+                "namespace": self.namespace,
+                "key": key,
+                "value": base64.b64encode(value).decode("ascii"),
+            }
+            for key, value in dict(key_value_pairs).items()
+        ]
+        statement = upsert_statement(self.model.__table__, update_columns=["value"])
+        with self.engine.connect() as connection:
+            for batch in batched(records, self.batch_size):
+                result = insert_bulk(connection, statement, batch, key="key")
+                if not result.ok:
+                    raise RuntimeError(
+                        f"Failed to store values: {list(result.failed.items())}"
+                    )
+            self.refresher.refresh(connection, self.model)
+
+    def mdelete(self, keys: t.Sequence[str]) -> None:
+        """Delete the given keys and their associated values."""
+        if not keys:
+            return
+        with self.engine.connect() as connection:
+            try:
+                for batch in batched(keys, self.batch_size):
+                    connection.execute(
+                        sa.delete(self.model)
+                        .where(self.model.namespace == self.namespace)
+                        .where(self.model.key.in_(batch))
+                    )
+            except sa.exc.ProgrammingError as ex:
+                if "RelationUnknown" not in str(ex):
+                    raise
+                return
+            self.refresher.refresh(connection, self.model)
+
+    def yield_keys(self, *, prefix: t.Optional[str] = None) -> t.Iterator[str]:
+        """Get an iterator over keys which match the given prefix, in order.
+
+        Keys are fetched in pages of `batch_size` keys. Keys with a common prefix
+        are contiguous in order, so scanning starts at the prefix, and stops at
+        the first key which does not match it.
+        """
+        prefix = prefix or ""
+        last: t.Optional[str] = None
+        while True:
+            query = sa.select(self.model.key).where(
+                self.model.namespace == self.namespace
+            )
+            if last is None:
+                query = query.where(self.model.key >= prefix)
+            else:
+                query = query.where(self.model.key > last)
+            query = query.order_by(self.model.key).limit(self.batch_size)
+            with self.engine.connect() as connection:
+                try:
+                    keys: t.Sequence[str] = connection.execute(query).scalars().all()
+                except sa.exc.ProgrammingError as ex:
+                    if "RelationUnknown" not in str(ex):
+                        raise
+                    return
+            for key in keys:
+                if not key.startswith(prefix):
+                    return
+                yield key
+            if len(keys) < self.batch_size:
+                return
+            last = keys[-1]
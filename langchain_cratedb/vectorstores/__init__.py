@@ -1,7 +1,23 @@
+from .bulk import BatchSizer
+from .hybrid import FusionMethod
+from .ingest import BufferedWriter, IngestJob, ParallelIngester, PipelinedIngester
 from .main import CrateDBVectorStore
 from .multi import CrateDBVectorStoreMultiCollection
+from .pagination import SearchCursor, SearchPage
+from .planner import FilterPlanner
+from .result_cache import SearchResultCache
 
 __all__ = [
+    "BatchSizer",
+    "BufferedWriter",
     "CrateDBVectorStore",
     "CrateDBVectorStoreMultiCollection",
+    "FilterPlanner",
+    "FusionMethod",
+    "IngestJob",
+    "ParallelIngester",
+    "PipelinedIngester",
+    "SearchCursor",
+    "SearchPage",
+    "SearchResultCache",
 ]
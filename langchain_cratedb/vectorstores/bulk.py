@@ -0,0 +1,367 @@
+"""Bulk ingestion for CrateDB vector stores."""
+
+import dataclasses
+import hashlib
+import itertools
+import json
+import logging
+import random
+import re
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+import orjson
+import sqlalchemy as sa
+from crate.client.exceptions import ConnectionError as CrateConnectionError
+from sqlalchemy.dialects.postgresql import insert
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Number of records submitted to CrateDB per bulk request.
+# With 1536-dimensional vectors, one batch weighs about 15 MB of JSON.
+DEFAULT_BULK_SIZE = 500
+
+# Initial payload size of bulk requests, when sizing batches adaptively.
+DEFAULT_BULK_BYTES = 4 * 1024 * 1024
+
+# CrateDB signals a failed record of a bulk operation using this row count.
+# https://cratedb.com/docs/crate/reference/en/latest/interfaces/http.html#bulk-errors
+BULK_ROWCOUNT_ERROR = -2
+
+
+@dataclasses.dataclass
+class BulkResult:
+    """
+    Outcome of a bulk ingestion, reported per record.
+
+    Failed records can be submitted again, without re-sending whole batches.
+    """
+
+    succeeded: List[str] = dataclasses.field(default_factory=list)
+    """Identifiers of records which have been written successfully."""
+
+    failed: Dict[str, Optional[str]] = dataclasses.field(default_factory=dict)
+    """Identifiers of records which failed, mapped to their error messages."""
+
+    @property
+    def ok(self) -> bool:
+        """Whether all records have been written successfully."""
+        return not self.failed
+
+    def extend(self, other: "BulkResult") -> None:
+        """Merge the outcome of another bulk operation into this one."""
+        self.succeeded.extend(other.succeeded)
+        self.failed.update(other.failed)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Split an iterable into lists of `size` items, without materializing it."""
+    if size < 1:
+        raise ValueError(f"Batch size must be a positive number: {size}")
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def content_hash(text: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute a fingerprint of a document's text and metadata.
+
+    Metadata is serialized canonically, so the order of its keys does not matter.
+    """
+    payload = json.dumps(
+        [text, metadata or {}], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def upsert_statement(table: sa.Table, update_columns: Sequence[str]) -> sa.Insert:
+    """
+    Produce an `INSERT ... ON CONFLICT DO UPDATE` statement using bind parameters
+    for all columns of the table, to be used with CrateDB's bulk operations.
+    """
+    stmt = insert(table).values(
+        {column.name: sa.bindparam(column.name) for column in table.columns}
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={name: stmt.excluded[name] for name in update_columns},
+    )
+
+
+def insert_bulk(
+    connection: sa.Connection,
+    statement: sa.Insert,
+    records: Sequence[Dict[str, Any]],
+    key: str = "id",
+) -> BulkResult:
+    """
+    Submit records to CrateDB using its bulk operations interface.
+
+    The statement is compiled once, and the records are submitted as `bulk_args`,
+    using the raw DBAPI cursor. This bypasses SQLAlchemy's ORM, including its
+    type processors, so records must already use wire-compatible values.
+
+    https://cratedb.com/docs/crate/reference/en/latest/interfaces/http.html#bulk-operations
+    """
+    result = BulkResult()
+    if not records:
+        return result
+
+    sql = str(statement.compile(bind=connection))
+    logger.debug(f"Bulk SQL:     {sql}")
+    logger.debug(f"Bulk records: {len(records)}")
+
+    cursor = connection.connection.cursor()
+    try:
+        outcomes = cursor.executemany(sql, records)
+    finally:
+        cursor.close()
+
+    for record, outcome in zip(records, outcomes, strict=True):
+        identifier = record[key]
+        if outcome.get("rowcount") == BULK_ROWCOUNT_ERROR:
+            error = outcome.get("error") or {}
+            result.failed[identifier] = error.get("message")
+        else:
+            result.succeeded.append(identifier)
+    return result
+
+
+# Names of CrateDB exceptions indicating that it is overloaded, reported for whole
+# requests, or per record. Records failing this way are retried in smaller batches.
+PUSHBACK_ERRORS = (
+    "rejectedexecution",
+    "rejected execution",
+    "circuitbreaking",
+)
+
+# HTTP status codes indicating that CrateDB is overloaded, or that a request has
+# been too large. Requests failing this way are retried using smaller batches.
+PUSHBACK_STATUS_CODES = (413, 429, 503)
+
+# Message of exceptions raised by the driver for HTTP errors without details.
+HTTP_ERROR_MESSAGE = re.compile(r"^(\d{3}) (?:Client|Server) Error: ")
+
+
+def is_pushback(error: BaseException) -> bool:
+    """Whether an exception of a bulk request indicates that CrateDB pushes back.
+
+    Exceptions are classified by their HTTP status code, or by the names of
+    CrateDB exceptions in their message. Other digits within messages, e.g.
+    echoed values, are not considered.
+    """
+    if isinstance(error, sa.exc.DBAPIError) and error.orig is not None:
+        error = error.orig
+    message = getattr(error, "message", None) or str(error)
+    match = HTTP_ERROR_MESSAGE.match(message)
+    if match:
+        return int(match.group(1)) in PUSHBACK_STATUS_CODES
+    # The driver reports unavailable servers, e.g. with status 503, this way.
+    if isinstance(error, CrateConnectionError):
+        return "service unavailable" in message.lower()
+    return is_rejected(message)
+
+
+def is_rejected(message: Optional[str]) -> bool:
+    """Whether the error message of a record indicates that CrateDB pushes back."""
+    if not message:
+        return False
+    message = message.lower()
+    return any(marker in message for marker in PUSHBACK_ERRORS)
+
+
+def record_size(record: Dict[str, Any]) -> int:
+    """Estimate the size of a record when serialized to JSON, in bytes."""
+    size = 0
+    for value in record.values():
+        if hasattr(value, "size") and hasattr(value, "dtype"):
+            # NumPy arrays: Up to 9 significant digits per `float32` value,
+            # plus sign, decimal point, exponent, and separator.
+            size += 12 * value.size
+        elif isinstance(value, str):
+            size += len(value) + 2
+        else:
+            size += len(orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+    return size
+
+
+class BatchSizer:
+    """
+    Size bulk requests by payload bytes, adapting to the cluster's responsiveness.
+
+    Batches are formed by the estimated size of their records, rather than by
+    their number, because the right size heavily depends on the dimensionality
+    of vectors, and the size of documents and metadata.
+
+    After each request, the payload size is adjusted towards `target_latency`,
+    between `min_bytes` and `max_bytes`. When CrateDB pushes back, by rejecting
+    requests or records because of overload or excessive size, the payload size
+    is halved, and the affected records are submitted again, after waiting for
+    an exponentially growing delay.
+
+    The same instance can be used by multiple threads, and keeps its state
+    across ingests, so it learns the right payload size once.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial_bytes: int = DEFAULT_BULK_BYTES,
+        min_bytes: int = 256 * 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        target_latency: float = 1.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        """Initialize the batch sizer.
+
+        Args:
+            initial_bytes: Initial payload size per request.
+            min_bytes: Minimum payload size per request.
+            max_bytes: Maximum payload size per request. Keep it well below
+                CrateDB's `http.max_content_length` setting.
+            target_latency: Desired duration of a request, in seconds.
+            max_retries: Number of times to submit records again on pushback.
+            backoff: Initial delay before submitting records again, in seconds.
+            max_backoff: Maximum delay before submitting records again.
+        """
+        if not 0 < min_bytes <= initial_bytes <= max_bytes:
+            raise ValueError("Payload sizes must satisfy 0 < min <= initial <= max")
+        self.batch_bytes = initial_bytes
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.latency: Optional[float] = None
+        """Moving average of request latency, in seconds."""
+        self.requests = 0
+        """Number of submitted requests."""
+        self.rejections = 0
+        """Number of requests which have been rejected, fully or partially."""
+
+        self._lock = threading.Lock()
+
+    def batches(
+        self, records: Iterable[Dict[str, Any]], max_records: Optional[int] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Split records into batches of the current payload size."""
+        batch: List[Dict[str, Any]] = []
+        batch_size = 0
+        for record in records:
+            size = record_size(record)
+            if batch and (
+                batch_size + size > self.batch_bytes
+                or (max_records is not None and len(batch) >= max_records)
+            ):
+                yield batch
+                batch, batch_size = [], 0
+            batch.append(record)
+            batch_size += size
+        if batch:
+            yield batch
+
+    def insert(
+        self,
+        connection: sa.Connection,
+        statement: sa.Insert,
+        records: Iterable[Dict[str, Any]],
+        max_records: Optional[int] = None,
+        key: str = "id",
+    ) -> BulkResult:
+        """Submit records using CrateDB's bulk operations, in adaptive batches."""
+        result = BulkResult()
+        for batch in self.batches(records, max_records=max_records):
+            result.extend(self._submit(connection, statement, batch, key, 0))
+        return result
+
+    def _submit(
+        self,
+        connection: sa.Connection,
+        statement: sa.Insert,
+        batch: List[Dict[str, Any]],
+        key: str,
+        attempt: int,
+    ) -> BulkResult:
+        """Submit a batch, submitting rejected records again using smaller batches."""
+        with self._lock:
+            self.requests += 1
+        start = time.monotonic()
+        try:
+            result = insert_bulk(connection, statement, batch, key=key)
+        except Exception as ex:
+            if not is_pushback(ex) or attempt >= self.max_retries:
+                raise
+            logger.warning(f"Bulk request rejected, retrying: {ex}")
+            rejected = batch
+            result = BulkResult()
+        else:
+            self._measure(sum(map(record_size, batch)), time.monotonic() - start)
+            rejected = [
+                record
+                for record in batch
+                if record[key] in result.failed
+                and is_rejected(result.failed[record[key]])
+            ]
+            if not rejected or attempt >= self.max_retries:
+                return result
+            logger.warning(f"Bulk request rejected {len(rejected)} records, retrying")
+            for record in rejected:
+                del result.failed[record[key]]
+
+        self._reject()
+        time.sleep(self._delay(attempt))
+        for retry in self.batches(rejected):
+            result.extend(self._submit(connection, statement, retry, key, attempt + 1))
+        return result
+
+    def _measure(self, size: int, latency: float) -> None:
+        """Adjust the payload size towards the target latency."""
+        with self._lock:
+            self.latency = (
+                latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+            )
+            # Only adapt based on batches which exhausted the budget.
+            if size < self.batch_bytes / 2:
+                return
+            factor = min(max(self.target_latency / max(latency, 1e-3), 0.5), 1.5)
+            self.batch_bytes = int(
+                min(max(self.batch_bytes * factor, self.min_bytes), self.max_bytes)
+            )
+
+    def _reject(self) -> None:
+        """Halve the payload size."""
+        with self._lock:
+            self.rejections += 1
+            self.batch_bytes = max(self.batch_bytes // 2, self.min_bytes)
+
+    def _delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter."""
+        delay = min(self.backoff * 2**attempt, self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)  # noqa: S311
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Current payload size, and request statistics."""
+        return {
+            "batch_bytes": self.batch_bytes,
+            "latency": self.latency,
+            "requests": self.requests,
+            "rejections": self.rejections,
+        }
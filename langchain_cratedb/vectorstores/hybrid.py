@@ -0,0 +1,80 @@
+"""Fusion of fulltext and vector search results, within a single statement."""
+
+import enum
+import typing as t
+
+import sqlalchemy as sa
+
+# Constant of reciprocal rank fusion, dampening the influence of top ranks.
+DEFAULT_RRF_K = 60
+
+
+class FusionMethod(str, enum.Enum):
+    """
+    How to combine the scores of fulltext and vector search results.
+
+    - `rrf`: Reciprocal rank fusion, summing `weight / (rrf_k + rank)` of
+      each result over both searches. It only considers ranks, so it does
+      not depend on the scales of the scores.
+    - `weighted`: Summing the scores of each result over both searches,
+      after dividing them by the best score of their search. When that is
+      zero, the scores of that search count as zero.
+    """
+
+    RRF = "rrf"
+    WEIGHTED = "weighted"
+
+
+def fuse_hits(
+    vector_hits: sa.Subquery,
+    text_hits: sa.Subquery,
+    k: int,
+    fusion: t.Union[FusionMethod, str] = FusionMethod.RRF,
+    alpha: float = 0.5,
+    rrf_k: int = DEFAULT_RRF_K,
+) -> sa.Select:
+    """
+    Make a statement fusing the hits of a vector search and a fulltext search.
+
+    Both searches are subqueries selecting `id` and `score` columns, ranked
+    by descending score. The statement selects the `k` best records by their
+    fused score, as `id` and `similarity` columns.
+
+    Args:
+        vector_hits: Hits of the vector search.
+        text_hits: Hits of the fulltext search.
+        k: Number of records to select.
+        fusion: How to combine the scores, see `FusionMethod`.
+        alpha: Weight of the vector search, between 0 for fulltext search
+            only, and 1 for vector search only. (default: 0.5)
+        rrf_k: Constant of reciprocal rank fusion. (default: 60)
+    """
+    fusion = FusionMethod(fusion)
+    if not 0 <= alpha <= 1:
+        raise ValueError(f"Weight of vector search must be between 0 and 1: {alpha}")
+
+    def weighted(hits: sa.Subquery, weight: float) -> sa.Select:
+        # Divide using double precision, instead of integer division.
+        if fusion is FusionMethod.RRF:
+            rank = sa.func.row_number().over(order_by=hits.c.score.desc())
+            divisor = sa.type_coerce(rrf_k + rank, sa.Double)
+            score = sa.literal(weight, sa.Double) / divisor
+        else:
+            # Scores of a search whose best score is zero count as zero.
+            best = sa.func.max(hits.c.score, type_=sa.Double).over()
+            score = sa.func.coalesce(
+                sa.literal(weight, sa.Double) * hits.c.score / sa.func.nullif(best, 0),
+                0,
+                type_=sa.Double,
+            )
+        return sa.select(hits.c.id, score.label("score"))
+
+    fused = sa.union_all(
+        weighted(vector_hits, alpha), weighted(text_hits, 1 - alpha)
+    ).subquery("fused")
+    return (
+        sa.select(fused.c.id, sa.func.sum(fused.c.score).label("similarity"))
+        .group_by(fused.c.id)
+        .order_by(sa.desc("similarity"), fused.c.id)
+        .limit(k)
+    )
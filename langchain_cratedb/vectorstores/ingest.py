@@ -0,0 +1,676 @@
+"""Ingestion drivers for CrateDB vector stores."""
+
+import atexit
+import collections
+import itertools
+import json
+import logging
+import multiprocessing.context
+import os
+import threading
+import time
+import typing as t
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from langchain_cratedb.vectorstores.bulk import DEFAULT_BULK_SIZE, BulkResult, batched
+from langchain_cratedb.vectorstores.main import CrateDBVectorStore
+from langchain_cratedb.vectorstores.model import EMBEDDING_TABLE_NAME
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedIngester:
+    """
+    Ingest documents into a `CrateDBVectorStore`, overlapping embedding and writing.
+
+    Documents are consumed in windows of `batch_size` items. While the database
+    write of window N is in flight, the embedding calls for the next windows are
+    already running, so neither the embedding provider nor CrateDB sit idle.
+
+    Each stage runs on its own thread pool, with configurable concurrency.
+    The number of windows in flight per stage is bounded by `queue_size`,
+    so a slow stage exerts backpressure on its upstream stage, and on the
+    consumption of the input iterator.
+
+    Synopsis::
+
+        from langchain_cratedb.vectorstores import PipelinedIngester
+
+        ingester = PipelinedIngester(vector_store, embed_concurrency=4)
+        result = ingester.ingest(documents)
+    """
+
+    def __init__(
+        self,
+        store: CrateDBVectorStore,
+        *,
+        batch_size: int = DEFAULT_BULK_SIZE,
+        embed_concurrency: int = 2,
+        write_concurrency: int = 1,
+        queue_size: t.Optional[int] = None,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            store: The vector store to write to.
+            batch_size: Number of documents per window.
+            embed_concurrency: Number of concurrent embedding calls.
+            write_concurrency: Number of concurrent database writes. Keep this
+                within the connection pool size of the store's engine.
+            queue_size: Maximum number of windows in flight per stage.
+                Defaults to the concurrency of the respective stage, plus one.
+        """
+        if embed_concurrency < 1 or write_concurrency < 1:
+            raise ValueError("Concurrency of pipeline stages must be at least 1")
+        self.store = store
+        self.batch_size = batch_size
+        self.embed_concurrency = embed_concurrency
+        self.write_concurrency = write_concurrency
+        self.queue_size = queue_size
+
+    def ingest(self, documents: t.Iterable[Document]) -> BulkResult:
+        """Embed and write documents, returning the outcome per document."""
+        result = BulkResult()
+        embed_limit = self.queue_size or self.embed_concurrency + 1
+        write_limit = self.queue_size or self.write_concurrency + 1
+        embedding: t.Deque[t.Tuple[t.List[Document], Future]] = collections.deque()
+        writing: t.Deque[Future] = collections.deque()
+        prepared = False
+        completed = False
+
+        def submit_write(window: t.List[Document], embeddings: t.List) -> None:
+            nonlocal prepared
+            if not prepared:
+                self.store._prepare_storage(embeddings[0])
+                prepared = True
+            while len(writing) >= write_limit:
+                result.extend(writing.popleft().result())
+            writing.append(
+                writers.submit(
+                    self.store._write_bulk,
+                    texts=[doc.page_content for doc in window],
+                    embeddings=embeddings,
+                    metadatas=[doc.metadata for doc in window],
+                    ids=[doc.id for doc in window],
+                    batch_size=self.batch_size,
+                    refresh=False,
+                )
+            )
+
+        with (
+            ThreadPoolExecutor(
+                max_workers=self.embed_concurrency, thread_name_prefix="embed"
+            ) as embedders,
+            ThreadPoolExecutor(
+                max_workers=self.write_concurrency, thread_name_prefix="write"
+            ) as writers,
+        ):
+            try:
+                for window in batched(documents, self.batch_size):
+                    while len(embedding) >= embed_limit:
+                        done, future = embedding.popleft()
+                        submit_write(done, future.result())
+                    embedding.append(
+                        (
+                            window,
+                            embedders.submit(
+                                self.store.embedding_function.embed_documents,
+                                [doc.page_content for doc in window],
+                            ),
+                        )
+                    )
+                while embedding:
+                    done, future = embedding.popleft()
+                    submit_write(done, future.result())
+                while writing:
+                    result.extend(writing.popleft().result())
+                completed = True
+            except BaseException:
+                for _, future in embedding:
+                    future.cancel()
+                for future in writing:
+                    future.cancel()
+                raise
+            finally:
+                if prepared:
+                    # Wait for pending writes before refreshing.
+                    writers.shutdown(wait=True)
+                    try:
+                        with self.store._make_sync_session() as session:
+                            self.store._refresh_written(session)
+                    except Exception:
+                        if completed:
+                            raise
+                        # Do not hide the exception which aborted the ingest.
+                        logger.exception("Failed to refresh after aborted ingest")
+
+        logger.info(
+            f"Ingested {len(result.succeeded)} documents, {len(result.failed)} failed"
+        )
+        return result
+
+
+# Vector store instance of a worker process of `ParallelIngester`.
+_worker_store: t.Optional[CrateDBVectorStore] = None
+
+
+def _init_worker(store_factory: t.Callable[[], CrateDBVectorStore]) -> None:
+    """Create the vector store of a worker process."""
+    global _worker_store
+    store = store_factory()
+    # Connections inherited from the parent process must not be shared.
+    if store._engine is not None:
+        store._engine.dispose(close=False)
+    _worker_store = store
+
+
+def _worker_ingest(
+    texts: t.List[str],
+    metadatas: t.List[dict],
+    ids: t.List[str],
+    batch_size: int,
+    bootstrap: bool,
+) -> BulkResult:
+    """Embed and write one window of documents within a worker process."""
+    store = t.cast(CrateDBVectorStore, _worker_store)
+    # Only the bootstrapping window may delete the collection.
+    if not bootstrap:
+        store.pre_delete_collection = False
+    embeddings = store.embedding_function.embed_documents(texts)
+    store._prepare_storage(embeddings[0])
+    store.pre_delete_collection = False
+    return store._write_bulk(
+        texts=texts,
+        embeddings=embeddings,
+        metadatas=metadatas,
+        ids=ids,
+        batch_size=batch_size,
+        refresh=False,
+    )
+
+
+def _worker_refresh() -> None:
+    """Refresh the embedding table, according to the worker's refresh policy."""
+    store = t.cast(CrateDBVectorStore, _worker_store)
+    with store._make_sync_session() as session:
+        store.refresher.refresh(session, EMBEDDING_TABLE_NAME)
+
+
+class ParallelIngester:
+    """
+    Ingest documents into a `CrateDBVectorStore`, using a pool of processes.
+
+    Documents are partitioned into windows of `batch_size` items, which are
+    embedded and written by worker processes, so ingest throughput scales with
+    local CPU cores, and with the number of nodes of the CrateDB cluster.
+
+    Each worker process creates its own vector store, and with it, its own
+    database engine, by invoking `store_factory`. The factory must be picklable,
+    e.g. a module-level function or a `functools.partial` object, and should
+    connect using a connection string rather than an engine object.
+    Workers can not invalidate search results cached within this process, so
+    pass the vector store searching the collection as `store`, when it uses
+    a `result_cache`.
+
+    The first window is processed alone, in order to bootstrap the storage
+    without racing, including `pre_delete_collection`. After that, up to twice
+    as many windows as there are processes are in flight. A failing window does
+    not abort the ingest, but its documents are reported as failed.
+
+    Synopsis::
+
+        import functools
+        from langchain_cratedb.vectorstores import (
+            CrateDBVectorStore,
+            ParallelIngester,
+        )
+
+        store_factory = functools.partial(
+            CrateDBVectorStore,
+            embeddings=OpenAIEmbeddings(),
+            collection_name="foo",
+            connection="crate://crate@localhost/",
+        )
+        ingester = ParallelIngester(store_factory, processes=8)
+        result = ingester.ingest(documents)
+    """
+
+    def __init__(
+        self,
+        store_factory: t.Callable[[], CrateDBVectorStore],
+        *,
+        processes: t.Optional[int] = None,
+        batch_size: int = DEFAULT_BULK_SIZE,
+        mp_context: t.Optional[multiprocessing.context.BaseContext] = None,
+        store: t.Optional[CrateDBVectorStore] = None,
+    ):
+        """Initialize the ingester.
+
+        Args:
+            store_factory: Picklable callable returning a vector store.
+            processes: Number of worker processes.
+                Defaults to the number of CPU cores.
+            batch_size: Number of documents per window.
+            mp_context: Multiprocessing context used to start worker processes.
+                Defaults to the platform's default start method.
+            store: Vector store of this process, whose cached search results
+                are invalidated after ingesting.
+        """
+        if processes is not None and processes < 1:
+            raise ValueError("Number of processes must be at least 1")
+        self.store_factory = store_factory
+        self.processes = processes
+        self.batch_size = batch_size
+        self.mp_context = mp_context
+        self.store = store
+
+    def ingest(self, documents: t.Iterable[Document]) -> BulkResult:
+        """Embed and write documents, returning the outcome per document."""
+        result = BulkResult()
+        pending: t.Deque[t.Tuple[t.List[str], Future]] = collections.deque()
+        bootstrapped = False
+
+        def collect() -> None:
+            ids, future = pending.popleft()
+            try:
+                result.extend(future.result())
+            except BrokenProcessPool:
+                raise
+            except Exception as ex:
+                logger.exception("Failed to ingest documents")
+                result.failed.update(dict.fromkeys(ids, str(ex)))
+
+        processes = self.processes or os.cpu_count() or 1
+        completed = False
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(self.store_factory,),
+        ) as pool:
+            limit = 2 * processes
+            try:
+                for window in batched(documents, self.batch_size):
+                    ids = [doc.id or str(uuid.uuid4()) for doc in window]
+                    future = pool.submit(
+                        _worker_ingest,
+                        texts=[doc.page_content for doc in window],
+                        metadatas=[doc.metadata for doc in window],
+                        ids=ids,
+                        batch_size=self.batch_size,
+                        bootstrap=not bootstrapped,
+                    )
+                    if not bootstrapped:
+                        result.extend(future.result())
+                        bootstrapped = True
+                        continue
+                    pending.append((ids, future))
+                    while len(pending) >= limit:
+                        collect()
+                while pending:
+                    collect()
+                completed = True
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+            finally:
+                if bootstrapped:
+                    try:
+                        pool.submit(_worker_refresh).result()
+                    except Exception:
+                        if completed:
+                            raise
+                        # Do not hide the exception which aborted the ingest.
+                        logger.exception("Failed to refresh after aborted ingest")
+                    if self.store is not None:
+                        self.store._invalidate_results()
+
+        logger.info(
+            f"Ingested {len(result.succeeded)} documents, {len(result.failed)} failed"
+        )
+        return result
+
+
+class IngestJob:
+    """
+    Ingest documents into a `CrateDBVectorStore`, recording progress in a journal,
+    so an interrupted ingest can be resumed.
+
+    The journal is a local JSON Lines file. Its first line identifies the job,
+    and after each window of `batch_size` documents has been written, a line
+    recording the end offset and the outcome of the window is appended, and
+    synced to disk.
+
+    When running a job again using the same journal, documents up to the last
+    recorded offset are skipped, without embedding or writing them again. The
+    input must therefore produce documents in the same order on each run.
+
+    Documents without ids get deterministic ids, derived from the job and their
+    position, so a window which has been written but not recorded before a crash
+    is overwritten instead of being duplicated.
+
+    Synopsis::
+
+        from langchain_cratedb.vectorstores import IngestJob
+
+        job = IngestJob(vector_store, "ingest.jsonl")
+        result = job.run(documents)
+    """
+
+    def __init__(
+        self,
+        store: CrateDBVectorStore,
+        journal: t.Union[str, Path],
+        *,
+        batch_size: int = DEFAULT_BULK_SIZE,
+    ):
+        """Initialize the job.
+
+        Args:
+            store: The vector store to write to.
+            journal: Path to the journal file. It is created when missing.
+            batch_size: Number of documents per window.
+        """
+        self.store = store
+        self.journal = Path(journal)
+        self.batch_size = batch_size
+        self.job_id: t.Optional[uuid.UUID] = None
+        self.offset = 0
+        self.result = BulkResult()
+
+    def run(self, documents: t.Iterable[Document]) -> BulkResult:
+        """Embed and write documents, resuming after the last recorded offset.
+
+        Returns:
+            The outcome per document, including documents of previous runs.
+        """
+        self._load()
+        resuming = self.offset > 0
+        if resuming:
+            logger.info(f"Resuming ingest job {self.job_id} at offset {self.offset}")
+            # Deleting the collection would discard documents of previous runs.
+            self.store.pre_delete_collection = False
+
+        iterator = iter(documents)
+        # Consume skipped documents without materializing them.
+        collections.deque(itertools.islice(iterator, self.offset), maxlen=0)
+
+        prepared = False
+        completed = False
+        try:
+            for window in batched(iterator, self.batch_size):
+                texts = [doc.page_content for doc in window]
+                embeddings = self.store.embedding_function.embed_documents(texts)
+                if not prepared:
+                    self.store._prepare_storage(embeddings[0])
+                    prepared = True
+                result = self.store._write_bulk(
+                    texts=texts,
+                    embeddings=embeddings,
+                    metadatas=[doc.metadata for doc in window],
+                    ids=[
+                        doc.id or self._make_id(self.offset + i)
+                        for i, doc in enumerate(window)
+                    ],
+                    batch_size=self.batch_size,
+                    refresh=False,
+                )
+                self._record(self.offset + len(window), result)
+            completed = True
+        finally:
+            if prepared:
+                try:
+                    with self.store._make_sync_session() as session:
+                        self.store._refresh_written(session)
+                except Exception:
+                    if completed:
+                        raise
+                    # Do not hide the exception which stopped the job.
+                    logger.exception("Failed to refresh after stopped ingest job")
+
+        logger.info(
+            f"Ingest job {self.job_id} completed at offset {self.offset}: "
+            f"{len(self.result.succeeded)} documents, "
+            f"{len(self.result.failed)} failed"
+        )
+        return self.result
+
+    def _make_id(self, position: int) -> str:
+        return str(uuid.uuid5(t.cast(uuid.UUID, self.job_id), str(position)))
+
+    def _load(self) -> None:
+        """
+        Read the journal, or start a new one.
+
+        A trailing line which has only been written partially is discarded.
+        """
+        self.offset = 0
+        self.result = BulkResult()
+        entries = []
+        valid_size = 0
+        if self.journal.exists():
+            with self.journal.open("rb") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+                    valid_size += len(line)
+            if valid_size < self.journal.stat().st_size:
+                logger.warning(f"Discarding incomplete journal entry: {self.journal}")
+                with self.journal.open("r+b") as f:
+                    f.truncate(valid_size)
+
+        if not entries:
+            self.job_id = uuid.uuid4()
+            self._append(
+                {"job": str(self.job_id), "collection": self.store.collection_name}
+            )
+            return
+
+        header, *progress = entries
+        if header.get("collection") != self.store.collection_name:
+            raise ValueError(
+                f"Journal {self.journal} belongs to collection "
+                f"{header.get('collection')}, not {self.store.collection_name}"
+            )
+        self.job_id = uuid.UUID(header["job"])
+        for entry in progress:
+            self.offset = entry["offset"]
+            self.result.extend(
+                BulkResult(succeeded=entry["succeeded"], failed=entry["failed"])
+            )
+
+    def _record(self, offset: int, result: BulkResult) -> None:
+        """Record the outcome of a window which has been written."""
+        self._append(
+            {"offset": offset, "succeeded": result.succeeded, "failed": result.failed}
+        )
+        self.offset = offset
+        self.result.extend(result)
+
+    def _append(self, entry: t.Dict[str, t.Any]) -> None:
+        with self.journal.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class BufferedWriter:
+    """
+    Buffer documents in memory, and write them into a `CrateDBVectorStore` in bulk.
+
+    Many small `add_texts` calls, e.g. from multiple threads, are coalesced into
+    a single embedding call and a single bulk write per flush, followed by a
+    single refresh according to the store's refresh policy.
+
+    Buffered documents are flushed when `max_size` documents are pending, when
+    the oldest pending document has been waiting for `max_delay` seconds, when
+    invoking `flush` explicitly, when leaving the context manager, and at
+    interpreter shutdown. Documents are not visible to searches before they
+    have been flushed.
+
+    Synopsis::
+
+        from langchain_cratedb.vectorstores import BufferedWriter
+
+        with BufferedWriter(vector_store, max_delay=0.5) as writer:
+            writer.add_texts(["foo"])
+    """
+
+    def __init__(
+        self,
+        store: CrateDBVectorStore,
+        *,
+        max_size: int = DEFAULT_BULK_SIZE,
+        max_delay: t.Optional[float] = 1.0,
+    ):
+        """Initialize the writer.
+
+        Args:
+            store: The vector store to write to.
+            max_size: Number of pending documents which triggers a flush.
+            max_delay: Number of seconds after which pending documents are
+                flushed. Use `None` to only flush on size, or explicitly.
+        """
+        if max_size < 1:
+            raise ValueError(f"Buffer size must be a positive number: {max_size}")
+        self.store = store
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.result = BulkResult()
+        """Outcome of all flushes, per document."""
+
+        self._pending: t.List[t.Tuple[str, str, dict]] = []
+        self._pending_since: t.Optional[float] = None
+        self._closed = False
+        self._prepared = False
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: t.Optional[threading.Thread] = None
+        if max_delay is not None:
+            self._thread = threading.Thread(
+                target=self._run, name="cratedb-buffered-writer", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> "BufferedWriter":
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def add_texts(
+        self,
+        texts: t.Iterable[str],
+        metadatas: t.Optional[t.List[dict]] = None,
+        ids: t.Optional[t.Sequence[t.Optional[str]]] = None,
+    ) -> t.List[str]:
+        """Add texts to the buffer.
+
+        Returns:
+            List of ids the texts will be stored with.
+        """
+        texts_ = list(texts)
+        metadatas_ = list(metadatas) if metadatas else [{} for _ in texts_]
+        ids_ = self.store._make_ids(texts_, ids)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Buffered writer has been closed")
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                self._condition.notify()
+            self._pending.extend(zip(ids_, texts_, metadatas_, strict=True))
+            full = len(self._pending) >= self.max_size
+        if full:
+            self.flush()
+        return ids_
+
+    def add_documents(self, documents: t.Iterable[Document]) -> t.List[str]:
+        """Add documents to the buffer.
+
+        Returns:
+            List of ids the documents will be stored with.
+        """
+        documents = list(documents)
+        return self.add_texts(
+            [doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents],
+            ids=[doc.id for doc in documents],
+        )
+
+    def flush(self) -> BulkResult:
+        """Write all pending documents, returning the outcome per document."""
+        result = BulkResult()
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, []
+                self._pending_since = None
+            for window in batched(pending, self.max_size):
+                ids = [id_ for id_, _, _ in window]
+                texts = [text for _, text, _ in window]
+                metadatas = [metadata for _, _, metadata in window]
+                try:
+                    embeddings = self.store.embedding_function.embed_documents(texts)
+                    if not self._prepared:
+                        self.store._prepare_storage(embeddings[0])
+                        self._prepared = True
+                    result.extend(
+                        self.store._write_bulk(
+                            texts=texts,
+                            embeddings=embeddings,
+                            metadatas=metadatas,
+                            ids=ids,
+                            batch_size=self.max_size,
+                            refresh=False,
+                        )
+                    )
+                except Exception as ex:
+                    logger.exception("Failed to write buffered documents")
+                    result.failed.update(dict.fromkeys(ids, str(ex)))
+            if result.succeeded:
+                with self.store._make_sync_session() as session:
+                    self.store._refresh_written(session)
+            self.result.extend(result)
+        if result.failed:
+            logger.warning(f"Failed to write {len(result.failed)} buffered documents")
+        return result
+
+    def close(self) -> None:
+        """Stop accepting documents, and flush pending ones."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        atexit.unregister(self.close)
+        self.flush()
+
+    def _run(self) -> None:
+        """Flush pending documents after `max_delay` seconds, in the background."""
+        delay = t.cast(float, self.max_delay)
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._pending_since is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._pending_since + delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered documents")
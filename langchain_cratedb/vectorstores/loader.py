@@ -0,0 +1,136 @@
+"""Load records into CrateDB using `COPY FROM`."""
+
+import gzip
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import orjson
+import sqlalchemy as sa
+
+from langchain_cratedb.vectorstores.bulk import BulkResult
+
+logger = logging.getLogger(__name__)
+
+# Number of records per staging file. CrateDB imports multiple files in parallel.
+DEFAULT_RECORDS_PER_FILE = 100_000
+
+
+def write_staging_files(
+    directory: Path,
+    prefix: str,
+    records: Iterable[Dict[str, Any]],
+    records_per_file: int = DEFAULT_RECORDS_PER_FILE,
+    key: str = "id",
+) -> Dict[str, List[str]]:
+    """
+    Write records into gzip-compressed JSON Lines files.
+
+    Records are written as they arrive, so only their keys are held in memory.
+    A new file is started after each `records_per_file` records.
+
+    Returns:
+        Mapping of file names to the keys of the records they contain, in order.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    files: Dict[str, List[str]] = {}
+    keys: List[str] = []
+    f: Optional[gzip.GzipFile] = None
+    try:
+        for record in records:
+            if f is None:
+                name = f"{prefix}-{len(files):05d}.json.gz"
+                keys = files[name] = []
+                # Favor throughput over compression ratio.
+                f = gzip.open(directory / name, "wb", compresslevel=1)
+            f.write(
+                orjson.dumps(
+                    record,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE,
+                )
+            )
+            keys.append(record[key])
+            if len(keys) >= records_per_file:
+                f.close()
+                f = None
+    finally:
+        if f is not None:
+            f.close()
+    return files
+
+
+def copy_from(
+    connection: sa.Connection,
+    table: sa.Table,
+    records: Iterable[Dict[str, Any]],
+    staging_dir: Union[str, Path],
+    server_uri: Optional[str] = None,
+    records_per_file: int = DEFAULT_RECORDS_PER_FILE,
+    keep_files: bool = False,
+    key: str = "id",
+) -> BulkResult:
+    """
+    Load records into a table using `COPY FROM`, staging them into files first.
+
+    Records are written into gzip-compressed JSON Lines files within the local
+    directory `staging_dir`, which must be readable by the CrateDB cluster at
+    `server_uri`. By default, `server_uri` is the `file://` URI of the staging
+    directory, which works for single-node clusters on the same host.
+    Records with existing primary keys are overwritten.
+
+    Failing records are identified using the line numbers reported by
+    `RETURN SUMMARY`.
+
+    https://cratedb.com/docs/crate/reference/en/latest/sql/statements/copy-from.html
+    """
+    directory = Path(staging_dir).absolute()
+    if server_uri is None:
+        server_uri = directory.as_uri()
+    prefix = f"langchain-{uuid.uuid4()}"
+
+    result = BulkResult()
+    try:
+        files = write_staging_files(
+            directory, prefix, records, records_per_file=records_per_file, key=key
+        )
+        if not files:
+            return result
+        preparer = connection.dialect.identifier_preparer
+        sql = (
+            f"COPY {preparer.format_table(table)} FROM :uri "
+            f"WITH (format='json', compression='gzip', overwrite_duplicates=true) "
+            f"RETURN SUMMARY"
+        )
+        uri = f"{server_uri.rstrip('/')}/{prefix}-*.json.gz"
+        logger.debug(f"COPY FROM:    {uri}")
+        summary = connection.execute(sa.text(sql), {"uri": uri}).mappings().all()
+    finally:
+        # Also remove files staged before `records` failed.
+        if not keep_files:
+            for path in directory.glob(f"{prefix}-*.json.gz"):
+                path.unlink(missing_ok=True)
+
+    loaded = set()
+    for row in summary:
+        name = str(row["uri"]).rsplit("/", 1)[-1]
+        keys = files.get(name)
+        if keys is None:
+            continue
+        loaded.add(name)
+        failed: Dict[str, Optional[str]] = {}
+        for message, error in (row["errors"] or {}).items():
+            for line_number in error.get("line_numbers") or []:
+                failed[keys[line_number - 1]] = message
+        if len(failed) < (row["error_count"] or 0):
+            logger.warning(
+                f"Unable to identify all failed records of {name}: "
+                f"{row['error_count']} errors, {len(failed)} identified"
+            )
+        result.failed.update(failed)
+        result.succeeded.extend(k for k in keys if k not in failed)
+
+    for name, keys in files.items():
+        if name not in loaded:
+            result.failed.update(dict.fromkeys(keys, f"File not loaded: {name}"))
+    return result
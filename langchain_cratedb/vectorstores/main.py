@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import contextlib
+import math
+import time
+import uuid
+from pathlib import Path
 from typing import (
     Any,
+    AsyncGenerator,
     Callable,
+    ClassVar,
     Dict,
     Generator,
+    Iterable,
+    Iterator,
     List,
     Optional,
     Sequence,
@@ -19,10 +28,12 @@ from typing import (
     cast as typing_cast,
 )
 
+import numpy as np
+import numpy.typing as npt
+import orjson
 import sqlalchemy as sa
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
-from langchain_postgres._utils import maximal_marginal_relevance
 from langchain_postgres.vectorstores import (
     _LANGCHAIN_DEFAULT_COLLECTION_NAME,  # noqa: F401
     LOGICAL_OPERATORS,
@@ -31,9 +42,43 @@ from langchain_postgres.vectorstores import (
     DistanceStrategy,
     PGVector,
 )
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy_cratedb import match
 from sqlalchemy_cratedb.support import refresh_table
 
-from langchain_cratedb.vectorstores.model import ModelFactory
+from langchain_cratedb.refresh import (
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_REFRESH_POLICY,
+    Refresher,
+    RefreshPolicy,
+)
+from langchain_cratedb.vectorstores.bulk import (
+    DEFAULT_BULK_SIZE,
+    BatchSizer,
+    BulkResult,
+    batched,
+    content_hash,
+    insert_bulk,
+    upsert_statement,
+)
+from langchain_cratedb.vectorstores.hybrid import (
+    DEFAULT_RRF_K,
+    FusionMethod,
+    fuse_hits,
+)
+from langchain_cratedb.vectorstores.loader import DEFAULT_RECORDS_PER_FILE, copy_from
+from langchain_cratedb.vectorstores.mmr import maximal_marginal_relevance
+from langchain_cratedb.vectorstores.model import FULLTEXT_INDEX_NAME, ModelFactory
+from langchain_cratedb.vectorstores.pagination import SearchCursor, SearchPage
+from langchain_cratedb.vectorstores.planner import FilterPlanner, SearchPlan
+from langchain_cratedb.vectorstores.rerank import rerank
+from langchain_cratedb.vectorstores.result_cache import SearchResultCache
+from langchain_cratedb.vectorstores.vector import (
+    Vector,
+    Vectors,
+    as_float32,
+)
 
 # CrateDB and Lucene currently only implement
 # similarity based on the Euclidean distance.
@@ -61,6 +106,18 @@ SUPPORTED_OPERATORS = (
 )
 
 
+# Columns which are updated when writing a record with an existing id.
+UPDATE_COLUMNS = ["embedding", "document", "cmetadata", "content_hash"]
+
+# Number of ids or content hashes per lookup query, when skipping unchanged records.
+LOOKUP_SIZE = 1000
+
+# Number of seconds to remember the UUIDs of collections to search in.
+DEFAULT_COLLECTION_CACHE_TTL = 60.0
+
+# Number of records per statement, when yielding documents page by page.
+DEFAULT_PAGE_SIZE = 1000
+
 VST = TypeVar("VST", bound=VectorStore)
 DBConnection = Union[sa.engine.Engine, str]
 
@@ -200,6 +257,10 @@ class CrateDBVectorStore(PGVector):
 
     """  # noqa: E501
 
+    # UUIDs of collections whose storage has been verified to exist,
+    # per database and collection name.
+    _storage_verified: ClassVar[Dict[Tuple[str, str], str]] = {}
+
     @classmethod
     def connection_string_from_db_params(
         cls,
@@ -215,6 +276,93 @@ class CrateDBVectorStore(PGVector):
             raise NotImplementedError("Only sqlalchemy-cratedb driver is supported")
         return f"{driver}://{user}:{password}@{host}:{port}/?schema={database}"
 
+    def __init__(
+        self,
+        *args: Any,
+        refresh_policy: Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        batch_sizer: Optional[BatchSizer] = None,
+        collection_cache_ttl: float = DEFAULT_COLLECTION_CACHE_TTL,
+        result_cache: Optional[SearchResultCache] = None,
+        filter_planner: Optional[FilterPlanner] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize the CrateDB vector store.
+
+        Accepts the same arguments as `PGVector`, and additionally:
+
+        Args:
+            refresh_policy: When to invoke `REFRESH TABLE` after writing data,
+                see `RefreshPolicy`. (default: immediate)
+            refresh_interval: Minimum number of seconds between refreshes,
+                when using the `interval` refresh policy. (default: 1.0)
+            batch_sizer: Size bulk requests by payload bytes, adapting to the
+                cluster's responsiveness, see `BatchSizer`. The `batch_size`
+                arguments of bulk write methods then only cap the number of
+                records per request. (default: None)
+            collection_cache_ttl: Number of seconds to remember the UUIDs of
+                collections to search in, so searches do not need to look them
+                up. Use `0` to look them up on each search. (default: 60.0)
+            result_cache: Remember results of similarity searches, see
+                `SearchResultCache`. Results of this store's collection are
+                invalidated when writing or deleting records. Using the
+                `interval` refresh policy, results are cached for one interval
+                at most, and using the `never` policy, they are not cached.
+                (default: None)
+            filter_planner: Plan searches using metadata filters by their
+                selectivity, so they return complete results, see
+                `FilterPlanner`. (default: None)
+        """
+        self._reject_async(kwargs.get("connection"), kwargs.get("async_mode", False))
+        self._init_options(
+            refresh_policy=refresh_policy,
+            refresh_interval=refresh_interval,
+            batch_sizer=batch_sizer,
+            collection_cache_ttl=collection_cache_ttl,
+            result_cache=result_cache,
+            filter_planner=filter_planner,
+        )
+        super().__init__(*args, **kwargs)
+        # In async mode, `PGVector` defers initialization to the first operation.
+        if self.async_mode:
+            self.__post_init__()
+
+    @staticmethod
+    def _reject_async(connection: Any, async_mode: bool) -> None:
+        """
+        Reject async engines, because sqlalchemy-cratedb only provides a
+        synchronous dialect.
+        """
+        if async_mode or isinstance(connection, AsyncEngine):
+            raise NotImplementedError(
+                "CrateDB vector stores do not support async engines, because "
+                "sqlalchemy-cratedb does not provide an async dialect. "
+                "Please use a synchronous engine or connection string."
+            )
+
+    def _init_options(
+        self,
+        *,
+        refresh_policy: Union[RefreshPolicy, str],
+        refresh_interval: float,
+        batch_sizer: Optional[BatchSizer],
+        collection_cache_ttl: float,
+        result_cache: Optional[SearchResultCache],
+        filter_planner: Optional[FilterPlanner],
+    ) -> None:
+        """
+        Initialize the attributes added by CrateDB, see `__init__`.
+
+        Subclasses which do not invoke `__init__` must invoke it, so they do
+        not lack attributes used by inherited methods.
+        """
+        self.refresher = Refresher(policy=refresh_policy, interval=refresh_interval)
+        self.batch_sizer = batch_sizer
+        self.collection_cache_ttl = collection_cache_ttl
+        self.result_cache = result_cache
+        self.filter_planner = filter_planner
+        self._storage_lock = asyncio.Lock()
+
     def __post_init__(
         self,
     ) -> None:
@@ -228,6 +376,9 @@ class CrateDBVectorStore(PGVector):
         self.CollectionStore = None
         self.EmbeddingStore = None
 
+        # UUIDs of the collections to search in, and when to look them up again.
+        self._collection_cache: Optional[Tuple[List[str], float]] = None
+
     @contextlib.contextmanager
     def _make_sync_session(self) -> Generator[sa.orm.Session, None, None]:
         """Make an async session."""
@@ -237,14 +388,37 @@ class CrateDBVectorStore(PGVector):
                 "Please use the corresponding async method instead."
             )
         with self.session_maker() as session:
-            # Patch dialect to invoke `REFRESH TABLE` after each DML operation.
-            from sqlalchemy_cratedb.support import refresh_after_dml
-
-            refresh_after_dml(session.get_bind())
+            # Invoke `REFRESH TABLE` after each DML operation of this session,
+            # when using the `immediate` refresh policy.
+            self.refresher.install(session)
 
             yield typing_cast(sa.orm.Session, session)
 
-    def _init_models(self, embedding: List[float]) -> None:
+    @contextlib.asynccontextmanager
+    async def _make_async_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Make an async session."""
+        if not self.async_mode:
+            raise ValueError(
+                "Attempting to use an async method in when sync mode is turned on. "
+                "Please use the corresponding async method instead."
+            )
+        async with self.session_maker() as session:
+            # Event hooks are installed on the synchronous session behind it.
+            self.refresher.install(session.sync_session)
+
+            yield typing_cast(AsyncSession, session)
+
+    async def __apost_init__(
+        self,
+    ) -> None:
+        """
+        Initialize the store, invoked lazily by async methods.
+
+        Need to overwrite, because tables can only be created at runtime,
+        see `_aensure_storage`.
+        """
+
+    def _init_models(self, embedding: Vector) -> None:
         """
         With CrateDB, vector dimensionality is obligatory, so create tables at runtime.
 
@@ -277,7 +451,158 @@ class CrateDBVectorStore(PGVector):
             raise RuntimeError("Storage models not initialized")
         with self._make_sync_session() as session:
             self.BaseModel.metadata.create_all(session.get_bind())
+            self._migrate_tables(session.connection(), self.BaseModel.metadata)
+            session.commit()
+
+    async def acreate_tables_if_not_exists(self) -> None:
+        """
+        Need to overwrite because this `Base` is different from parent's `Base`.
+        """
+        if self.BaseModel is None:
+            raise RuntimeError("Storage models not initialized")
+        metadata = self.BaseModel.metadata
+        async with self._make_async_session() as session:
+            connection = await session.connection()
+            await connection.run_sync(metadata.create_all)
+            await connection.run_sync(self._migrate_tables, metadata)
+            await session.commit()
+
+    def _migrate_tables(self, connection: sa.Connection, metadata: sa.MetaData) -> None:
+        """
+        Add columns which have been introduced after the tables have been created.
+
+        Tables created by previous versions are upgraded in place. All columns
+        which can be missing are nullable, so existing records stay valid.
+        """
+        inspector = sa.inspect(connection)
+        preparer = connection.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                self.logger.info(f"Adding column {column.name} to table {table.name}")
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(
+                    sa.text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                    )
+                )
+
+    def drop_tables(self) -> None:
+        """
+        Need to overwrite because this `Base` is different from parent's `Base`.
+        """
+        if self.BaseModel is None:
+            return
+        with self._make_sync_session() as session:
+            self.BaseModel.metadata.drop_all(session.get_bind())
             session.commit()
+        self._invalidate_database_storage()
+
+    async def adrop_tables(self) -> None:
+        """
+        Need to overwrite because this `Base` is different from parent's `Base`.
+        """
+        if self.BaseModel is None:
+            return
+        async with self._make_async_session() as session:
+            connection = await session.connection()
+            await connection.run_sync(self.BaseModel.metadata.drop_all)
+            await session.commit()
+        self._invalidate_database_storage()
+
+    def delete_collection(self) -> None:
+        self.invalidate_storage()
+        super().delete_collection()
+
+    async def adelete_collection(self) -> None:
+        self.invalidate_storage()
+        await super().adelete_collection()
+
+    def invalidate_storage(self) -> None:
+        """
+        Forget that the storage for this collection has been verified to exist.
+
+        Use it when tables or collections have been dropped by other means than
+        this vector store instance, so they will be created again on next write.
+        """
+        self._storage_verified.pop(self._storage_key(), None)
+        self.invalidate_collection_cache()
+        self._invalidate_results()
+
+    def invalidate_collection_cache(self) -> None:
+        """
+        Forget the UUIDs of the collections to search in.
+
+        Use it when collections have been deleted or re-created by other means
+        than this vector store instance, in order not to wait for the cached
+        UUIDs to expire, see `collection_cache_ttl`.
+        """
+        self._collection_cache = None
+
+    def _invalidate_database_storage(self) -> None:
+        """
+        Forget about all storage of this database, after dropping its tables.
+        """
+        database = self._storage_key()[0]
+        for key in list(self._storage_verified):
+            if key[0] == database:
+                del self._storage_verified[key]
+        self.invalidate_collection_cache()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def _result_collections(self) -> List[Tuple[str, str]]:
+        """Return the collections searched in, as keys of the result cache."""
+        return [self._storage_key()]
+
+    def _invalidate_results(self) -> None:
+        """Forget cached search results, after writing into this collection.
+
+        Filter statistics are forgotten as well, as they may have changed.
+        """
+        if self.result_cache is not None:
+            self.result_cache.invalidate(self._result_collections())
+        if self.filter_planner is not None:
+            self.filter_planner.clear()
+
+    def _refresh_written(self, connection: Any, hooked: bool = False) -> None:
+        """Refresh the table after writing, according to the refresh policy.
+
+        Cached search results are forgotten afterwards, as well, because
+        searches may have cached results before the records became visible.
+        """
+        self.refresher.refresh(connection, self.EmbeddingStore, hooked=hooked)
+        self._invalidate_results()
+
+    def _result_ttl(self) -> Optional[float]:
+        """Return the number of seconds to cache search results, if any.
+
+        Using the `interval` refresh policy, written records may only become
+        visible with the next refresh, so results are cached for one interval
+        at most. Using the `never` policy, they are not cached at all.
+        """
+        if self.refresher.policy is RefreshPolicy.INTERVAL:
+            return self.refresher.interval
+        if self.refresher.policy is RefreshPolicy.NEVER:
+            return 0
+        return None
+
+    @classmethod
+    def clear_storage_cache(cls) -> None:
+        """
+        Forget about all storage which has been verified to exist.
+        """
+        cls._storage_verified.clear()
+
+    def _storage_key(self) -> Tuple[str, str]:
+        return self._database_key(), self.collection_name
+
+    def _database_key(self) -> str:
+        engine = self._engine or self._async_engine
+        return str(engine.url) if engine is not None else ""
 
     def delete(
         self,
@@ -295,8 +620,39 @@ class CrateDBVectorStore(PGVector):
         # CrateDB: Calling ``delete`` must not raise an exception
         #          when deleting IDs that do not exist.
         if self.EmbeddingStore is None:
-            return None
-        return super().delete(ids=ids, collection_only=collection_only, **kwargs)
+            return
+        super().delete(ids=ids, collection_only=collection_only, **kwargs)
+        with self._make_sync_session() as session:
+            self.refresher.refresh(session, self.EmbeddingStore, hooked=True)
+        self._invalidate_deleted(collection_only)
+
+    async def adelete(
+        self,
+        ids: Optional[List[str]] = None,
+        collection_only: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """Async delete vectors by ids or uuids.
+
+        Args:
+            ids: List of ids to delete.
+            collection_only: Only delete ids in the collection.
+        """
+        if self.EmbeddingStore is None:
+            return
+        await super().adelete(ids=ids, collection_only=collection_only, **kwargs)
+        async with self._make_async_session() as session:
+            await session.run_sync(self.refresher.refresh, self.EmbeddingStore, True)
+        self._invalidate_deleted(collection_only)
+
+    def _invalidate_deleted(self, collection_only: bool) -> None:
+        """Forget cached search results, after deleting records.
+
+        Without `collection_only`, records are deleted from any collection.
+        """
+        if not collection_only and self.result_cache is not None:
+            self.result_cache.clear()
+        self._invalidate_results()
 
     def _ensure_storage(self) -> None:
         """
@@ -305,9 +661,66 @@ class CrateDBVectorStore(PGVector):
         Tables need to be created at runtime, because the `EmbeddingStore.embedding`
         field, a `FloatVector`, needs to be initialized with a dimensionality
         parameter, which is only obtained at runtime.
+
+        The outcome is remembered per database and collection, together with
+        the UUID of the collection, so subsequent invocations do not need to run
+        any DDL statements or collection lookups, see `_get_collection_id`.
         """
+        key = self._storage_key()
+        if key in self._storage_verified:
+            return
         self.create_tables_if_not_exists()
         self.create_collection()
+        self._storage_verified[key] = self._lookup_collection_id()
+
+    async def _aensure_storage(self) -> None:
+        """
+        Async variant of `_ensure_storage`.
+
+        Concurrent invocations wait for the first one to complete, so the
+        collection is not created multiple times.
+        """
+        key = self._storage_key()
+        if key in self._storage_verified:
+            return
+        async with self._storage_lock:
+            if key in self._storage_verified:
+                return
+            await self.acreate_tables_if_not_exists()
+            await self.acreate_collection()
+            self._storage_verified[key] = await self._alookup_collection_id()
+
+    def create_collection(self) -> None:
+        """
+        Create the collection, unless it exists.
+
+        Collections are looked up by name, which is not a primary key lookup,
+        so it only sees refreshed records. A created collection is therefore
+        refreshed regardless of the refresh policy.
+        """
+        if self.pre_delete_collection:
+            self.delete_collection()
+        with self._make_sync_session() as session:
+            _, created = self.CollectionStore.get_or_create(
+                session, self.collection_name, cmetadata=self.collection_metadata
+            )
+            session.commit()
+            if created:
+                refresh_table(session, self.CollectionStore)
+
+    async def acreate_collection(self) -> None:
+        """
+        Async variant of `create_collection`.
+        """
+        async with self._make_async_session() as session:
+            if self.pre_delete_collection:
+                await self._adelete_collection(session)
+            _, created = await self.CollectionStore.aget_or_create(
+                session, self.collection_name, cmetadata=self.collection_metadata
+            )
+            await session.commit()
+            if created:
+                await session.run_sync(refresh_table, self.CollectionStore)
 
     def get_collection(self, session: sa.orm.Session) -> Any:
         if self.CollectionStore is None:
@@ -322,10 +735,24 @@ class CrateDBVectorStore(PGVector):
             if "RelationUnknown" not in str(ex):
                 raise
 
+    async def aget_collection(self, session: AsyncSession) -> Any:
+        if self.CollectionStore is None:
+            raise RuntimeError(
+                "Collection can't be accessed without specifying "
+                "dimension size of embedding vectors"
+            )
+        try:
+            return await self.CollectionStore.aget_by_name(
+                session, self.collection_name
+            )
+        except sa.exc.ProgrammingError as ex:
+            if "RelationUnknown" not in str(ex):
+                raise
+
     def add_embeddings(
         self,
         texts: Sequence[str],
-        embeddings: List[List[float]],
+        embeddings: Vectors,
         metadatas: Optional[List[dict]] = None,
         ids: Optional[List[str]] = None,
         **kwargs: Any,
@@ -334,128 +761,1401 @@ class CrateDBVectorStore(PGVector):
 
         Args:
             texts: Iterable of strings to add to the vectorstore.
-            embeddings: List of list of embedding vectors.
+            embeddings: List of embedding vectors, or a 2-dimensional NumPy array.
             metadatas: List of metadatas associated with the texts.
             kwargs: vectorstore specific parameters
         """
 
-        if not embeddings:
+        assert not self._async_engine, "This method must be called with sync_mode"  # noqa: S101
+        if len(embeddings) == 0:
             return []
-        self._init_models(embeddings[0])
-
-        # When the user requested to delete the collection before running subsequent
-        # operations on it, run the deletion gracefully if the table does not exist
-        # yet.
-        if self.pre_delete_collection:
-            try:
-                self.delete_collection()
-            # TODO: Q&A: Must not raise an exception when collection does not exist?
-            except sa.exc.ProgrammingError as ex:
-                if "RelationUnknown" not in str(ex):
-                    raise
-
-        # CrateDB: Tables need to be created at runtime.
-        self._ensure_storage()
+        self._prepare_storage(embeddings[0])
 
         # After setting up the table/collection at runtime, add embeddings.
-        embedding_ids = super().add_embeddings(
-            texts=texts, embeddings=embeddings, metadatas=metadatas, ids=ids, **kwargs
-        )
+        # Need to overwrite, in order to also maintain the `content_hash` column.
+        ids_ = self._make_ids(texts, ids)
+        collection_id = self._get_collection_id()
         with self._make_sync_session() as session:
-            refresh_table(session, self.EmbeddingStore)
-        return embedding_ids
-
-    def _results_to_docs_and_scores(self, results: Any) -> List[Tuple[Document, float]]:
-        """Return docs and scores from results."""
-        return [
-            (
-                Document(
-                    id=str(result.EmbeddingStore.id),
-                    page_content=result.EmbeddingStore.document,
-                    metadata=result.EmbeddingStore.cmetadata,
-                ),
-                result.similarity if self.embedding_function is not None else None,
+            data = list(
+                self._make_records(collection_id, texts, embeddings, metadatas, ids_)
             )
-            for result in results
-        ]
+            session.execute(self._make_upsert_statement(data))
+            session.commit()
+            self.refresher.refresh(session, self.EmbeddingStore, hooked=True)
+        self._invalidate_results()
+        return ids_
 
-    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
-        """Get documents by ids."""
-        # ``get_by_ids`` must be implemented and must not
-        # raise an exception when given IDs that do not exist.
-        if self.EmbeddingStore is None:
-            return []
-        return super().get_by_ids(ids)
+    async def aadd_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Vectors,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Async add embeddings to the vectorstore.
 
-    def _select_relevance_score_fn(self) -> Callable[[float], float]:
-        """
-        The 'correct' relevance function
-        may differ depending on a few things, including:
-        - the distance / similarity metric used by the VectorStore
-        - the scale of your embeddings (OpenAI's are unit normed. Many others are not!)
-        - embedding dimensionality
-        - etc.
+        Args:
+            texts: Iterable of strings to add to the vectorstore.
+            embeddings: List of embedding vectors, or a 2-dimensional NumPy array.
+            metadatas: List of metadatas associated with the texts.
+            kwargs: vectorstore specific parameters
         """
-        if self.override_relevance_score_fn is not None:
-            return self.override_relevance_score_fn
-
-        # TODO: Always select EUCLIDEAN, because CrateDB does not provide support for
-        #       the others. Unfortunately, langchain-postgres's default
-        #       `DEFAULT_DISTANCE_STRATEGY = DistanceStrategy.COSINE` can't easily be
-        #       changed.
-        return self._euclidean_relevance_score_fn
+        if len(embeddings) == 0:
+            return []
+        await self._aprepare_storage(embeddings[0])
 
-    @staticmethod
-    def _euclidean_relevance_score_fn(similarity: float) -> float:
-        """Return a similarity score on a scale [0, 1]."""
-        # The 'correct' relevance function
-        # may differ depending on a few things, including:
-        # - the distance / similarity metric used by the VectorStore
-        # - the scale of your embeddings (OpenAI's are unit normed. Many
-        #  others are not!)
-        # - embedding dimensionality
-        # - etc.
-        # This function converts the Euclidean norm of normalized embeddings
-        # (0 is most similar, sqrt(2) most dissimilar)
-        # to a similarity function (0 to 1)
+        ids_ = self._make_ids(texts, ids)
+        collection_id = await self._aget_collection_id()
+        async with self._make_async_session() as session:
+            data = list(
+                self._make_records(collection_id, texts, embeddings, metadatas, ids_)
+            )
+            await session.execute(self._make_upsert_statement(data))
+            await session.commit()
+            await session.run_sync(self.refresher.refresh, self.EmbeddingStore, True)
+        self._invalidate_results()
+        return ids_
+
+    def _make_upsert_statement(self, data: List[Dict[str, Any]]) -> sa.Insert:
+        """Make a statement inserting records, updating records with existing ids."""
+        stmt = insert(self.EmbeddingStore).values(data)
+        return stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={name: stmt.excluded[name] for name in UPDATE_COLUMNS},
+        )
 
-        # CrateDB uses the `vector_similarity()` SQL function in this context,
-        # which already returns a normalized value.
-        # https://cratedb.com/docs/crate/reference/en/latest/general/builtins/scalar-functions.html#vector-similarity-float-vector-float-vector
-        return similarity
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        *,
+        skip_unchanged: bool = False,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Run more texts through the embeddings and add to the vectorstore.
 
-    @staticmethod
-    def _cosine_relevance_score_fn(distance: float) -> float:
-        """
-        Normalize the distance to a score on a scale [0, 1], using Cosine similarity.
-        Not supported by CrateDB.
-        """
-        raise NotImplementedError("CrateDB does not support Cosine similarity")
+        Args:
+            texts: Iterable of strings to add to the vectorstore.
+            metadatas: Optional list of metadatas associated with the texts.
+            ids: Optional list of ids for the texts.
+                 If not provided, will generate a new id for each text.
+            skip_unchanged: Do not embed and write texts which are already stored
+                with the same content and metadata, see `_find_unchanged`.
+            kwargs: vectorstore specific parameters
 
-    @staticmethod
-    def _max_inner_product_relevance_score_fn(distance: float) -> float:
-        """
-        Normalize the distance to a score on a scale [0, 1], using Dot-product.
-        Not supported by CrateDB.
+        Returns:
+            List of ids from adding the texts into the vectorstore.
         """
-        raise NotImplementedError("CrateDB does not support Dot-product similarity")
-
-    ### NEED TO OVERWRITE BECAUSE __query_collection ###
+        if not skip_unchanged:
+            return super().add_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+
+        texts_ = list(texts)
+        metadatas_ = list(metadatas) if metadatas else [{} for _ in texts_]
+        unchanged = self._find_unchanged(texts_, metadatas_, ids)
+        pending = [i for i in range(len(texts_)) if i not in unchanged]
+        ids_ = self._make_ids(texts_, ids)
+        for i, id_ in unchanged.items():
+            ids_[i] = id_
+        if pending:
+            embeddings = self.embedding_function.embed_documents(
+                [texts_[i] for i in pending]
+            )
+            self.add_embeddings(
+                texts=[texts_[i] for i in pending],
+                embeddings=list(embeddings),
+                metadatas=[metadatas_[i] for i in pending],
+                ids=[ids_[i] for i in pending],
+                **kwargs,
+            )
+        return ids_
 
-    def similarity_search_with_score_by_vector(
+    def add_embeddings_bulk(
         self,
-        embedding: List[float],
-        k: int = 4,
-        filter: Optional[dict] = None,  # noqa: A002
-    ) -> List[Tuple[Document, float]]:
-        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
-        results = self.__query_collection(embedding=embedding, k=k, filter=filter)
+        texts: Sequence[str],
+        embeddings: Vectors,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        *,
+        batch_size: int = DEFAULT_BULK_SIZE,
+        **kwargs: Any,
+    ) -> BulkResult:
+        """Add embeddings to the vectorstore, using CrateDB's bulk operations.
 
-        return self._results_to_docs_and_scores(results)
+        Other than `add_embeddings`, this bypasses the ORM, and submits records
+        in batches of `batch_size` items. Failing records do not fail the whole
+        operation, but are reported per record on the returned `BulkResult`,
+        so they can be submitted again.
 
-    def max_marginal_relevance_search_with_score_by_vector(
+        Args:
+            texts: Iterable of strings to add to the vectorstore.
+            embeddings: List of embedding vectors, or a 2-dimensional NumPy array.
+            metadatas: List of metadatas associated with the texts.
+            ids: Optional list of ids for the documents.
+                 If not provided, will generate a new id for each document.
+            batch_size: Number of records submitted per bulk request.
+            kwargs: vectorstore specific parameters
+        """
+        if len(embeddings) == 0:
+            return BulkResult()
+        self._prepare_storage(embeddings[0])
+        return self._write_bulk(
+            texts=texts,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            ids=ids,
+            batch_size=batch_size,
+            refresh=True,
+        )
+
+    def add_embeddings_copy(
+        self,
+        texts: Sequence[str],
+        embeddings: Vectors,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        *,
+        staging_dir: Union[str, Path],
+        server_uri: Optional[str] = None,
+        records_per_file: int = DEFAULT_RECORDS_PER_FILE,
+        keep_files: bool = False,
+        **kwargs: Any,
+    ) -> BulkResult:
+        """Add embeddings to the vectorstore, using CrateDB's `COPY FROM`.
+
+        Suitable for initial loads of large amounts of records. Records are
+        written into gzip-compressed JSON Lines files within `staging_dir`,
+        which are imported by the CrateDB cluster, reading them from
+        `server_uri`. The table is refreshed once afterwards, according to
+        the refresh policy.
+
+        Args:
+            texts: Iterable of strings to add to the vectorstore.
+            embeddings: List of embedding vectors, or a 2-dimensional NumPy array.
+            metadatas: List of metadatas associated with the texts.
+            ids: Optional list of ids for the documents.
+                 If not provided, will generate a new id for each document.
+            staging_dir: Local directory to write the files into.
+            server_uri: URI under which the cluster can read the staging
+                directory. Defaults to its `file://` URI, which works for
+                single-node clusters on the same host.
+            records_per_file: Number of records per file.
+            keep_files: Whether to keep the files after importing them.
+            kwargs: vectorstore specific parameters
+        """
+        if len(embeddings) == 0:
+            return BulkResult()
+        self._prepare_storage(embeddings[0])
+        ids_ = self._make_ids(texts, ids)
+        collection_id = self._get_collection_id()
+        with self._make_sync_session() as session:
+            connection = session.connection()
+            result = copy_from(
+                connection,
+                self.EmbeddingStore.__table__,
+                self._make_records(collection_id, texts, embeddings, metadatas, ids_),
+                staging_dir=staging_dir,
+                server_uri=server_uri,
+                records_per_file=records_per_file,
+                keep_files=keep_files,
+            )
+            self.refresher.refresh(connection, self.EmbeddingStore)
+        self._invalidate_results()
+        return result
+
+    def add_documents_stream(
+        self,
+        documents: Iterable[Document],
+        *,
+        batch_size: int = DEFAULT_BULK_SIZE,
+        skip_unchanged: bool = False,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """Add documents from an arbitrary iterator or generator, yielding their ids.
+
+        Documents are consumed in windows of `batch_size` items, which are embedded
+        and written using CrateDB's bulk operations, before the next window is
+        requested. This way, peak memory usage only depends on the window size,
+        not on the size of the corpus.
+
+        The table is refreshed once, after the stream has been consumed or closed,
+        according to the refresh policy.
+        Nothing is written before iterating the returned generator.
+
+        When documents of a window fail to be written, the ids of the documents
+        of that window which have been written are yielded, before raising a
+        `RuntimeError` listing the failed ones.
+        When the stream is aborted by an error, a failing refresh is only
+        logged, in order not to hide that error.
+
+        Args:
+            documents: Iterable of documents to add to the vectorstore.
+            batch_size: Number of documents to embed and write per window.
+            skip_unchanged: Do not embed and write documents which are already
+                stored with the same content and metadata, see `_find_unchanged`.
+            kwargs: vectorstore specific parameters
+
+        Returns:
+            Iterator of ids of the documents added to the vectorstore.
+        """
+        collection_id: Optional[str] = None
+        completed = False
+        try:
+            for window in batched(documents, batch_size):
+                texts = [doc.page_content for doc in window]
+                metadatas = [doc.metadata for doc in window]
+                doc_ids = [doc.id for doc in window]
+                ids = self._make_ids(texts, doc_ids)
+                unchanged = (
+                    self._find_unchanged(texts, metadatas, doc_ids)
+                    if skip_unchanged
+                    else {}
+                )
+                pending = [i for i in range(len(window)) if i not in unchanged]
+                result = BulkResult()
+                if pending:
+                    embeddings = self.embedding_function.embed_documents(
+                        [texts[i] for i in pending]
+                    )
+                    if collection_id is None:
+                        self._prepare_storage(embeddings[0])
+                        collection_id = self._get_collection_id()
+                    result = self._write_bulk(
+                        texts=[texts[i] for i in pending],
+                        embeddings=embeddings,
+                        metadatas=[metadatas[i] for i in pending],
+                        ids=[ids[i] for i in pending],
+                        batch_size=batch_size,
+                        refresh=False,
+                        collection_id=collection_id,
+                    )
+                # Yield ids of written documents, before reporting failed ones.
+                for i in range(len(window)):
+                    if i in unchanged:
+                        yield unchanged[i]
+                    elif ids[i] not in result.failed:
+                        yield ids[i]
+                if not result.ok:
+                    raise RuntimeError(
+                        f"Failed to write documents: {list(result.failed.items())}"
+                    )
+            completed = True
+        except GeneratorExit:
+            # The consumer closed the stream, which is a normal completion.
+            completed = True
+            raise
+        finally:
+            if collection_id is not None:
+                try:
+                    with self._make_sync_session() as session:
+                        self._refresh_written(session)
+                except Exception:
+                    if completed:
+                        raise
+                    # Do not hide the exception which aborted the stream.
+                    self.logger.exception("Failed to refresh after aborted stream")
+
+    def _write_bulk(
+        self,
+        texts: Sequence[str],
+        embeddings: Vectors,
+        metadatas: Optional[List[dict]],
+        ids: Optional[Sequence[Optional[str]]],
+        batch_size: int,
+        refresh: bool,
+        collection_id: Optional[str] = None,
+    ) -> BulkResult:
+        """
+        Write records using CrateDB's bulk operations, into a prepared storage.
+
+        Pass the `collection_id` when writing repeatedly, so the collection does
+        not need to be looked up on each call, see `_get_collection_id`.
+        """
+        ids_ = self._make_ids(texts, ids)
+        if collection_id is None:
+            collection_id = self._get_collection_id()
+        result = BulkResult()
+        with self._make_sync_session() as session:
+            records = self._make_records(
+                collection_id, texts, embeddings, metadatas, ids_
+            )
+            statement = upsert_statement(
+                self.EmbeddingStore.__table__, update_columns=UPDATE_COLUMNS
+            )
+            connection = session.connection()
+            if self.batch_sizer is not None:
+                result.extend(
+                    self.batch_sizer.insert(
+                        connection, statement, records, max_records=batch_size
+                    )
+                )
+            else:
+                for batch in batched(records, batch_size):
+                    result.extend(insert_bulk(connection, statement, batch))
+            if refresh:
+                self.refresher.refresh(connection, self.EmbeddingStore)
+        # Without refreshing, callers invalidate again, see `_refresh_written`.
+        self._invalidate_results()
+        return result
+
+    def _get_collection_id(self) -> str:
+        """
+        Return the UUID of the collection to write into, from a prepared storage.
+
+        It is remembered by `_ensure_storage`, so it is only looked up when the
+        storage has been invalidated meanwhile.
+        """
+        collection_id = self._storage_verified.get(self._storage_key())
+        if collection_id is None:
+            collection_id = self._lookup_collection_id()
+        return collection_id
+
+    async def _aget_collection_id(self) -> str:
+        """
+        Async variant of `_get_collection_id`.
+        """
+        collection_id = self._storage_verified.get(self._storage_key())
+        if collection_id is None:
+            collection_id = await self._alookup_collection_id()
+        return collection_id
+
+    def _lookup_collection_id(self) -> str:
+        """
+        Look up the UUID of the collection by its name.
+        """
+        with self._make_sync_session() as session:
+            collection = self.get_collection(session)
+            if not collection:
+                raise ValueError("Collection not found")
+            return collection.uuid
+
+    async def _alookup_collection_id(self) -> str:
+        """
+        Async variant of `_lookup_collection_id`.
+        """
+        async with self._make_async_session() as session:
+            collection = await self.aget_collection(session)
+            if not collection:
+                raise ValueError("Collection not found")
+            return collection.uuid
+
+    @staticmethod
+    def _make_ids(
+        texts: Sequence[str], ids: Optional[Sequence[Optional[str]]]
+    ) -> List[str]:
+        """
+        Use the given ids, generating new ones for missing items.
+        """
+        if ids is None:
+            return [str(uuid.uuid4()) for _ in texts]
+        return [id_ if id_ is not None else str(uuid.uuid4()) for id_ in ids]
+
+    @staticmethod
+    def _make_records(
+        collection_id: str,
+        texts: Sequence[str],
+        embeddings: Vectors,
+        metadatas: Optional[List[dict]],
+        ids: List[str],
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Produce records for the embedding table.
+
+        Raises:
+            ValueError: When the numbers of texts, embeddings, metadatas, and ids
+                differ, before producing any record.
+        """
+        if not metadatas:
+            metadatas = [{} for _ in texts]
+        lengths = {
+            "texts": len(texts),
+            "embeddings": len(embeddings),
+            "metadatas": len(metadatas),
+            "ids": len(ids),
+        }
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"Number of items differs: {lengths}")
+        return (
+            {
+                "id": id_,
+                "collection_id": collection_id,
+                "embedding": as_float32(embedding),
+                "document": text,
+                "cmetadata": metadata or {},
+                "content_hash": content_hash(text, metadata),
+            }
+            for text, metadata, embedding, id_ in zip(
+                texts, metadatas, embeddings, ids, strict=True
+            )
+        )
+
+    def _find_unchanged(
+        self,
+        texts: Sequence[str],
+        metadatas: Sequence[Optional[dict]],
+        ids: Optional[Sequence[Optional[str]]] = None,
+    ) -> Dict[int, str]:
+        """
+        Find records which are already stored, by comparing their content hashes.
+
+        A record with an id is unchanged when the stored record with the same id
+        has the same content hash. A record without an id is unchanged when any
+        stored record of the collection has the same content hash.
+
+        Returns:
+            Mapping of positions of unchanged records to ids of stored records.
+        """
+        # When the collection will be deleted anyway, everything must be written.
+        if self.pre_delete_collection:
+            return {}
+
+        # Content hashes can be looked up before the dimensionality of embedding
+        # vectors is known, because the vectors themselves are not needed.
+        models: Any = self if self.EmbeddingStore is not None else ModelFactory()
+        EmbeddingStore, CollectionStore = models.EmbeddingStore, models.CollectionStore
+
+        hashes = [
+            content_hash(text, metadata)
+            for text, metadata in zip(texts, metadatas, strict=True)
+        ]
+        if ids is None:
+            ids = [None] * len(texts)
+        with_id = {i: id_ for i, id_ in enumerate(ids) if id_ is not None}
+        without_id = [i for i, id_ in enumerate(ids) if id_ is None]
+
+        unchanged: Dict[int, str] = {}
+        with self._make_sync_session() as session:
+            try:
+                collection = CollectionStore.get_by_name(session, self.collection_name)
+                if collection is None:
+                    return unchanged
+
+                stored_by_id: Dict[str, Optional[str]] = {}
+                for chunk in batched(set(with_id.values()), LOOKUP_SIZE):
+                    rows = session.execute(
+                        sa.select(EmbeddingStore.id, EmbeddingStore.content_hash)
+                        .where(EmbeddingStore.collection_id == collection.uuid)
+                        .where(EmbeddingStore.id.in_(chunk))
+                    )
+                    stored_by_id.update(rows.tuples())
+
+                stored_by_hash: Dict[str, str] = {}
+                for chunk in batched({hashes[i] for i in without_id}, LOOKUP_SIZE):
+                    rows = session.execute(
+                        sa.select(EmbeddingStore.content_hash, EmbeddingStore.id)
+                        .where(EmbeddingStore.collection_id == collection.uuid)
+                        .where(EmbeddingStore.content_hash.in_(chunk))
+                    )
+                    stored_by_hash.update(rows.tuples())
+
+            # Tables do not exist yet, or have not been migrated yet.
+            except sa.exc.ProgrammingError as ex:
+                if "RelationUnknown" not in str(ex) and "ColumnUnknown" not in str(ex):
+                    raise
+                return unchanged
+
+        for i, id_ in with_id.items():
+            if stored_by_id.get(id_) == hashes[i]:
+                unchanged[i] = id_
+        for i in without_id:
+            if hashes[i] in stored_by_hash:
+                unchanged[i] = stored_by_hash[hashes[i]]
+        return unchanged
+
+    def _prepare_storage(self, embedding: Vector) -> None:
+        """
+        Initialize models and storage before adding embeddings.
+        """
+        self._init_models(embedding)
+
+        # When the user requested to delete the collection before running subsequent
+        # operations on it, run the deletion gracefully if the table does not exist
+        # yet.
+        if self.pre_delete_collection:
+            try:
+                self.delete_collection()
+            # TODO: Q&A: Must not raise an exception when collection does not exist?
+            except sa.exc.ProgrammingError as ex:
+                if "RelationUnknown" not in str(ex):
+                    raise
+
+        # CrateDB: Tables need to be created at runtime.
+        self._ensure_storage()
+
+    async def _aprepare_storage(self, embedding: Vector) -> None:
+        """
+        Async variant of `_prepare_storage`.
+        """
+        self._init_models(embedding)
+        if self.pre_delete_collection:
+            try:
+                await self.adelete_collection()
+            except sa.exc.ProgrammingError as ex:
+                if "RelationUnknown" not in str(ex):
+                    raise
+        await self._aensure_storage()
+
+    def _results_to_docs_and_scores(
+        self, results: Any, include_embeddings: bool = False
+    ) -> List[Tuple[Document, float]]:
+        """Return docs and scores from result rows, see `_search_columns`.
+
+        With `include_embeddings`, embeddings are added to the metadata
+        of the documents, using the `embedding` key.
+        """
+        return [
+            (
+                self._result_to_document(result, include_embeddings),
+                result.similarity if self.embedding_function is not None else None,
+            )
+            for result in results
+        ]
+
+    @staticmethod
+    def _result_to_document(result: Any, include_embeddings: bool = False) -> Document:
+        """Return a document from a result row, see `_search_columns`."""
+        metadata = result.cmetadata
+        if include_embeddings:
+            metadata = {**(metadata or {}), "embedding": result.embedding.tolist()}
+        return Document(
+            id=str(result.id),
+            page_content=result.document,
+            metadata=metadata,
+        )
+
+    def _search_columns(self, include_embeddings: bool = False) -> List[Any]:
+        """
+        Return the columns to select when searching.
+
+        Embeddings make up most of the size of each record, so they are only
+        selected when needed, e.g. for computing the maximal marginal relevance.
+        """
+        columns = [
+            self.EmbeddingStore.id,
+            self.EmbeddingStore.document,
+            self.EmbeddingStore.cmetadata,
+        ]
+        if include_embeddings:
+            columns.append(self.EmbeddingStore.embedding)
+        return columns
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Get documents by ids."""
+        # ``get_by_ids`` must be implemented and must not
+        # raise an exception when given IDs that do not exist.
+        if self.EmbeddingStore is None:
+            return []
+        return super().get_by_ids(ids)
+
+    async def aget_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Async get documents by ids."""
+        if self.EmbeddingStore is None:
+            return []
+        return await super().aget_by_ids(ids)
+
+    def yield_by_ids(
+        self, ids: Iterable[str], /, page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Iterator[Document]:
+        """Get documents by ids, yielding them page by page.
+
+        Ids are consumed lazily, and looked up using one statement per
+        `page_size` ids, so only a single page is held in memory at a time.
+        Like `get_by_ids`, ids which do not exist are skipped.
+        """
+        if self.EmbeddingStore is None:
+            return
+        collection_uuids = self._get_collection_uuids()
+        for batch in batched(ids, page_size):
+            statement = sa.select(*self._search_columns()).where(
+                self.EmbeddingStore.collection_id.in_(collection_uuids),
+                self.EmbeddingStore.id.in_(batch),
+            )
+            with self._make_sync_session() as session:
+                results = session.execute(statement).all()
+            for result in results:
+                yield self._result_to_document(result)
+
+    def yield_documents(
+        self,
+        filter: Optional[dict] = None,  # noqa: A002
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Document]:
+        """Yield all documents of the collections, ordered by id.
+
+        Documents are fetched in pages of `page_size` documents, using keyset
+        pagination on their ids, so each statement only transfers a single
+        page, without skipping over records, e.g. when exporting a collection.
+
+        Args:
+            filter: Filter by metadata. Defaults to None.
+            page_size: Number of documents per statement.
+        """
+        if self.EmbeddingStore is None:
+            return
+        collection_uuids = self._get_collection_uuids()
+        filter_by = [self.EmbeddingStore.collection_id.in_(collection_uuids)]
+        if filter is not None:
+            filter_clause = self._create_filter_clause(filter)
+            if filter_clause is not None:
+                filter_by.append(filter_clause)
+        last_id: Optional[str] = None
+        while True:
+            statement = sa.select(*self._search_columns()).where(*filter_by)
+            if last_id is not None:
+                statement = statement.where(self.EmbeddingStore.id > last_id)
+            statement = statement.order_by(self.EmbeddingStore.id).limit(page_size)
+            with self._make_sync_session() as session:
+                results = session.execute(statement).all()
+            for result in results:
+                yield self._result_to_document(result)
+            if len(results) < page_size:
+                return
+            last_id = results[-1].id
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        """
+        The 'correct' relevance function
+        may differ depending on a few things, including:
+        - the distance / similarity metric used by the VectorStore
+        - the scale of your embeddings (OpenAI's are unit normed. Many others are not!)
+        - embedding dimensionality
+        - etc.
+        """
+        if self.override_relevance_score_fn is not None:
+            return self.override_relevance_score_fn
+
+        # TODO: Always select EUCLIDEAN, because CrateDB does not provide support for
+        #       the others. Unfortunately, langchain-postgres's default
+        #       `DEFAULT_DISTANCE_STRATEGY = DistanceStrategy.COSINE` can't easily be
+        #       changed.
+        return self._euclidean_relevance_score_fn
+
+    @staticmethod
+    def _euclidean_relevance_score_fn(similarity: float) -> float:
+        """Return a similarity score on a scale [0, 1]."""
+        # The 'correct' relevance function
+        # may differ depending on a few things, including:
+        # - the distance / similarity metric used by the VectorStore
+        # - the scale of your embeddings (OpenAI's are unit normed. Many
+        #  others are not!)
+        # - embedding dimensionality
+        # - etc.
+        # This function converts the Euclidean norm of normalized embeddings
+        # (0 is most similar, sqrt(2) most dissimilar)
+        # to a similarity function (0 to 1)
+
+        # CrateDB uses the `vector_similarity()` SQL function in this context,
+        # which already returns a normalized value.
+        # https://cratedb.com/docs/crate/reference/en/latest/general/builtins/scalar-functions.html#vector-similarity-float-vector-float-vector
+        return similarity
+
+    @staticmethod
+    def _cosine_relevance_score_fn(distance: float) -> float:
+        """
+        Normalize the distance to a score on a scale [0, 1], using Cosine similarity.
+        Not supported by CrateDB.
+        """
+        raise NotImplementedError("CrateDB does not support Cosine similarity")
+
+    @staticmethod
+    def _max_inner_product_relevance_score_fn(distance: float) -> float:
+        """
+        Normalize the distance to a score on a scale [0, 1], using Dot-product.
+        Not supported by CrateDB.
+        """
+        raise NotImplementedError("CrateDB does not support Dot-product similarity")
+
+    ### NEED TO OVERWRITE BECAUSE __query_collection ###
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most similar to embedding vector, with scores.
+
+        `KNN_MATCH` is approximate. To improve recall at the expense of latency,
+        use `oversample` to retrieve more candidates than `k`, which are then
+        ranked using exact scores. With the default Euclidean similarity,
+        CrateDB ranks the candidates, otherwise their embeddings are retrieved,
+        and they are re-ranked using NumPy, see `rerank.similarity_scores`.
+
+        Args:
+            embedding: Embedding to look up documents similar to.
+            k: Number of Documents to return. Defaults to 4.
+            filter: Filter by metadata. Defaults to None.
+            include_embeddings: Also retrieve the embeddings of the documents,
+                and add them to their metadata, using the `embedding` key.
+                Defaults to False.
+            oversample: Retrieve `k * oversample` nearest neighbour candidates.
+                Defaults to 1.0.
+            distance_strategy: Re-rank candidates by `cosine` similarity or
+                `inner` product, returning those as scores. Defaults to None,
+                which ranks by Euclidean similarity, like `vector_similarity()`.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        strategy = self._rerank_strategy(distance_strategy)
+        result_cache = self.result_cache
+        if result_cache is not None:
+            key = result_cache.make_key(
+                self._result_collections(),
+                embedding,
+                k,
+                filter,
+                include_embeddings,
+                oversample,
+                strategy,
+            )
+            cached = result_cache.get(key)
+            if cached is not None:
+                return cached
+            generation = result_cache.generation
+        candidates = self._candidate_count(k, oversample)
+        results = self.__query_collection(
+            embedding=embedding,
+            k=candidates,
+            filter=filter,
+            include_embeddings=include_embeddings or strategy is not None,
+            limit=k if strategy is None else candidates,
+        )
+
+        docs_and_scores = self._rerank_results(
+            embedding, results, k, strategy, include_embeddings
+        )
+        if result_cache is not None:
+            result_cache.put(
+                key, docs_and_scores, generation=generation, ttl=self._result_ttl()
+            )
+        return docs_and_scores
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+    ) -> List[Tuple[Document, float]]:
+        strategy = self._rerank_strategy(distance_strategy)
+        result_cache = self.result_cache
+        if result_cache is not None:
+            key = result_cache.make_key(
+                self._result_collections(),
+                embedding,
+                k,
+                filter,
+                include_embeddings,
+                oversample,
+                strategy,
+            )
+            cached = result_cache.get(key)
+            if cached is not None:
+                return cached
+            generation = result_cache.generation
+        candidates = self._candidate_count(k, oversample)
+        results = await self.__aquery_collection(
+            embedding=embedding,
+            k=candidates,
+            filter=filter,
+            include_embeddings=include_embeddings or strategy is not None,
+            limit=k if strategy is None else candidates,
+        )
+
+        docs_and_scores = self._rerank_results(
+            embedding, results, k, strategy, include_embeddings
+        )
+        if result_cache is not None:
+            result_cache.put(
+                key, docs_and_scores, generation=generation, ttl=self._result_ttl()
+            )
+        return docs_and_scores
+
+    # Forward the search options of `similarity_search_with_score_by_vector`.
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most similar to query.
+
+        See `similarity_search_with_score_by_vector` for the search options.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most similar to query, with scores.
+
+        See `similarity_search_with_score_by_vector` for the search options.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+
+    def similarity_search_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most similar to embedding vector.
+
+        See `similarity_search_with_score_by_vector` for the search options.
+        """
+        docs_and_scores = self.similarity_search_with_score_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+        return [doc for doc, _ in docs_and_scores]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Async variant of `similarity_search`."""
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Async variant of `similarity_search_with_score`."""
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+
+    async def asimilarity_search_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        include_embeddings: bool = False,
+        oversample: float = 1.0,
+        distance_strategy: Union[DistanceStrategy, str, None] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Async variant of `similarity_search_by_vector`."""
+        docs_and_scores = await self.asimilarity_search_with_score_by_vector(
+            embedding,
+            k=k,
+            filter=filter,
+            include_embeddings=include_embeddings,
+            oversample=oversample,
+            distance_strategy=distance_strategy,
+        )
+        return [doc for doc, _ in docs_and_scores]
+
+    @staticmethod
+    def _candidate_count(k: int, oversample: float) -> int:
+        """Return the number of nearest neighbour candidates to retrieve."""
+        if oversample < 1:
+            raise ValueError(f"Oversampling factor must be at least 1: {oversample}")
+        return math.ceil(k * oversample)
+
+    @staticmethod
+    def _rerank_strategy(
+        distance_strategy: Union[DistanceStrategy, str, None],
+    ) -> Optional[DistanceStrategy]:
+        """Return the metric to re-rank candidates with, if it is not Euclidean.
+
+        Candidates are already ranked by Euclidean similarity by CrateDB.
+        """
+        if distance_strategy is None:
+            return None
+        strategy = DistanceStrategy(distance_strategy)
+        if strategy is DistanceStrategy.EUCLIDEAN:
+            return None
+        return strategy
+
+    def _rerank_results(
+        self,
+        embedding: Vector,
+        results: Sequence[Any],
+        k: int,
+        strategy: Optional[DistanceStrategy],
+        include_embeddings: bool = False,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs and scores of the `k` best results, re-ranked if needed."""
+        if strategy is None or not results:
+            return self._results_to_docs_and_scores(results, include_embeddings)
+        candidates = self._embedding_matrix(results)
+        ranked = rerank(embedding, candidates, k, strategy)
+        docs_and_scores = self._results_to_docs_and_scores(
+            [results[i] for i, _ in ranked], include_embeddings
+        )
+        return [
+            (document, score)
+            for (document, _), (_, score) in zip(docs_and_scores, ranked, strict=True)
+        ]
+
+    def yield_similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Document]:
+        """Yield docs most similar to query, page by page.
+
+        See `yield_similarity_search_with_score_by_vector`.
+        """
+        assert self.embedding_function is not None, "embedding_function is required"  # noqa: S101
+        embedding = self.embedding_function.embed_query(query)
+        for document, _ in self.yield_similarity_search_with_score_by_vector(
+            embedding, k=k, filter=filter, page_size=page_size
+        ):
+            yield document
+
+    def yield_similarity_search_with_score_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Tuple[Document, float]]:
+        """Yield docs most similar to embedding vector, with scores, page by page.
+
+        Suitable for large values of `k`. Results are fetched in pages of
+        `page_size` results, using keyset pagination on their scores and ids,
+        so each statement only transfers a single page.
+
+        Args:
+            embedding: Embedding to look up documents similar to.
+            k: Total number of Documents to return. Defaults to 4.
+            filter: Filter by metadata. Defaults to None.
+            page_size: Number of Documents per statement.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        self._init_models(embedding)
+        collection_uuids = self._get_collection_uuids()
+        after: Optional[Tuple[float, str]] = None
+        remaining = k
+        while remaining > 0:
+            limit = min(page_size, remaining)
+            statement = self._make_query_statement(
+                collection_uuids, embedding, k, filter, after=after, limit=limit
+            )
+            with self._make_sync_session() as session:
+                results = session.execute(statement).all()
+            yield from self._results_to_docs_and_scores(results)
+            if len(results) < limit:
+                return
+            remaining -= len(results)
+            after = (results[-1].similarity, results[-1].id)
+
+    def similarity_search_page(
+        self,
+        query: str,
+        page_size: int = 4,
+        cursor: Optional[SearchCursor] = None,
+        filter: Optional[dict] = None,  # noqa: A002
+    ) -> SearchPage:
+        """Return a page of docs most similar to query.
+
+        See `similarity_search_page_by_vector`.
+        """
+        assert self.embedding_function is not None, "embedding_function is required"  # noqa: S101
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_page_by_vector(
+            embedding, page_size=page_size, cursor=cursor, filter=filter
+        )
+
+    def similarity_search_page_by_vector(
+        self,
+        embedding: Vector,
+        page_size: int = 4,
+        cursor: Optional[SearchCursor] = None,
+        filter: Optional[dict] = None,  # noqa: A002
+    ) -> SearchPage:
+        """Return a page of docs most similar to embedding vector, with scores.
+
+        Successive pages are retrieved by passing the cursor of the previous
+        page, using the same query and filter. Only the results of the
+        requested page are transferred, continuing after the score and id
+        of the last result of the previous page.
+
+        Synopsis::
+
+            page = vectorstore.similarity_search_page("foo", page_size=10)
+            while page.cursor is not None:
+                page = vectorstore.similarity_search_page(
+                    "foo", page_size=10, cursor=page.cursor
+                )
+
+        Args:
+            embedding: Embedding to look up documents similar to.
+            page_size: Number of Documents per page. Defaults to 4.
+            cursor: Cursor of the previous page, or None for the first page.
+            filter: Filter by metadata. Defaults to None.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        self._init_models(embedding)
+        collection_uuids = self._get_collection_uuids()
+        statement = self._make_page_statement(
+            collection_uuids, embedding, page_size, cursor, filter
+        )
+        with self._make_sync_session() as session:
+            results = session.execute(statement).all()
+        return self._results_to_page(results, page_size, cursor)
+
+    async def asimilarity_search_page_by_vector(
+        self,
+        embedding: Vector,
+        page_size: int = 4,
+        cursor: Optional[SearchCursor] = None,
+        filter: Optional[dict] = None,  # noqa: A002
+    ) -> SearchPage:
+        """Async variant of `similarity_search_page_by_vector`."""
+        self._init_models(embedding)
+        collection_uuids = await self._aget_collection_uuids()
+        statement = self._make_page_statement(
+            collection_uuids, embedding, page_size, cursor, filter
+        )
+        async with self._make_async_session() as session:
+            results = (await session.execute(statement)).all()
+        return self._results_to_page(results, page_size, cursor)
+
+    def _make_page_statement(
+        self,
+        collection_uuids: List[str],
+        embedding: Vector,
+        page_size: int,
+        cursor: Optional[SearchCursor],
+        filter: Optional[dict],  # noqa: A002
+    ) -> sa.Select:
+        """Make a statement querying a page of results, following the cursor.
+
+        `KNN_MATCH` needs to cover the results of all previous pages,
+        in order to find the results of the requested page.
+        """
+        if page_size < 1:
+            raise ValueError(f"Page size must be a positive number: {page_size}")
+        if cursor is None:
+            return self._make_query_statement(
+                collection_uuids, embedding, page_size, filter
+            )
+        return self._make_query_statement(
+            collection_uuids,
+            embedding,
+            cursor.offset + page_size,
+            filter,
+            after=(cursor.score, cursor.id),
+            limit=page_size,
+        )
+
+    def _results_to_page(
+        self,
+        results: Sequence[Any],
+        page_size: int,
+        cursor: Optional[SearchCursor],
+    ) -> SearchPage:
+        """Return a page of docs and scores, with the cursor of the next page."""
+        next_cursor = None
+        if len(results) == page_size:
+            next_cursor = SearchCursor(
+                score=results[-1].similarity,
+                id=str(results[-1].id),
+                offset=(cursor.offset if cursor else 0) + page_size,
+            )
+        return SearchPage(
+            results=self._results_to_docs_and_scores(results),
+            cursor=next_cursor,
+        )
+
+    def hybrid_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most relevant to query, see `hybrid_search_with_score`."""
+        docs_and_scores = self.hybrid_search_with_score(
+            query, k=k, filter=filter, **kwargs
+        )
+        return [doc for doc, _ in docs_and_scores]
+
+    def hybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        fetch_k: int = 20,
+        fusion: Union[FusionMethod, str] = FusionMethod.RRF,
+        alpha: float = 0.5,
+        rrf_k: int = DEFAULT_RRF_K,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most relevant to query, combining fulltext and vector search.
+
+        The `fetch_k` best hits of a fulltext search using `MATCH`, and of a
+        vector search using `KNN_MATCH`, are fused within a single statement,
+        see `hybrid.fuse_hits`. Returned scores are the fused scores.
+
+        The fulltext search uses the fulltext index on the `document` column.
+        Tables created by previous versions do not have it, and need to be
+        re-created, because CrateDB can not add indexes to existing tables.
+        Searching those raises a `ValueError`.
+
+        Args:
+            query: Text to look up documents relevant to.
+            k: Number of Documents to return. Defaults to 4.
+            filter: Filter by metadata. Defaults to None.
+            fetch_k: Number of hits of each search to fuse. Defaults to 20.
+            fusion: How to combine the scores of both searches, `rrf` or
+                `weighted`, see `FusionMethod`. Defaults to `rrf`.
+            alpha: Weight of the vector search, between 0 for fulltext search
+                only, and 1 for vector search only. Defaults to 0.5.
+            rrf_k: Constant of reciprocal rank fusion. Defaults to 60.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        assert self.embedding_function is not None, "embedding_function is required"  # noqa: S101
+        embedding = self.embedding_function.embed_query(query)
+        self._init_models(embedding)
+        collection_uuids = self._get_collection_uuids()
+        statement = self._make_hybrid_statement(
+            collection_uuids, query, embedding, k, fetch_k, filter, fusion, alpha, rrf_k
+        )
+        with self._make_sync_session() as session, self._fulltext_index_required():
+            results = session.execute(statement).all()
+        return self._results_to_docs_and_scores(results)
+
+    async def ahybrid_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most relevant to query, see `hybrid_search_with_score`."""
+        docs_and_scores = await self.ahybrid_search_with_score(
+            query, k=k, filter=filter, **kwargs
+        )
+        return [doc for doc, _ in docs_and_scores]
+
+    async def ahybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,  # noqa: A002
+        *,
+        fetch_k: int = 20,
+        fusion: Union[FusionMethod, str] = FusionMethod.RRF,
+        alpha: float = 0.5,
+        rrf_k: int = DEFAULT_RRF_K,
+    ) -> List[Tuple[Document, float]]:
+        """Async variant of `hybrid_search_with_score`."""
+        assert self.embedding_function is not None, "embedding_function is required"  # noqa: S101
+        embedding = await self.embedding_function.aembed_query(query)
+        self._init_models(embedding)
+        collection_uuids = await self._aget_collection_uuids()
+        statement = self._make_hybrid_statement(
+            collection_uuids, query, embedding, k, fetch_k, filter, fusion, alpha, rrf_k
+        )
+        async with self._make_async_session() as session:
+            with self._fulltext_index_required():
+                results = (await session.execute(statement)).all()
+        return self._results_to_docs_and_scores(results)
+
+    @contextlib.contextmanager
+    def _fulltext_index_required(self) -> Generator[None, None, None]:
+        """Report a missing fulltext index, instead of an unknown column."""
+        try:
+            yield
+        except sa.exc.ProgrammingError as ex:
+            message = str(ex.orig)
+            if "ColumnUnknown" not in message or FULLTEXT_INDEX_NAME not in message:
+                raise
+            table = self.EmbeddingStore.__tablename__
+            raise ValueError(
+                f"Hybrid search requires the fulltext index `{FULLTEXT_INDEX_NAME}` "
+                f"on table `{table}`, which tables created by previous versions "
+                f"do not have. Re-create the table, e.g. by using `drop_tables()` "
+                f"and adding the documents again."
+            ) from ex
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: Vectors,
+        k: Union[int, Sequence[int]] = 4,
+        filter: Union[None, dict, Sequence[Optional[dict]]] = None,  # noqa: A002
+    ) -> List[List[Document]]:
+        """Run multiple similarity searches at once, see
+        `similarity_search_with_score_by_vectors`.
+
+        Returns:
+            List of Documents most similar to each query vector, in query order.
+        """
+        return [
+            [doc for doc, _ in docs_and_scores]
+            for docs_and_scores in self.similarity_search_with_score_by_vectors(
+                embeddings, k=k, filter=filter
+            )
+        ]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Vectors,
+        k: Union[int, Sequence[int]] = 4,
+        filter: Union[None, dict, Sequence[Optional[dict]]] = None,  # noqa: A002
+    ) -> List[List[Tuple[Document, float]]]:
+        """Run multiple similarity searches at once, using a single query.
+
+        Use it to retrieve documents for multiple query vectors, for example
+        when fanning out a question into multiple queries. The collection is
+        looked up once, and the searches are combined using `UNION ALL` of
+        `KNN_MATCH` queries, so they only need a single round trip.
+
+        Args:
+            embeddings: Query vectors.
+            k: Number of Documents to return, either for all queries, or per query.
+            filter: Filter by metadata, either for all queries, or per query.
+
+        Returns:
+            List of Documents most similar to each query vector, with scores,
+            in query order.
+        """
+        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
+        if len(embeddings) == 0:
+            return []
+        ks, filters = self._batch_arguments(embeddings, k, filter)
+        self._init_models(embeddings[0])
+        collection_uuids = self._get_collection_uuids()
+        statement = self._make_batch_statement(
+            collection_uuids, embeddings, ks, filters
+        )
+        with self._make_sync_session() as session:
+            rows = session.execute(statement).all()
+        return self._batch_results_to_docs_and_scores(rows, len(embeddings))
+
+    async def asimilarity_search_with_score_by_vectors(
+        self,
+        embeddings: Vectors,
+        k: Union[int, Sequence[int]] = 4,
+        filter: Union[None, dict, Sequence[Optional[dict]]] = None,  # noqa: A002
+    ) -> List[List[Tuple[Document, float]]]:
+        """Async variant of `similarity_search_with_score_by_vectors`."""
+        if len(embeddings) == 0:
+            return []
+        ks, filters = self._batch_arguments(embeddings, k, filter)
+        self._init_models(embeddings[0])
+        collection_uuids = await self._aget_collection_uuids()
+        statement = self._make_batch_statement(
+            collection_uuids, embeddings, ks, filters
+        )
+        async with self._make_async_session() as session:
+            rows = (await session.execute(statement)).all()
+        return self._batch_results_to_docs_and_scores(rows, len(embeddings))
+
+    @staticmethod
+    def _batch_arguments(
+        embeddings: Vectors,
+        k: Union[int, Sequence[int]],
+        filter: Union[None, dict, Sequence[Optional[dict]]],  # noqa: A002
+    ) -> Tuple[List[int], List[Optional[dict]]]:
+        """Expand `k` and `filter` arguments of batched searches to one per query."""
+        ks = [k] * len(embeddings) if isinstance(k, int) else list(k)
+        if filter is None or isinstance(filter, dict):
+            filters = [filter] * len(embeddings)
+        else:
+            filters = list(filter)
+        if len(ks) != len(embeddings) or len(filters) != len(embeddings):
+            raise ValueError(
+                f"Number of values for `k` ({len(ks)}) and `filter` "
+                f"({len(filters)}) must match the number of query vectors "
+                f"({len(embeddings)})"
+            )
+        return ks, filters
+
+    def _batch_results_to_docs_and_scores(
+        self, rows: Sequence[Any], count: int
+    ) -> List[List[Tuple[Document, float]]]:
+        """Return docs and scores per query from results of a batched search."""
+        results: List[List[Any]] = [[] for _ in range(count)]
+        # The order of rows is only defined within each query.
+        for row in sorted(rows, key=lambda row: row.similarity, reverse=True):
+            results[row.query_index].append(row)
+        return [self._results_to_docs_and_scores(rows_) for rows_ in results]
+
+    def max_marginal_relevance_search_with_score_by_vector(
         self,
-        embedding: List[float],
+        embedding: Vector,
         k: int = 4,
         fetch_k: int = 20,
         lambda_mult: float = 0.5,
@@ -483,98 +2183,440 @@ class CrateDBVectorStore(PGVector):
             List[Tuple[Document, float]]: List of Documents selected by maximal marginal
                 relevance to the query and score for each.
         """
-        import numpy as np
-
         assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
-        results = self.__query_collection(embedding=embedding, k=fetch_k, filter=filter)
+        results = self.__query_collection(
+            embedding=embedding, k=fetch_k, filter=filter, include_embeddings=True
+        )
 
-        embedding_list = [result.EmbeddingStore.embedding for result in results]
+        return self._select_mmr(embedding, results, k=k, lambda_mult=lambda_mult)
 
-        mmr_selected = maximal_marginal_relevance(
-            np.array(embedding, dtype=np.float32),
-            embedding_list,
-            k=k,
-            lambda_mult=lambda_mult,
+    async def amax_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: Vector,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, str]] = None,  # noqa: A002
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Async variant of `max_marginal_relevance_search_with_score_by_vector`."""
+        results = await self.__aquery_collection(
+            embedding=embedding, k=fetch_k, filter=filter, include_embeddings=True
         )
 
-        candidates = self._results_to_docs_and_scores(results)
+        return self._select_mmr(embedding, results, k=k, lambda_mult=lambda_mult)
+
+    @staticmethod
+    def _embedding_matrix(results: Sequence[Any]) -> npt.NDArray[np.float32]:
+        """Copy the embeddings of result rows into a preallocated matrix."""
+        matrix = np.empty((len(results), len(results[0].embedding)), dtype=np.float32)
+        for i, result in enumerate(results):
+            matrix[i] = result.embedding
+        return matrix
+
+    def _select_mmr(
+        self, embedding: Vector, results: Sequence[Any], k: int, lambda_mult: float
+    ) -> List[Tuple[Document, float]]:
+        """Select results by maximal marginal relevance, in order of selection."""
+        if not results:
+            return []
+        candidates = self._embedding_matrix(results)
+
+        mmr_selected = maximal_marginal_relevance(
+            embedding, candidates, k=k, lambda_mult=lambda_mult
+        )
 
-        return [r for i, r in enumerate(candidates) if i in mmr_selected]
+        return self._results_to_docs_and_scores([results[i] for i in mmr_selected])
 
     def __query_collection(
         self,
-        embedding: List[float],
+        embedding: Vector,
         k: int = 4,
         filter: Optional[Dict[str, str]] = None,  # noqa: A002
+        include_embeddings: bool = False,
+        limit: Optional[int] = None,
     ) -> List[Any]:
-        """Query the collection."""
+        """Query the collections, see `_get_collection_uuids`.
+
+        With a `filter_planner`, filtered searches are carried out according
+        to the selectivity of the filter, see `FilterPlanner`.
+        """
         self._init_models(embedding)
+        collection_uuids = self._get_collection_uuids()
+        limit = k if limit is None else limit
+        filter_clause = self._planned_filter_clause(filter)
         with self._make_sync_session() as session:
-            collection = self.get_collection(session)
-            if collection is None:
-                raise ValueError(f"Collection not found: {self.collection_name}")
-            return self._query_collection_multi(
-                collections=[collection], embedding=embedding, k=k, filter=filter
-            )
+            if filter_clause is None:
+                statement = self._make_query_statement(
+                    collection_uuids,
+                    embedding,
+                    k,
+                    filter,
+                    include_embeddings,
+                    limit=limit,
+                )
+                return list(session.execute(statement).all())
+
+            planner = typing_cast(FilterPlanner, self.filter_planner)
+            key = self._statistics_key(collection_uuids, filter)
+            statistics = planner.get_statistics(key)
+            if statistics is None:
+                count_statement = self._make_count_statement(
+                    collection_uuids, filter_clause
+                )
+                row = session.execute(count_statement).one()
+                statistics = int(row[0]), int(row[1])
+                planner.put_statistics(key, *statistics)
+            matching, total = statistics
+            plan: Optional[SearchPlan] = planner.plan(k, limit, matching, total)
+            while plan is not None:
+                statement = self._make_planned_statement(
+                    plan, collection_uuids, embedding, filter, include_embeddings, limit
+                )
+                results = list(session.execute(statement).all())
+                plan = planner.deepen(plan, limit, len(results), matching, total)
+            return results
 
-    def _query_collection_multi(
+    async def __aquery_collection(
         self,
-        collections: List[Any],
-        embedding: List[float],
+        embedding: Vector,
         k: int = 4,
         filter: Optional[Dict[str, str]] = None,  # noqa: A002
+        include_embeddings: bool = False,
+        limit: Optional[int] = None,
     ) -> List[Any]:
-        """Query the collection."""
+        """Query the collections, see `_aget_collection_uuids`."""
         self._init_models(embedding)
+        collection_uuids = await self._aget_collection_uuids()
+        limit = k if limit is None else limit
+        filter_clause = self._planned_filter_clause(filter)
+        async with self._make_async_session() as session:
+            if filter_clause is None:
+                statement = self._make_query_statement(
+                    collection_uuids,
+                    embedding,
+                    k,
+                    filter,
+                    include_embeddings,
+                    limit=limit,
+                )
+                return list((await session.execute(statement)).all())
+
+            planner = typing_cast(FilterPlanner, self.filter_planner)
+            key = self._statistics_key(collection_uuids, filter)
+            statistics = planner.get_statistics(key)
+            if statistics is None:
+                count_statement = self._make_count_statement(
+                    collection_uuids, filter_clause
+                )
+                row = (await session.execute(count_statement)).one()
+                statistics = int(row[0]), int(row[1])
+                planner.put_statistics(key, *statistics)
+            matching, total = statistics
+            plan: Optional[SearchPlan] = planner.plan(k, limit, matching, total)
+            while plan is not None:
+                statement = self._make_planned_statement(
+                    plan, collection_uuids, embedding, filter, include_embeddings, limit
+                )
+                results = list((await session.execute(statement)).all())
+                plan = planner.deepen(plan, limit, len(results), matching, total)
+            return results
 
-        collection_names = [coll.name for coll in collections]
-        collection_uuids = [coll.uuid for coll in collections]
-        self.logger.info(f"Querying collections: {collection_names}")
+    def _planned_filter_clause(
+        self,
+        filter: Optional[dict],  # noqa: A002
+    ) -> Optional[sa.ColumnElement]:
+        """Return the clause of a filter, when searches using it are planned."""
+        if self.filter_planner is None or not filter:
+            return None
+        return self._create_filter_clause(filter)
 
-        with self._make_sync_session() as session:
-            filter_by = [self.EmbeddingStore.collection_id.in_(collection_uuids)]
+    @staticmethod
+    def _statistics_key(
+        collection_uuids: List[str],
+        filter: Optional[dict],  # noqa: A002
+    ) -> Any:
+        """Return the key of the statistics of a filter, see `FilterPlanner`."""
+        return tuple(sorted(collection_uuids)), orjson.dumps(
+            filter, option=orjson.OPT_SORT_KEYS, default=str
+        )
+
+    def _get_collection_uuids(self) -> List[str]:
+        """
+        Return the UUIDs of the collections to search in.
 
-            if filter is not None:
-                filter_clause = self._create_filter_clause(filter)
+        They are remembered for `collection_cache_ttl` seconds, so searches
+        only need a single statement, filtering by `collection_id`.
+        """
+        uuids = self._cached_collection_uuids()
+        if uuids is None:
+            with self._make_sync_session() as session:
+                collections = self._get_query_collections(session)
+            uuids = self._cache_collection_uuids(collections)
+        return uuids
+
+    async def _aget_collection_uuids(self) -> List[str]:
+        """
+        Async variant of `_get_collection_uuids`.
+        """
+        uuids = self._cached_collection_uuids()
+        if uuids is None:
+            async with self._make_async_session() as session:
+                collections = await self._aget_query_collections(session)
+            uuids = self._cache_collection_uuids(collections)
+        return uuids
+
+    def _cached_collection_uuids(self) -> Optional[List[str]]:
+        if self._collection_cache is None:
+            return None
+        uuids, expires = self._collection_cache
+        if time.monotonic() >= expires:
+            return None
+        return uuids
+
+    def _cache_collection_uuids(self, collections: List[Any]) -> List[str]:
+        self.logger.info(f"Querying collections: {[c.name for c in collections]}")
+        uuids = [collection.uuid for collection in collections]
+        if self.collection_cache_ttl > 0:
+            expires = time.monotonic() + self.collection_cache_ttl
+            self._collection_cache = (uuids, expires)
+        return uuids
+
+    def _get_query_collections(self, session: sa.orm.Session) -> List[Any]:
+        """Return the collections to search in."""
+        collection = self.get_collection(session)
+        if collection is None:
+            raise ValueError(f"Collection not found: {self.collection_name}")
+        return [collection]
+
+    async def _aget_query_collections(self, session: AsyncSession) -> List[Any]:
+        """Return the collections to search in."""
+        collection = await self.aget_collection(session)
+        if collection is None:
+            raise ValueError(f"Collection not found: {self.collection_name}")
+        return [collection]
+
+    def _make_batch_statement(
+        self,
+        collection_uuids: List[str],
+        embeddings: Vectors,
+        ks: Sequence[int],
+        filters: Sequence[Optional[dict]],
+    ) -> Union[sa.Select, sa.CompoundSelect]:
+        """Make a statement querying the collections using multiple query vectors.
+
+        Each query vector gets its own `KNN_MATCH` query, and the queries are
+        combined using `UNION ALL`. Result rows are labeled with the position
+        of their query vector, in order to assign them to their queries.
+        """
+        queries = []
+        for index, (embedding, k, filter_) in enumerate(
+            zip(embeddings, ks, filters, strict=True)
+        ):
+            filter_by = [self.EmbeddingStore.collection_id.in_(collection_uuids)]
+            if filter_ is not None:
+                filter_clause = self._create_filter_clause(filter_)
                 if filter_clause is not None:
                     filter_by.append(filter_clause)
-
-            _type = self.EmbeddingStore
-
-            # With NumPy 2, list contains `np.float64` values.
-            embedding = list(map(float, embedding))
-
-            results: List[Any] = (
-                session.query(
-                    self.EmbeddingStore,
-                    # TODO: Original pgvector code uses `self.distance_strategy`.
-                    #       CrateDB currently only supports EUCLIDEAN.
-                    #       self.distance_strategy(embedding).label("distance")  # noqa: E501,ERA001
+            vector = as_float32(embedding)
+            queries.append(
+                sa.select(
+                    sa.literal(index, sa.Integer).label("query_index"),
+                    *self._search_columns(),
+                    # See `_make_query_statement` about rendering the vector.
                     sa.func.vector_similarity(
                         self.EmbeddingStore.embedding,
-                        # TODO: Just reference the `embedding` symbol here, don't
-                        #       serialize its value prematurely.
-                        #       https://github.com/crate/crate/issues/16912
-                        #
-                        # Until that got fixed, marshal the arguments to
-                        # `vector_similarity()` manually, in order to work around
-                        # this edge case bug. We don't need to use JSON marshalling,
-                        # because Python's string representation of a list is just
-                        # right.
-                        sa.text(str(embedding)),
+                        sa.literal(
+                            vector,
+                            self.EmbeddingStore.embedding.type,
+                            literal_execute=True,
+                        ),
                     ).label("similarity"),
                 )
-                .filter(*filter_by)
-                # CrateDB applies `KNN_MATCH` within the `WHERE` clause.
-                .filter(sa.func.knn_match(self.EmbeddingStore.embedding, embedding, k))
-                .order_by(sa.desc("similarity"))
-                .join(
-                    self.CollectionStore,
-                    self.EmbeddingStore.collection_id == self.CollectionStore.uuid,
+                .where(*filter_by)
+                .where(
+                    sa.func.knn_match(
+                        self.EmbeddingStore.embedding,
+                        sa.literal(vector, self.EmbeddingStore.embedding.type),
+                        k,
+                    )
                 )
+                .order_by(sa.desc("similarity"))
                 .limit(k)
             )
-        return results
+        return queries[0] if len(queries) == 1 else sa.union_all(*queries)
+
+    def _make_query_statement(
+        self,
+        collection_uuids: List[str],
+        embedding: Vector,
+        k: int = 4,
+        filter: Optional[Dict[str, str]] = None,  # noqa: A002
+        include_embeddings: bool = False,
+        after: Optional[Tuple[float, str]] = None,
+        limit: Optional[int] = None,
+        exact: bool = False,
+    ) -> sa.Select:
+        """Make a statement querying the collections, shared by sync and async.
+
+        Results are ordered by score, and by id for equal scores. Out of the
+        `k` nearest neighbours, `limit` results are returned, starting after
+        the result with the `(score, id)` key given by `after`, if any.
+        With `exact`, all records matching the filter are scored, instead of
+        the nearest neighbours found by `KNN_MATCH`.
+        """
+        filter_by = [self.EmbeddingStore.collection_id.in_(collection_uuids)]
+
+        if filter is not None:
+            filter_clause = self._create_filter_clause(filter)
+            if filter_clause is not None:
+                filter_by.append(filter_clause)
+
+        # Submit the vector as `float32` array, which is serialized compactly.
+        vector = as_float32(embedding)
+
+        # TODO: Original pgvector code uses `self.distance_strategy`.
+        #       CrateDB currently only supports EUCLIDEAN.
+        #       self.distance_strategy(embedding).label("distance")  # noqa: E501,ERA001
+        similarity = sa.func.vector_similarity(
+            self.EmbeddingStore.embedding,
+            # TODO: Just bind the `embedding` parameter here, don't
+            #       render its value as literal.
+            #       https://github.com/crate/crate/issues/16912
+            #
+            # Until that got fixed, render the argument to
+            # `vector_similarity()` as literal, in order to work around
+            # this edge case bug. It is rendered at execution time, so
+            # the compiled statement can still be cached.
+            sa.literal(
+                vector, self.EmbeddingStore.embedding.type, literal_execute=True
+            ),
+        )
+
+        if after is not None:
+            score, last_id = after
+            filter_by.append(
+                sa.or_(
+                    similarity < score,
+                    sa.and_(similarity == score, self.EmbeddingStore.id > last_id),
+                )
+            )
+
+        if not exact:
+            # CrateDB applies `KNN_MATCH` within the `WHERE` clause.
+            filter_by.append(
+                sa.func.knn_match(
+                    self.EmbeddingStore.embedding,
+                    sa.literal(vector, self.EmbeddingStore.embedding.type),
+                    k,
+                )
+            )
+
+        return (
+            sa.select(
+                *self._search_columns(include_embeddings),
+                similarity.label("similarity"),
+            )
+            .where(*filter_by)
+            .order_by(sa.desc("similarity"), self.EmbeddingStore.id)
+            .limit(k if limit is None else limit)
+        )
+
+    def _make_count_statement(
+        self,
+        collection_uuids: List[str],
+        filter_clause: sa.ColumnElement,
+    ) -> sa.Select:
+        """Make a statement counting matching records, and all records."""
+        return sa.select(
+            sa.func.count().filter(filter_clause),
+            sa.func.count(),
+        ).where(self.EmbeddingStore.collection_id.in_(collection_uuids))
+
+    def _make_planned_statement(
+        self,
+        plan: SearchPlan,
+        collection_uuids: List[str],
+        embedding: Vector,
+        filter: Optional[dict],  # noqa: A002
+        include_embeddings: bool,
+        limit: int,
+    ) -> sa.Select:
+        """Make a statement querying the collections, according to a plan."""
+        self.logger.debug(f"Search plan: {plan}")
+        return self._make_query_statement(
+            collection_uuids,
+            embedding,
+            plan.candidates,
+            filter,
+            include_embeddings,
+            limit=limit,
+            exact=plan.exact,
+        )
+
+    def _make_hybrid_statement(
+        self,
+        collection_uuids: List[str],
+        query: str,
+        embedding: Vector,
+        k: int,
+        fetch_k: int,
+        filter: Optional[dict],  # noqa: A002
+        fusion: Union[FusionMethod, str],
+        alpha: float,
+        rrf_k: int,
+    ) -> sa.Select:
+        """Make a statement fusing fulltext and vector search hits.
+
+        Both searches are subqueries of the statement, so the documents
+        are retrieved using a single round trip, see `hybrid.fuse_hits`.
+        """
+        fetch_k = max(fetch_k, k)
+        filter_by = [self.EmbeddingStore.collection_id.in_(collection_uuids)]
+        if filter is not None:
+            filter_clause = self._create_filter_clause(filter)
+            if filter_clause is not None:
+                filter_by.append(filter_clause)
+
+        # See `_make_query_statement` about rendering the vector.
+        vector = as_float32(embedding)
+        similarity = sa.func.vector_similarity(
+            self.EmbeddingStore.embedding,
+            sa.literal(
+                vector, self.EmbeddingStore.embedding.type, literal_execute=True
+            ),
+        )
+        vector_hits = (
+            sa.select(self.EmbeddingStore.id, similarity.label("score"))
+            .where(
+                *filter_by,
+                sa.func.knn_match(
+                    self.EmbeddingStore.embedding,
+                    sa.literal(vector, self.EmbeddingStore.embedding.type),
+                    fetch_k,
+                ),
+            )
+            .order_by(sa.desc("score"))
+            .limit(fetch_k)
+            .subquery("vector_hits")
+        )
+        text_hits = (
+            sa.select(
+                self.EmbeddingStore.id, sa.literal_column("_score").label("score")
+            )
+            .where(*filter_by, match(sa.literal_column(FULLTEXT_INDEX_NAME), query))
+            .order_by(sa.desc("score"))
+            .limit(fetch_k)
+            .subquery("text_hits")
+        )
+        hits = fuse_hits(vector_hits, text_hits, k, fusion, alpha, rrf_k).subquery(
+            "hits"
+        )
+        return (
+            sa.select(*self._search_columns(), hits.c.similarity)
+            .join_from(self.EmbeddingStore, hits, self.EmbeddingStore.id == hits.c.id)
+            .order_by(sa.desc(hits.c.similarity), self.EmbeddingStore.id)
+        )
 
     def _handle_field_filter(
         self,
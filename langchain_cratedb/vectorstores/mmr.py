@@ -0,0 +1,67 @@
+"""Maximal marginal relevance (MMR) selection of search results."""
+
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
+
+from langchain_cratedb.vectorstores.vector import Vector, as_float32
+
+
+def maximal_marginal_relevance(
+    query_embedding: Vector,
+    candidates: npt.NDArray[np.floating],
+    k: int = 4,
+    lambda_mult: float = 0.5,
+) -> t.List[int]:
+    """
+    Select candidates by maximal marginal relevance, using cosine similarity.
+
+    Candidates are selected incrementally, each maximizing its similarity to
+    the query, penalized by its maximum similarity to the candidates selected
+    before. That maximum is updated per selection, using the similarities of
+    the selected candidate to all candidates. The full similarity matrix is
+    never computed, as only `k` of its rows are needed.
+
+    Args:
+        query_embedding: Embedding of the query.
+        candidates: Embeddings of the candidates, as 2-dimensional array,
+            preferably using `float32`, which is not copied.
+        k: Number of candidates to select.
+        lambda_mult: Degree of diversity among the results, between 0 for
+            maximum diversity, and 1 for minimum diversity.
+
+    Returns:
+        Positions of the selected candidates, in order of selection.
+    """
+    count = min(k, len(candidates))
+    if count <= 0:
+        return []
+    matrix = np.asarray(candidates, dtype=np.float32)
+    query = as_float32(query_embedding)
+
+    # Normalize, treating zero vectors as dissimilar to any other vector.
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    norms[norms == 0] = np.inf
+    query_norm = np.linalg.norm(query) or np.inf
+    similarity_to_query = (matrix @ query) / (norms * query_norm)
+
+    def similarity_to(index: int) -> npt.NDArray[np.float32]:
+        row = matrix @ matrix[index]
+        row /= norms
+        row /= norms[index]
+        return row
+
+    relevance = lambda_mult * similarity_to_query
+    index = int(np.argmax(similarity_to_query))
+    selected = [index]
+    redundancy = similarity_to(index)
+    scores = np.empty_like(relevance)
+    while len(selected) < count:
+        np.multiply(redundancy, lambda_mult - 1, out=scores)
+        scores += relevance
+        scores[selected] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        np.maximum(redundancy, similarity_to(index), out=redundancy)
+    return selected
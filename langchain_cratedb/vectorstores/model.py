@@ -1,23 +1,96 @@
 import uuid
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
 import sqlalchemy
-from sqlalchemy.orm import Session, declarative_base, relationship
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, declarative_base, deferred, relationship
+from sqlalchemy_cratedb import FloatVector
+from sqlalchemy_cratedb.type.object import MutableDict, ObjectTypeImpl
+
+from langchain_cratedb.vectorstores.vector import as_float32, vector_literal
 
 COLLECTION_TABLE_NAME = "langchain_collection"
 EMBEDDING_TABLE_NAME = "langchain_embedding"
 
+# Name of the fulltext index on the `document` column, used by hybrid searches.
+FULLTEXT_INDEX_NAME = "document_ft"
+
 
 def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+class Float32Vector(FloatVector):
+    """
+    `FLOAT_VECTOR` type, submitting values as `float32` NumPy arrays.
+
+    The driver serializes them natively, and more compactly than lists of Python
+    floats, which would be rendered using double precision.
+
+    Other than `FloatVector`, statements using this type can be cached,
+    and values can be rendered as literals.
+    """
+
+    cache_ok = True
+
+    def __init__(self, dimensions: Optional[int] = None):
+        super().__init__(dimensions)
+        # Store the dimensionality on the type itself, so it is part of the cache
+        # key of statements, instead of only on the wrapped `ARRAY` type.
+        self.dimensions = dimensions
+
+    def literal_processor(self, dialect: sqlalchemy.Dialect) -> Callable:
+        def process(value: Any) -> str:
+            return vector_literal(value)
+
+        return process
+
+    def bind_processor(self, dialect: sqlalchemy.Dialect) -> Callable:
+        def process(value: Any) -> Any:
+            if value is None:
+                return None
+            vector = as_float32(value)
+            if self.dimensions is not None and len(vector) != self.dimensions:
+                raise ValueError(
+                    f"expected {self.dimensions} dimensions, not {len(vector)}"
+                )
+            return vector
+
+        return process
+
+
+class CacheableObjectTypeImpl(ObjectTypeImpl):
+    """
+    `OBJECT` type, allowing statements using it to be cached.
+
+    It does not have any state which would need to be part of the cache key.
+    """
+
+    cache_ok = True
+
+
+CacheableObjectType = MutableDict.as_mutable(CacheableObjectTypeImpl)
+
+
+class FulltextIndex(sqlalchemy.schema.ColumnCollectionConstraint):
+    """
+    Named fulltext index, defined inline within `CREATE TABLE`.
+
+    CrateDB does not support `CREATE INDEX` statements. Fulltext indexes are
+    queried using `MATCH(<name>, <query>)`, see `patch_sqlalchemy_dialect`.
+    """
+
+    __visit_name__ = "fulltext_index"
+
+    def __init__(self, *columns: str, name: str, analyzer: str = "standard"):
+        super().__init__(*columns, name=name)
+        self.analyzer = analyzer
+
+
 class ModelFactory:
     """Provide SQLAlchemy model objects at runtime."""
 
     def __init__(self, dimensions: Optional[int] = None):
-        from sqlalchemy_cratedb import FloatVector, ObjectType
-
         # While it does not have any function here, you will still need to supply a
         # dummy dimension size value for operations like deleting records.
         self.dimensions = dimensions or 1024
@@ -46,7 +119,7 @@ class ModelFactory:
                 default=generate_uuid,
             )
             name = sqlalchemy.Column(sqlalchemy.String)
-            cmetadata: sqlalchemy.Column = sqlalchemy.Column(ObjectType)
+            cmetadata: sqlalchemy.Column = sqlalchemy.Column(CacheableObjectType)
 
             embeddings = relationship(
                 "EmbeddingStore",
@@ -67,6 +140,24 @@ class ModelFactory:
             ) -> List["CollectionStore"]:
                 return session.query(cls).filter(cls.name.in_(names)).all()  # type: ignore[attr-defined]
 
+            @classmethod
+            async def aget_by_name(
+                cls, session: AsyncSession, name: str
+            ) -> Optional["CollectionStore"]:
+                result = await session.execute(
+                    sqlalchemy.select(cls).where(cls.name == name)  # type: ignore[attr-defined]
+                )
+                return result.scalars().first()
+
+            @classmethod
+            async def aget_by_names(
+                cls, session: AsyncSession, names: List[str]
+            ) -> List["CollectionStore"]:
+                result = await session.execute(
+                    sqlalchemy.select(cls).where(cls.name.in_(names))  # type: ignore[attr-defined]
+                )
+                return list(result.scalars().all())
+
             @classmethod
             def get_or_create(
                 cls,
@@ -90,11 +181,37 @@ class ModelFactory:
                 created = True
                 return collection, created
 
+            @classmethod
+            async def aget_or_create(
+                cls,
+                session: AsyncSession,
+                name: str,
+                cmetadata: Optional[dict] = None,
+            ) -> Tuple["CollectionStore", bool]:
+                """
+                Get or create a collection.
+                Returns [Collection, bool] where the bool is True
+                if the collection was created.
+                """
+                created = False
+                collection = await cls.aget_by_name(session, name)
+                if collection:
+                    return collection, created
+
+                collection = cls(name=name, cmetadata=cmetadata)
+                session.add(collection)
+                await session.commit()
+                created = True
+                return collection, created
+
         class EmbeddingStore(BaseModel):
             """Embedding store."""
 
             __tablename__ = EMBEDDING_TABLE_NAME
-            __table_args__ = {"keep_existing": True}
+            __table_args__ = (
+                FulltextIndex("document", name=FULLTEXT_INDEX_NAME),
+                {"keep_existing": True},
+            )
 
             id = sqlalchemy.Column(
                 # Original: nullable=True, primary_key=True, index=True, unique=True
@@ -115,12 +232,18 @@ class ModelFactory:
             collection = relationship("CollectionStore", back_populates="embeddings")
 
             embedding: sqlalchemy.Column = sqlalchemy.Column(
-                FloatVector(self.dimensions)
+                Float32Vector(self.dimensions)
             )
             document: sqlalchemy.Column = sqlalchemy.Column(
                 sqlalchemy.String, nullable=True
             )
-            cmetadata: sqlalchemy.Column = sqlalchemy.Column(ObjectType, nullable=True)
+            cmetadata: sqlalchemy.Column = sqlalchemy.Column(
+                CacheableObjectType, nullable=True
+            )
+
+            # Fingerprint of `document` and `cmetadata`, used to skip re-embedding
+            # unchanged content. Deferred, because it is not needed when searching.
+            content_hash = deferred(sqlalchemy.Column(sqlalchemy.String, nullable=True))
 
         self.Base = Base
         self.BaseModel = BaseModel
@@ -11,18 +11,30 @@ from typing import (
 )
 
 import sqlalchemy as sa
-from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
-from langchain_postgres._utils import maximal_marginal_relevance
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from langchain_cratedb.refresh import (
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_REFRESH_POLICY,
+    RefreshPolicy,
+)
 from langchain_cratedb.vectorstores.main import (
     _LANGCHAIN_DEFAULT_COLLECTION_NAME,
+    DEFAULT_COLLECTION_CACHE_TTL,
     DEFAULT_DISTANCE_STRATEGY,
     CrateDBVectorStore,
     DBConnection,
     DistanceStrategy,
 )
+from langchain_cratedb.vectorstores.planner import FilterPlanner
+from langchain_cratedb.vectorstores.result_cache import SearchResultCache
+from langchain_cratedb.vectorstores.vector import Vector
 
 
 class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
@@ -60,6 +72,11 @@ class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
         use_jsonb: bool = True,
         create_extension: bool = True,
         async_mode: bool = False,
+        refresh_policy: Union[RefreshPolicy, str] = DEFAULT_REFRESH_POLICY,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        collection_cache_ttl: float = DEFAULT_COLLECTION_CACHE_TTL,
+        result_cache: Optional[SearchResultCache] = None,
+        filter_planner: Optional[FilterPlanner] = None,
     ) -> None:
         """Initialize the PGVector store.
         For an async version, use `PGVector.acreate()` instead.
@@ -85,7 +102,27 @@ class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
             create_extension: If True, will create the vector extension if it
                 doesn't exist. disabling creation is useful when using ReadOnly
                 Databases.
+            refresh_policy: When to invoke `REFRESH TABLE` after writing data,
+                see `RefreshPolicy`. (default: immediate)
+            refresh_interval: Minimum number of seconds between refreshes,
+                when using the `interval` refresh policy. (default: 1.0)
+            collection_cache_ttl: Number of seconds to remember the UUIDs of
+                collections to search in. (default: 60.0)
+            result_cache: Remember results of similarity searches, see
+                `SearchResultCache`. (default: None)
+            filter_planner: Plan searches using metadata filters by their
+                selectivity, see `FilterPlanner`. (default: None)
         """
+        self._reject_async(connection, async_mode)
+        # Bulk requests are not sized, because it can not be used for indexing.
+        self._init_options(
+            refresh_policy=refresh_policy,
+            refresh_interval=refresh_interval,
+            batch_sizer=None,
+            collection_cache_ttl=collection_cache_ttl,
+            result_cache=result_cache,
+            filter_planner=filter_planner,
+        )
         self.async_mode = async_mode
         self.embedding_function = embeddings
         self._embedding_length = embedding_length
@@ -128,8 +165,8 @@ class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
         self.use_jsonb = use_jsonb
         self.create_extension = create_extension
 
-        if not self.async_mode:
-            self.__post_init__()
+        # Models are initialized at runtime, also in async mode.
+        self.__post_init__()
 
     def get_collections(self, session: sa.orm.Session) -> Any:
         if self.CollectionStore is None:
@@ -139,82 +176,32 @@ class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
             )
         return self.CollectionStore.get_by_names(session, self.collection_names)
 
-    ### NEED TO OVERWRITE BECAUSE __query_collection ###
-
-    def similarity_search_with_score_by_vector(
-        self,
-        embedding: List[float],
-        k: int = 4,
-        filter: Optional[dict] = None,  # noqa: A002
-    ) -> List[Tuple[Document, float]]:
-        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
-        results = self.__query_collection(embedding=embedding, k=k, filter=filter)
-
-        return self._results_to_docs_and_scores(results)
-
-    def max_marginal_relevance_search_with_score_by_vector(
-        self,
-        embedding: List[float],
-        k: int = 4,
-        fetch_k: int = 20,
-        lambda_mult: float = 0.5,
-        filter: Optional[Dict[str, str]] = None,  # noqa: A002
-        **kwargs: Any,
-    ) -> List[Tuple[Document, float]]:
-        """Return docs selected using the maximal marginal relevance with score
-            to embedding vector.
-
-        Maximal marginal relevance optimizes for similarity to query AND diversity
-            among selected documents.
-
-        Args:
-            embedding: Embedding to look up documents similar to.
-            k (int): Number of Documents to return. Defaults to 4.
-            fetch_k (int): Number of Documents to fetch to pass to MMR algorithm.
-                Defaults to 20.
-            lambda_mult (float): Number between 0 and 1 that determines the degree
-                of diversity among the results with 0 corresponding
-                to maximum diversity and 1 to minimum diversity.
-                Defaults to 0.5.
-            filter (Optional[Dict[str, str]]): Filter by metadata. Defaults to None.
-
-        Returns:
-            List[Tuple[Document, float]]: List of Documents selected by maximal marginal
-                relevance to the query and score for each.
-        """
-        import numpy as np
-
-        assert not self._async_engine, "This method must be called without async_mode"  # noqa: S101
-        results = self.__query_collection(embedding=embedding, k=fetch_k, filter=filter)
-
-        embedding_list = [result.EmbeddingStore.embedding for result in results]
-
-        mmr_selected = maximal_marginal_relevance(
-            np.array(embedding, dtype=np.float32),
-            embedding_list,
-            k=k,
-            lambda_mult=lambda_mult,
-        )
-
-        candidates = self._results_to_docs_and_scores(results)
-
-        return [r for i, r in enumerate(candidates) if i in mmr_selected]
-
-    def __query_collection(
-        self,
-        embedding: List[float],
-        k: int = 4,
-        filter: Optional[Dict[str, str]] = None,  # noqa: A002
-    ) -> List[Any]:
-        """Query multiple collections."""
-        self._init_models(embedding)
-        with self._make_sync_session() as session:
-            collections = self.get_collections(session)
-            if not collections:
-                raise ValueError("No collections found")
-            return self._query_collection_multi(
-                collections=collections, embedding=embedding, k=k, filter=filter
+    async def aget_collections(self, session: AsyncSession) -> Any:
+        if self.CollectionStore is None:
+            raise RuntimeError(
+                "Collection can't be accessed without specifying "
+                "dimension size of embedding vectors"
             )
+        return await self.CollectionStore.aget_by_names(session, self.collection_names)
+
+    def _get_query_collections(self, session: sa.orm.Session) -> List[Any]:
+        """Return the collections to search in."""
+        collections = self.get_collections(session)
+        if not collections:
+            raise ValueError("No collections found")
+        return collections
+
+    async def _aget_query_collections(self, session: AsyncSession) -> List[Any]:
+        """Return the collections to search in."""
+        collections = await self.aget_collections(session)
+        if not collections:
+            raise ValueError("No collections found")
+        return collections
+
+    def _result_collections(self) -> List[Tuple[str, str]]:
+        """Return the collections searched in, as keys of the result cache."""
+        database = self._database_key()
+        return [(database, name) for name in self.collection_names]
 
     @classmethod
     def from_texts(
@@ -242,3 +229,17 @@ class CrateDBVectorStoreMultiCollection(CrateDBVectorStore):
             "The adapter for querying multiple collections "
             "can not be used for _indexing_ documents"
         )
+
+    def _prepare_storage(self, embedding: Vector) -> None:
+        """Reject writing, invoked by all methods adding embeddings."""
+        raise NotImplementedError(
+            "The adapter for querying multiple collections "
+            "can not be used for _indexing_ documents"
+        )
+
+    async def _aprepare_storage(self, embedding: Vector) -> None:
+        """Reject writing, invoked by all async methods adding embeddings."""
+        raise NotImplementedError(
+            "The adapter for querying multiple collections "
+            "can not be used for _indexing_ documents"
+        )
@@ -0,0 +1,59 @@
+"""Cursor-based pagination of vector search results."""
+
+import base64
+import dataclasses
+from typing import List, Optional, Tuple
+
+import orjson
+from langchain_core.documents import Document
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchCursor:
+    """
+    Position within vector search results, to continue searching after it.
+
+    Results are ordered by score, and by id for equal scores, so the key of
+    the last result of a page identifies where the next page starts.
+    """
+
+    score: float
+    """Score of the last result of the previous page."""
+
+    id: str
+    """Identifier of the last result of the previous page."""
+
+    offset: int
+    """Number of results of all previous pages."""
+
+    def to_token(self) -> str:
+        """Encode the cursor into an opaque, URL-safe string."""
+        payload = orjson.dumps([self.score, self.id, self.offset])
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @classmethod
+    def from_token(cls, token: str) -> "SearchCursor":
+        """Decode a cursor encoded using `to_token`."""
+        try:
+            score, id_, offset = orjson.loads(base64.urlsafe_b64decode(token))
+            return cls(score=float(score), id=str(id_), offset=int(offset))
+        except (ValueError, TypeError) as ex:
+            raise ValueError(f"Invalid search cursor: {token}") from ex
+
+
+@dataclasses.dataclass
+class SearchPage:
+    """
+    One page of vector search results.
+    """
+
+    results: List[Tuple[Document, float]]
+    """Documents of this page, with their scores."""
+
+    cursor: Optional[SearchCursor] = None
+    """Cursor to retrieve the next page, or None if this is the last page."""
+
+    @property
+    def documents(self) -> List[Document]:
+        """Documents of this page, without their scores."""
+        return [document for document, _ in self.results]
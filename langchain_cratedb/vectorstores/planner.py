@@ -0,0 +1,133 @@
+"""Plan nearest neighbour searches combined with metadata filters."""
+
+import dataclasses
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+# Maximum number of matching records to score exactly, without `KNN_MATCH`.
+DEFAULT_EXACT_THRESHOLD = 10_000
+
+# Maximum number of nearest neighbour candidates to ask `KNN_MATCH` for.
+DEFAULT_MAX_CANDIDATES = 10_000
+
+# Number of seconds to remember how many records match a filter.
+DEFAULT_STATISTICS_TTL = 60.0
+
+# Number of filters to remember statistics for.
+STATISTICS_SIZE = 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchPlan:
+    """
+    How to carry out a filtered nearest neighbour search.
+    """
+
+    exact: bool
+    """Score all matching records using `vector_similarity()`, without `KNN_MATCH`."""
+
+    candidates: int
+    """Number of nearest neighbour candidates to ask `KNN_MATCH` for."""
+
+    round: int = 1
+    """Number of the attempt, when deepening the search iteratively."""
+
+
+class FilterPlanner:
+    """
+    Plan nearest neighbour searches combined with metadata filters.
+
+    Records not matching the filter still take up nearest neighbour candidates
+    of `KNN_MATCH`, so selective filters may leave fewer than `k` results.
+    The planner estimates the selectivity of filters by counting matching
+    records, and remembers the counts for `statistics_ttl` seconds.
+
+    - When at most `exact_threshold` records match, all of them are scored
+      exactly using `vector_similarity()`, which returns complete results.
+    - Otherwise, `KNN_MATCH` is asked for `k / selectivity * margin`
+      candidates, up to `max_candidates`.
+    - When that still returns fewer results than expected, the number of
+      candidates is multiplied by `growth`, for up to `max_rounds` attempts.
+
+    Synopsis::
+
+        from langchain_cratedb.vectorstores import FilterPlanner
+
+        vectorstore = CrateDBVectorStore(..., filter_planner=FilterPlanner())
+    """
+
+    def __init__(
+        self,
+        exact_threshold: int = DEFAULT_EXACT_THRESHOLD,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+        margin: float = 2.0,
+        growth: float = 4.0,
+        max_rounds: int = 3,
+        statistics_ttl: float = DEFAULT_STATISTICS_TTL,
+    ):
+        self.exact_threshold = exact_threshold
+        self.max_candidates = max_candidates
+        self.margin = margin
+        self.growth = growth
+        self.max_rounds = max_rounds
+        self.statistics_ttl = statistics_ttl
+        self._statistics: "OrderedDict[Hashable, Tuple[int, int, float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get_statistics(self, key: Hashable) -> Optional[Tuple[int, int]]:
+        """Return the remembered numbers of matching and of all records, if any."""
+        with self._lock:
+            entry = self._statistics.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.statistics_ttl:
+                del self._statistics[key]
+                return None
+            self._statistics.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put_statistics(self, key: Hashable, matching: int, total: int) -> None:
+        """Remember the numbers of matching and of all records."""
+        if self.statistics_ttl <= 0:
+            return
+        with self._lock:
+            self._statistics[key] = (matching, total, time.monotonic())
+            self._statistics.move_to_end(key)
+            while len(self._statistics) > STATISTICS_SIZE:
+                self._statistics.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget all statistics, e.g. after writing many records."""
+        with self._lock:
+            self._statistics.clear()
+
+    def plan(self, k: int, limit: int, matching: int, total: int) -> SearchPlan:
+        """Plan a search for `limit` results, out of at least `k` candidates."""
+        if matching <= self.exact_threshold:
+            return SearchPlan(exact=True, candidates=matching)
+        selectivity = matching / max(total, 1)
+        candidates = math.ceil(limit / selectivity * self.margin)
+        return SearchPlan(
+            exact=False,
+            candidates=max(k, min(candidates, self.max_candidates, total)),
+        )
+
+    def deepen(
+        self, plan: SearchPlan, limit: int, found: int, matching: int, total: int
+    ) -> Optional[SearchPlan]:
+        """Plan the next attempt, when a search returned too few results."""
+        if plan.exact or found >= min(limit, matching):
+            return None
+        if plan.round >= self.max_rounds:
+            return None
+        candidates = min(
+            math.ceil(plan.candidates * self.growth), self.max_candidates, total
+        )
+        if candidates <= plan.candidates:
+            return None
+        return SearchPlan(exact=False, candidates=candidates, round=plan.round + 1)
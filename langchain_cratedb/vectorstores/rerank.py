@@ -0,0 +1,61 @@
+"""Exact re-ranking of approximate nearest neighbour candidates."""
+
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
+from langchain_postgres.vectorstores import DistanceStrategy
+
+from langchain_cratedb.vectorstores.vector import Vector, as_float32
+
+
+def similarity_scores(
+    query_embedding: Vector,
+    candidates: npt.NDArray[np.floating],
+    strategy: t.Union[DistanceStrategy, str] = DistanceStrategy.EUCLIDEAN,
+) -> npt.NDArray[np.float32]:
+    """
+    Compute exact similarity scores of candidates, where higher is more similar.
+
+    - `euclidean`: `1 / (1 + d²)`, with the squared Euclidean distance `d²`,
+      like CrateDB's `vector_similarity()` function.
+    - `cosine`: Cosine similarity, treating zero vectors as dissimilar.
+    - `inner`: Dot product.
+
+    Args:
+        query_embedding: Embedding of the query.
+        candidates: Embeddings of the candidates, as 2-dimensional array.
+        strategy: Similarity metric, see `DistanceStrategy`.
+    """
+    matrix = np.asarray(candidates, dtype=np.float32)
+    query = as_float32(query_embedding)
+    strategy = DistanceStrategy(strategy)
+    if strategy is DistanceStrategy.EUCLIDEAN:
+        difference = matrix - query
+        return 1 / (1 + np.einsum("ij,ij->i", difference, difference))
+    scores = matrix @ query
+    if strategy is DistanceStrategy.COSINE:
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+        norms[norms == 0] = np.inf
+        scores /= norms * (np.linalg.norm(query) or np.inf)
+    return scores
+
+
+def rerank(
+    query_embedding: Vector,
+    candidates: npt.NDArray[np.floating],
+    k: int,
+    strategy: t.Union[DistanceStrategy, str] = DistanceStrategy.EUCLIDEAN,
+) -> t.List[t.Tuple[int, float]]:
+    """
+    Select the `k` candidates most similar to the query, using exact scores.
+
+    Returns:
+        Positions of the selected candidates with their scores, most similar
+        first. Candidates with equal scores keep their order.
+    """
+    if k <= 0 or len(candidates) == 0:
+        return []
+    scores = similarity_scores(query_embedding, candidates, strategy)
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(int(index), float(scores[index])) for index in order]
@@ -0,0 +1,168 @@
+"""In-process cache for results of vector searches."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from langchain_core.documents import Document
+
+from langchain_cratedb.vectorstores.vector import Vector, as_float32
+
+# Number of search results to keep, evicting the least recently used ones.
+DEFAULT_MAXSIZE = 1024
+
+# Number of decimals to round query vectors to, before hashing them.
+DEFAULT_PRECISION = 5
+
+Results = List[Tuple[Document, float]]
+ResultKey = Tuple[FrozenSet[Hashable], bytes, int, bytes, Tuple[Any, ...]]
+
+
+class SearchResultCache:
+    """
+    Remember results of vector searches, using a least recently used policy.
+
+    Results are keyed by the collections searched in, a hash of the query
+    vector, `k`, and the metadata filter. Query vectors are rounded before
+    hashing them, so repeated embeddings of the same query hit the cache,
+    even if they differ by floating point noise.
+
+    Vector stores invalidate the results of their collections when writing
+    or deleting records, and again after refreshing the table. Writes by other
+    processes or store instances are not noticed, so use `ttl` to bound the
+    staleness of results.
+
+    Each invalidation increments `generation`. Results of searches which
+    started before an invalidation are not stored, when passing the
+    generation observed before searching to `put`.
+
+    Synopsis::
+
+        from langchain_cratedb.vectorstores import SearchResultCache
+
+        vectorstore = CrateDBVectorStore(
+            ..., result_cache=SearchResultCache(maxsize=1000, ttl=300)
+        )
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: Optional[float] = None,
+        precision: int = DEFAULT_PRECISION,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of search results to keep.
+            ttl: Number of seconds to keep search results, or None to keep
+                them until they are evicted or invalidated. (default: None)
+            precision: Number of decimals to round query vectors to. (default: 5)
+        """
+        if maxsize < 1:
+            raise ValueError(f"Cache size must be a positive number: {maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+        # Number of lookups which returned cached results, or did not.
+        self.hits = 0
+        self.misses = 0
+        # Number of invalidations, see `put`.
+        self.generation = 0
+        # Results with the time they expire, in order of their last use.
+        self._entries: "OrderedDict[ResultKey, Tuple[Results, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def make_key(
+        self,
+        collections: Iterable[Hashable],
+        embedding: Vector,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,  # noqa: A002
+        *options: Any,
+    ) -> ResultKey:
+        """Compute the cache key of a search."""
+        # Adding zero turns negative zeros into positive ones.
+        vector = np.round(as_float32(embedding), self.precision) + np.float32(0)
+        vector_hash = hashlib.blake2b(vector.tobytes(), digest_size=16).digest()
+        filter_key = orjson.dumps(filter, option=orjson.OPT_SORT_KEYS, default=str)
+        return frozenset(collections), vector_hash, k, filter_key, options
+
+    def get(self, key: ResultKey) -> Optional[Results]:
+        """Return a copy of cached results, or None if there are none."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None:
+                if time.monotonic() >= entry[1]:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._copy(entry[0])
+
+    def put(
+        self,
+        key: ResultKey,
+        results: Results,
+        *,
+        generation: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Remember search results, evicting the least recently used ones.
+
+        Args:
+            key: Cache key of the search, see `make_key`.
+            results: Results of the search.
+            generation: Value of `generation` before searching. When results
+                have been invalidated meanwhile, the results are not stored.
+            ttl: Number of seconds to keep the results, capped by the `ttl`
+                of the cache. Use `0` to not store them at all.
+        """
+        if self.ttl is not None:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl is not None and ttl <= 0:
+            return
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self._copy(results), expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collections: Iterable[Hashable]) -> int:
+        """Forget results of searches in any of the given collections.
+
+        Returns:
+            Number of forgotten search results.
+        """
+        targets = set(collections)
+        with self._lock:
+            self.generation += 1
+            keys = [key for key in self._entries if not targets.isdisjoint(key[0])]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Forget all search results. Hit and miss counters are retained."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    @staticmethod
+    def _copy(results: Results) -> Results:
+        """Copy results, so callers can not modify cached documents."""
+        return [(document.model_copy(deep=True), score) for document, score in results]
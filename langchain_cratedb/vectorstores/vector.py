@@ -0,0 +1,38 @@
+"""Compact encoding of embedding vectors."""
+
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
+import orjson
+
+Vector = t.Union[t.Sequence[float], npt.NDArray[np.floating]]
+"""An embedding vector, either a sequence of floats, or a 1-dimensional array."""
+
+Vectors = t.Union[t.Sequence[Vector], npt.NDArray[np.floating]]
+"""Multiple embedding vectors, either a sequence, or a 2-dimensional array."""
+
+
+def as_float32(vector: Vector) -> npt.NDArray[np.float32]:
+    """
+    Convert an embedding vector into a contiguous `float32` array.
+
+    CrateDB stores `FLOAT_VECTOR` values using single precision, so no precision
+    is lost. Arrays which already use `float32` are not copied.
+    """
+    array = np.ascontiguousarray(vector, dtype=np.float32)
+    if array.ndim != 1:
+        raise ValueError(
+            f"Expected a 1-dimensional vector, got {array.ndim} dimensions"
+        )
+    return array
+
+
+def vector_literal(vector: Vector) -> str:
+    """
+    Render an embedding vector as an SQL array literal.
+
+    Using `float32` values, each element is rendered using the shortest
+    representation which round-trips, i.e. up to 9 instead of 17 digits.
+    """
+    return orjson.dumps(as_float32(vector), option=orjson.OPT_SERIALIZE_NUMPY).decode()
@@ -3,6 +3,7 @@ import typing as t
 import pytest
 import sqlalchemy as sa
 
+from langchain_cratedb.vectorstores import CrateDBVectorStore
 from langchain_cratedb.vectorstores.model import ModelFactory
 from tests.settings import CONNECTION_STRING
 from tests.util.python import run_file  # noqa: F401
@@ -28,6 +29,7 @@ def drop_tables(engine: sa.Engine) -> None:
     """
     Drop database tables.
     """
+    CrateDBVectorStore.clear_storage_cache()
     try:
         mf = ModelFactory()
         mf.BaseModel.metadata.drop_all(engine, checkfirst=False)
@@ -41,6 +43,7 @@ def prune_tables(engine: sa.Engine) -> None:
     """
     Delete data from database tables.
     """
+    CrateDBVectorStore.clear_storage_cache()
     with engine.connect() as conn:
         with sa.orm.Session(conn) as session:
             mf = ModelFactory()
@@ -0,0 +1,99 @@
+import threading
+from typing import cast
+from unittest import mock
+
+import pytest
+import sqlalchemy as sa
+from langchain_core.documents import Document
+
+from langchain_cratedb import CrateDBVectorStore, RefreshPolicy
+from langchain_cratedb.refresh import Refresher
+from tests.feature.vectorstore.fake_embeddings import FakeEmbeddingsWithAdaDimension
+
+
+@pytest.mark.parametrize("policy", [RefreshPolicy.IMMEDIATE, RefreshPolicy.JOB])
+def test_vectorstore_refresh_policy(engine: sa.Engine, policy: RefreshPolicy) -> None:
+    """Verify data is visible after write operations, with those policies."""
+    docsearch = cast(
+        CrateDBVectorStore,
+        CrateDBVectorStore.from_texts(
+            texts=["foo", "bar", "baz"],
+            collection_name="test_collection",
+            embedding=FakeEmbeddingsWithAdaDimension(),
+            connection=engine,
+            pre_delete_collection=True,
+            refresh_policy=policy,
+        ),
+    )
+    output = docsearch.similarity_search("foo", k=1)
+    assert [doc.page_content for doc in output] == ["foo"]
+
+    ids = list(docsearch.add_documents_stream([Document(page_content="qux")]))
+    assert len(docsearch.get_by_ids(ids)) == 1
+
+
+def test_refresher_interval() -> None:
+    """Verify the `interval` policy refreshes each table at most once per interval."""
+    connection = mock.MagicMock()
+    refresher = Refresher(policy="interval", interval=60)
+    assert refresher.refresh(connection, "foo") is True
+    assert refresher.refresh(connection, "foo") is False
+    assert refresher.refresh(connection, "bar") is True
+    assert connection.execute.call_count == 2
+    # The skipped refresh is carried out at the end of the interval.
+    assert list(refresher._pending) == ["foo"]
+    refresher._pending.pop("foo").cancel()
+
+
+def test_refresher_interval_trailing() -> None:
+    """Verify a refresh skipped within the interval is carried out at its end."""
+    engine = sa.create_engine("sqlite://")
+    refreshed = threading.Event()
+    refresher = Refresher(policy="interval", interval=0.1)
+    with (
+        mock.patch(
+            "langchain_cratedb.refresh.refresh_table",
+            side_effect=lambda *args: refreshed.set(),
+        ) as refresh_table,
+        sa.orm.Session(engine) as session,
+    ):
+        assert refresher.refresh(session, "foo") is True
+        refreshed.clear()
+        assert refresher.refresh(session, "foo") is False
+        assert refresher.refresh(session, "foo") is False
+        assert refreshed.wait(timeout=10)
+        assert refresh_table.call_count == 2
+        assert refresh_table.call_args.args[1] == "foo"
+        assert refresher._pending == {}
+
+
+def test_refresher_never() -> None:
+    """Verify the `never` policy does not refresh at all."""
+    connection = mock.MagicMock()
+    refresher = Refresher(policy=RefreshPolicy.NEVER)
+    assert refresher.refresh(connection, "foo") is False
+    connection.execute.assert_not_called()
+
+
+def test_refresher_install_session() -> None:
+    """Verify DML hooks are installed per session, covering Core statements."""
+    engine = sa.create_engine("sqlite://")
+    metadata = sa.MetaData()
+    table = sa.Table("foo", metadata, sa.Column("id", sa.Integer, primary_key=True))
+    metadata.create_all(engine)
+    refresher = Refresher(policy=RefreshPolicy.IMMEDIATE)
+    with pytest.raises(TypeError):
+        refresher.install(engine)
+    with (
+        mock.patch("langchain_cratedb.refresh.refresh_table") as refresh_table,
+        sa.orm.Session(engine) as session,
+    ):
+        refresher.install(session)
+        refresher.install(session)
+        session.execute(sa.insert(table).values(id=1))
+        session.execute(sa.select(table))
+        refresh_table.assert_called_once_with(session, table)
+        # Other sessions using the same engine are not affected.
+        with sa.orm.Session(engine) as other:
+            other.execute(sa.insert(table).values(id=2))
+        refresh_table.assert_called_once()
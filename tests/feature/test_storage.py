@@ -0,0 +1,78 @@
+"""
+Test cases for the CrateDB-backed key-value store.
+"""
+
+import pytest
+import sqlalchemy as sa
+from langchain_classic.embeddings import CacheBackedEmbeddings
+
+from langchain_cratedb import CrateDBByteStore
+from tests.feature.vectorstore.fake_embeddings import (
+    ConsistentFakeEmbeddingsWithAdaDimension,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_database(engine: sa.Engine) -> None:
+    """
+    Provision database with table schema and data.
+    """
+    with engine.connect() as connection:
+        connection.execute(sa.text("DROP TABLE IF EXISTS test_bytestore;"))
+        connection.commit()
+
+
+@pytest.fixture()
+def store(engine: sa.Engine) -> CrateDBByteStore:
+    return CrateDBByteStore(engine, table_name="test_bytestore", batch_size=2)
+
+
+def test_bytestore_mget_missing_table(store: CrateDBByteStore) -> None:
+    """Verify reading from a store which has not been written to yet."""
+    assert store.mget(["foo"]) == [None]
+    assert list(store.yield_keys()) == []
+    store.mdelete(["foo"])
+
+
+def test_bytestore_mset_mget_mdelete(store: CrateDBByteStore) -> None:
+    """Verify values are written, read, and deleted in batches."""
+    store.mset([("foo", b"\x00\x01"), ("bar", b"bar"), ("baz", b"baz")])
+    assert store.mget(["foo", "qux", "baz", "bar"]) == [
+        b"\x00\x01",
+        None,
+        b"baz",
+        b"bar",
+    ]
+
+    store.mset([("foo", b"updated")])
+    assert store.mget(["foo"]) == [b"updated"]
+
+    store.mdelete(["foo", "bar"])
+    assert store.mget(["foo", "bar", "baz"]) == [None, None, b"baz"]
+
+
+def test_bytestore_namespace(engine: sa.Engine, store: CrateDBByteStore) -> None:
+    """Verify namespaces separate keys within the same table."""
+    other = CrateDBByteStore(engine, namespace="other", table_name="test_bytestore")
+    store.mset([("foo", b"foo")])
+    other.mset([("foo", b"other")])
+    assert store.mget(["foo"]) == [b"foo"]
+    assert other.mget(["foo"]) == [b"other"]
+
+
+def test_bytestore_yield_keys(store: CrateDBByteStore) -> None:
+    """Verify iterating keys, paginated, and filtered by prefix."""
+    store.mset([(key, b"") for key in ["a1", "b1", "b2", "b3", "c1"]])
+    assert list(store.yield_keys()) == ["a1", "b1", "b2", "b3", "c1"]
+    assert list(store.yield_keys(prefix="b")) == ["b1", "b2", "b3"]
+    assert list(store.yield_keys(prefix="d")) == []
+
+
+def test_bytestore_cache_backed_embeddings(store: CrateDBByteStore) -> None:
+    """Verify the store persists embeddings computed by `CacheBackedEmbeddings`."""
+    embeddings = CacheBackedEmbeddings.from_bytes_store(
+        ConsistentFakeEmbeddingsWithAdaDimension(), store, namespace="fake"
+    )
+    vectors = embeddings.embed_documents(["foo", "bar"])
+    assert len(list(store.yield_keys(prefix="fake"))) == 2
+    assert embeddings.embed_documents(["bar", "foo"]) == vectors[::-1]
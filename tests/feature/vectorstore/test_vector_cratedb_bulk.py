@@ -0,0 +1,120 @@
+"""
+Validate adaptive sizing of bulk requests.
+"""
+
+from typing import Any, Dict, List
+from unittest import mock
+
+import numpy as np
+import pytest
+import sqlalchemy as sa
+from crate.client.exceptions import ConnectionError as CrateConnectionError
+from crate.client.exceptions import ProgrammingError
+
+from langchain_cratedb.vectorstores import BatchSizer, CrateDBVectorStore
+from langchain_cratedb.vectorstores.bulk import (
+    BulkResult,
+    is_pushback,
+    is_rejected,
+    record_size,
+)
+from tests.feature.vectorstore.fake_embeddings import FakeEmbeddingsWithAdaDimension
+
+
+def make_records(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"id": str(i), "embedding": np.zeros(256, dtype=np.float32), "document": "foo"}
+        for i in range(count)
+    ]
+
+
+def test_batch_sizer_batches_by_bytes() -> None:
+    """Verify batches are formed by payload size, capped by number of records."""
+    records = make_records(10)
+    size = record_size(records[0])
+    sizer = BatchSizer(initial_bytes=3 * size, min_bytes=size)
+    assert [len(batch) for batch in sizer.batches(records)] == [3, 3, 3, 1]
+    assert [len(batch) for batch in sizer.batches(records, max_records=2)] == [2] * 5
+
+
+def test_batch_sizer_pushback() -> None:
+    """Verify rejected requests and records are submitted again, in smaller batches."""
+    records = make_records(8)
+    size = record_size(records[0])
+    sizer = BatchSizer(initial_bytes=8 * size, min_bytes=size, backoff=0)
+    submitted: List[List[str]] = []
+
+    def insert_bulk(connection: Any, statement: Any, batch: Any, key: str) -> Any:
+        ids = [record[key] for record in batch]
+        submitted.append(ids)
+        if len(submitted) == 1:
+            raise sa.exc.ProgrammingError(
+                "INSERT", {}, Exception("RejectedExecutionException")
+            )
+        if len(submitted) == 2:
+            return BulkResult(
+                succeeded=ids[1:], failed={ids[0]: "rejected execution of task"}
+            )
+        return BulkResult(succeeded=ids)
+
+    with mock.patch("langchain_cratedb.vectorstores.bulk.insert_bulk", insert_bulk):
+        result = sizer.insert(mock.Mock(), mock.Mock(), records)
+
+    # The whole batch is rejected, then a record of the smaller retry batch.
+    assert submitted[:3] == [[str(i) for i in range(8)], ["0", "1", "2", "3"], ["0"]]
+    assert sum(submitted[3:], []) == ["4", "5", "6", "7"]
+    assert all(len(batch) < 8 for batch in submitted[1:])
+    assert result.ok
+    assert sorted(result.succeeded) == [str(i) for i in range(8)]
+    assert sizer.rejections == 2
+    assert sizer.batch_bytes < 8 * size
+
+
+def test_batch_sizer_other_errors() -> None:
+    """Verify errors not caused by pushback are propagated."""
+    sizer = BatchSizer(backoff=0)
+    with mock.patch(
+        "langchain_cratedb.vectorstores.bulk.insert_bulk",
+        side_effect=ValueError("Something else"),
+    ):
+        with pytest.raises(ValueError):
+            sizer.insert(mock.Mock(), mock.Mock(), make_records(1))
+
+
+def test_is_pushback() -> None:
+    """Verify pushback is classified by HTTP status and exception names only."""
+    assert is_pushback(ProgrammingError("413 Client Error: Request Entity Too Large"))
+    assert is_pushback(ProgrammingError("429 Client Error: Too Many Requests"))
+    assert is_pushback(
+        CrateConnectionError("No more Servers available: Service Unavailable")
+    )
+    assert is_pushback(
+        sa.exc.ProgrammingError("INSERT", {}, Exception("CircuitBreakingException"))
+    )
+    assert not is_pushback(ProgrammingError("400 Client Error: Bad Request"))
+    assert not is_pushback(ProgrammingError("Document with id 4291 already exists"))
+    assert not is_pushback(ValueError("expected 503 dimensions, not 413"))
+    assert is_rejected("rejected execution of task")
+    assert not is_rejected("Value 503 is too large for column")
+    assert not is_rejected(None)
+
+
+def test_cratedb_add_embeddings_bulk_adaptive(engine: sa.Engine) -> None:
+    """Test adding embeddings using adaptively sized bulk requests."""
+    texts = [f"foo{i}" for i in range(10)]
+    sizer = BatchSizer(initial_bytes=64 * 1024, min_bytes=16 * 1024)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+        batch_sizer=sizer,
+    )
+    result = docsearch.add_embeddings_bulk(
+        texts=texts,
+        embeddings=FakeEmbeddingsWithAdaDimension().embed_documents(texts),
+        ids=[str(i) for i in range(10)],
+    )
+    assert result.ok
+    assert sizer.requests > 1
+    assert len(docsearch.get_by_ids(result.succeeded)) == 10
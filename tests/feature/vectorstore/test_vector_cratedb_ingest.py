@@ -0,0 +1,183 @@
+"""
+Validate the ingestion drivers for `CrateDBVectorStore`.
+"""
+
+import functools
+import time
+from pathlib import Path
+from typing import Callable, Generator, Optional
+from unittest import mock
+
+import pytest
+import sqlalchemy as sa
+from langchain_core.documents import Document
+
+from langchain_cratedb.vectorstores import (
+    BufferedWriter,
+    CrateDBVectorStore,
+    IngestJob,
+    ParallelIngester,
+    PipelinedIngester,
+    SearchResultCache,
+)
+from langchain_cratedb.vectorstores.bulk import BulkResult
+from tests.feature.vectorstore.fake_embeddings import FakeEmbeddingsWithAdaDimension
+from tests.settings import CONNECTION_STRING
+
+
+def generate_documents(
+    count: int, fail_at: Optional[int] = None
+) -> Generator[Document, None, None]:
+    for i in range(count):
+        if i == fail_at:
+            raise RuntimeError(f"Failed to read document {i}")
+        yield Document(id=str(i), page_content=f"foo{i}", metadata={"page": i})
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 30) -> None:
+    """Wait until the condition is met, failing after the timeout."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Condition not met within timeout")
+        time.sleep(0.01)
+
+
+def get_store(engine: sa.Engine) -> CrateDBVectorStore:
+    return CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+
+
+def test_pipelined_ingester(engine: sa.Engine) -> None:
+    """Verify the pipelined ingester writes all documents, in order."""
+    store = get_store(engine)
+    ingester = PipelinedIngester(
+        store, batch_size=3, embed_concurrency=2, write_concurrency=2
+    )
+    result = ingester.ingest(generate_documents(10))
+    assert result.ok
+    assert result.succeeded == [str(i) for i in range(10)]
+    assert len(store.get_by_ids(result.succeeded)) == 10
+
+
+def test_pipelined_ingester_refresh_failure() -> None:
+    """Verify a failing refresh does not hide the error which aborted the ingest."""
+    store = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+    ingester = PipelinedIngester(store, batch_size=3)
+    with (
+        mock.patch.object(store, "_prepare_storage"),
+        mock.patch.object(store, "_write_bulk", return_value=BulkResult()),
+        mock.patch.object(
+            store, "_refresh_written", side_effect=ConnectionError("refresh")
+        ),
+    ):
+        with pytest.raises(RuntimeError, match="Failed to read document 4"):
+            ingester.ingest(generate_documents(10, fail_at=4))
+        with pytest.raises(ConnectionError, match="refresh"):
+            ingester.ingest(generate_documents(4))
+
+
+def test_parallel_ingester(engine: sa.Engine) -> None:
+    """Verify the parallel ingester writes all documents, using worker processes."""
+    store_factory = functools.partial(
+        CrateDBVectorStore,
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=CONNECTION_STRING,
+        pre_delete_collection=True,
+    )
+    # Search results cached within this process are invalidated.
+    cache = SearchResultCache()
+    store = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        result_cache=cache,
+    )
+    ingester = ParallelIngester(store_factory, processes=2, batch_size=3, store=store)
+    result = ingester.ingest(generate_documents(10))
+    assert result.ok
+    assert cache.generation == 1
+    assert result.succeeded == [str(i) for i in range(10)]
+    with engine.connect() as connection:
+        count = connection.execute(
+            sa.text("SELECT COUNT(*) FROM langchain_embedding")
+        ).scalar()
+    assert count == 10
+
+
+def test_ingest_job_resume(engine: sa.Engine, tmp_path: Path) -> None:
+    """Verify an interrupted ingest job resumes after the last recorded window."""
+    journal = tmp_path / "ingest.jsonl"
+    store = get_store(engine)
+    with pytest.raises(RuntimeError):
+        IngestJob(store, journal, batch_size=3).run(generate_documents(10, fail_at=7))
+
+    with mock.patch.object(
+        store.embedding_function,
+        "embed_documents",
+        wraps=store.embedding_function.embed_documents,
+    ) as embed_documents:
+        result = IngestJob(store, journal, batch_size=3).run(generate_documents(10))
+    assert [call.args[0] for call in embed_documents.call_args_list] == [
+        ["foo6", "foo7", "foo8"],
+        ["foo9"],
+    ]
+    assert result.ok
+    assert result.succeeded == [str(i) for i in range(10)]
+    assert len(store.get_by_ids(result.succeeded)) == 10
+
+
+def test_ingest_job_refresh_failure(tmp_path: Path) -> None:
+    """Verify a failing refresh does not hide the error which stopped the job."""
+    store = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+    with (
+        mock.patch.object(store, "_prepare_storage"),
+        mock.patch.object(store, "_write_bulk", return_value=BulkResult()),
+        mock.patch.object(
+            store, "_refresh_written", side_effect=ConnectionError("refresh")
+        ),
+    ):
+        job = IngestJob(store, tmp_path / "ingest.jsonl", batch_size=3)
+        with pytest.raises(RuntimeError, match="Failed to read document 4"):
+            job.run(generate_documents(10, fail_at=4))
+        job = IngestJob(store, tmp_path / "ingest.jsonl", batch_size=3)
+        with pytest.raises(ConnectionError, match="refresh"):
+            job.run(generate_documents(10))
+
+
+def test_buffered_writer(engine: sa.Engine) -> None:
+    """Verify the buffered writer flushes on size, on delay, and when closing."""
+    store = get_store(engine)
+    with mock.patch.object(
+        store.embedding_function,
+        "embed_documents",
+        wraps=store.embedding_function.embed_documents,
+    ) as embed_documents:
+        with BufferedWriter(store, max_size=3, max_delay=0.2) as writer:
+            for i in range(4):
+                writer.add_texts([f"foo{i}"], ids=[str(i)])
+            assert embed_documents.call_count == 1
+            assert len(store.get_by_ids(["0", "1", "2"])) == 3
+
+            # The remaining document is flushed after the delay.
+            wait_for(lambda: "3" in writer.result.succeeded)
+            assert embed_documents.call_count == 2
+            assert len(store.get_by_ids(["3"])) == 1
+
+            writer.add_documents([Document(id="4", page_content="foo4")])
+        assert embed_documents.call_count == 3
+
+    assert writer.result.ok
+    assert writer.result.succeeded == [str(i) for i in range(5)]
+    assert len(store.get_by_ids(writer.result.succeeded)) == 5
@@ -3,16 +3,34 @@ Validate LangChain using CrateDB's `FLOAT_VECTOR` / `KNN_MATCH` functionality.
 """
 
 import contextlib
+import gzip
+from pathlib import Path
 from typing import Any, Dict, Generator, List, Optional, Sequence, cast
+from unittest import mock
 
+import numpy as np
+import orjson
 import pytest
 import sqlalchemy as sa
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from langchain_cratedb.vectorstores import (
     CrateDBVectorStore,
+    CrateDBVectorStoreMultiCollection,
+    FilterPlanner,
+    FusionMethod,
+    SearchCursor,
 )
+from langchain_cratedb.vectorstores.bulk import BulkResult
+from langchain_cratedb.vectorstores.hybrid import fuse_hits
+from langchain_cratedb.vectorstores.loader import copy_from, write_staging_files
+from langchain_cratedb.vectorstores.mmr import maximal_marginal_relevance
+from langchain_cratedb.vectorstores.model import ModelFactory
+from langchain_cratedb.vectorstores.planner import SearchPlan
+from langchain_cratedb.vectorstores.rerank import rerank, similarity_scores
 from tests.feature.vectorstore.fake_embeddings import (
     ADA_TOKEN_COUNT,
     ConsistentFakeEmbeddingsWithAdaDimension,
@@ -31,7 +49,7 @@ from tests.fixtures.metadata_filtering import (
     TYPE_5_FILTERING_TEST_CASES,
     TYPE_6_FILTERING_TEST_CASES,
 )
-from tests.settings import CONNECTION_STRING
+from tests.settings import CONNECTION_STRING, STAGING_DIR, STAGING_URI
 
 
 def _compare_documents(left: Sequence[Document], right: Sequence[Document]) -> None:
@@ -463,6 +481,22 @@ def test_cratedb_max_marginal_relevance_search(engine: sa.Engine) -> None:
     _compare_documents(output, [Document(page_content="foo")])
 
 
+def test_maximal_marginal_relevance_order() -> None:
+    """Verify candidates are returned in order of selection, not of retrieval."""
+    candidates = np.array([[1.0, 0.0], [1.0, 0.01], [0.6, 0.8]], dtype=np.float32)
+    query = [1.0, 0.0]
+    assert maximal_marginal_relevance(query, candidates, k=3, lambda_mult=0.3) == [
+        0,
+        2,
+        1,
+    ]
+    assert maximal_marginal_relevance(query, candidates, k=2, lambda_mult=1.0) == [
+        0,
+        1,
+    ]
+    assert maximal_marginal_relevance(query, candidates[:0], k=2) == []
+
+
 def test_cratedb_max_marginal_relevance_search_with_score(engine: sa.Engine) -> None:
     """Test max marginal relevance search with relevance scores."""
     texts = ["foo", "bar", "baz"]
@@ -621,3 +655,691 @@ def test_invalid_filters(cratedb: CrateDBVectorStore, invalid_filter: Any) -> No
     """Verify that invalid filters raise an error."""
     with pytest.raises(ValueError):
         cratedb._create_filter_clause(invalid_filter)
+
+
+def test_cratedb_add_embeddings_bulk(engine: sa.Engine) -> None:
+    """Verify bulk ingestion, and that outcomes are reported per record."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(texts)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    result = docsearch.add_embeddings_bulk(
+        texts=texts, embeddings=embeddings, ids=["1", "2", "3"], batch_size=2
+    )
+    assert result.ok
+    assert result.succeeded == ["1", "2", "3"]
+    output = docsearch.similarity_search("foo", k=1)
+    prune_document_ids(output)
+    _compare_documents(output, [Document(page_content="foo")])
+
+
+def test_cratedb_add_embeddings_bulk_partial_failure(engine: sa.Engine) -> None:
+    """Verify a failing record does not fail the whole bulk operation."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(texts)
+    # Vector with invalid dimensionality.
+    embeddings[1] = [1.0, 2.0, 3.0]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    result = docsearch.add_embeddings_bulk(
+        texts=texts, embeddings=embeddings, ids=["1", "2", "3"]
+    )
+    assert not result.ok
+    assert result.succeeded == ["1", "3"]
+    assert list(result.failed.keys()) == ["2"]
+    assert {doc.id for doc in docsearch.get_by_ids(["1", "2", "3"])} == {"1", "3"}
+
+
+def test_make_records_lengths() -> None:
+    """Verify records are not produced when numbers of items differ."""
+    texts = ["foo", "bar"]
+    embeddings = [[1.0, 2.0], [3.0, 4.0]]
+    records = CrateDBVectorStore._make_records(
+        "uuid", texts, embeddings, None, ["1", "2"]
+    )
+    assert [record["id"] for record in records] == ["1", "2"]
+    with pytest.raises(ValueError, match="Number of items differs"):
+        CrateDBVectorStore._make_records(
+            "uuid", texts, embeddings[:1], None, ["1", "2"]
+        )
+    with pytest.raises(ValueError, match="Number of items differs"):
+        CrateDBVectorStore._make_records("uuid", texts, embeddings, [{}], ["1", "2"])
+
+
+def test_cratedb_add_documents_stream(engine: sa.Engine) -> None:
+    """Verify streaming ingestion consumes generators in windows."""
+
+    def generate() -> Generator[Document, None, None]:
+        for i in range(7):
+            yield Document(id=str(i), page_content=f"foo{i}", metadata={"page": i})
+
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    ids = list(docsearch.add_documents_stream(generate(), batch_size=3))
+    assert ids == [str(i) for i in range(7)]
+    assert len(docsearch.get_by_ids(ids)) == 7
+
+
+def test_cratedb_add_documents_stream_partial_failure(engine: sa.Engine) -> None:
+    """Verify ids of written documents are yielded, before reporting failures."""
+    documents = [Document(id=str(i), page_content=f"foo{i}") for i in range(3)]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    ids: List[str] = []
+    with mock.patch.object(
+        CrateDBVectorStore,
+        "_write_bulk",
+        return_value=BulkResult(succeeded=["0", "2"], failed={"1": "foo"}),
+    ):
+        with pytest.raises(RuntimeError, match="Failed to write documents"):
+            ids.extend(docsearch.add_documents_stream(documents))
+    assert ids == ["0", "2"]
+
+
+def test_add_documents_stream_refresh_failure() -> None:
+    """Verify a failing refresh does not hide the error which aborted the stream."""
+    documents = [Document(id=str(i), page_content=f"foo{i}") for i in range(3)]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+    with (
+        mock.patch.object(docsearch, "_prepare_storage"),
+        mock.patch.object(docsearch, "_get_collection_id", return_value="foo"),
+        mock.patch.object(
+            docsearch, "_refresh_written", side_effect=ConnectionError("refresh")
+        ),
+    ):
+        with mock.patch.object(
+            docsearch,
+            "_write_bulk",
+            return_value=BulkResult(succeeded=["0", "2"], failed={"1": "foo"}),
+        ):
+            with pytest.raises(RuntimeError, match="Failed to write documents"):
+                list(docsearch.add_documents_stream(documents))
+        with mock.patch.object(
+            docsearch,
+            "_write_bulk",
+            return_value=BulkResult(succeeded=["0", "1", "2"]),
+        ):
+            with pytest.raises(ConnectionError, match="refresh"):
+                list(docsearch.add_documents_stream(documents))
+
+
+def test_cratedb_storage_verified_once(engine: sa.Engine) -> None:
+    """Verify storage is only bootstrapped once per database and collection."""
+    docsearch = CrateDBVectorStore.from_texts(
+        texts=["foo"],
+        collection_name="test_collection",
+        embedding=FakeEmbeddingsWithAdaDimension(),
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    other = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+    )
+    with (
+        mock.patch.object(
+            CrateDBVectorStore,
+            "create_collection",
+            autospec=True,
+            side_effect=CrateDBVectorStore.create_collection,
+        ) as create_collection,
+        mock.patch.object(
+            CrateDBVectorStore,
+            "get_collection",
+            autospec=True,
+            side_effect=CrateDBVectorStore.get_collection,
+        ) as get_collection,
+    ):
+        # Neither the storage nor the collection need to be looked up again.
+        other.add_texts(["bar"])
+        other.add_embeddings_bulk(["qux"], [[1.0] * ADA_TOKEN_COUNT])
+        create_collection.assert_not_called()
+        get_collection.assert_not_called()
+
+        # After dropping the collection, storage needs to be bootstrapped again.
+        docsearch.delete_collection()
+        other.invalidate_storage()
+        other.add_texts(["baz"])
+        create_collection.assert_called_once()
+
+
+def test_cratedb_add_texts_skip_unchanged(engine: sa.Engine) -> None:
+    """Verify unchanged texts are neither embedded nor written again."""
+    texts = ["foo", "bar", "baz"]
+    metadatas = [{"page": str(i)} for i in range(len(texts))]
+    docsearch = CrateDBVectorStore.from_texts(
+        texts=texts,
+        metadatas=metadatas,
+        ids=["1", "2", "3"],
+        collection_name="test_collection",
+        embedding=FakeEmbeddingsWithAdaDimension(),
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    other = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+    )
+    with mock.patch.object(
+        other.embedding_function,
+        "embed_documents",
+        wraps=other.embedding_function.embed_documents,
+    ) as embed_documents:
+        # Changed metadata of "2", changed text of "3", and a new text.
+        ids = other.add_texts(
+            ["foo", "bar", "qux", "quux"],
+            metadatas=[{"page": "0"}, {"page": "changed"}, {"page": "2"}, {}],
+            ids=["1", "2", "3", "4"],
+            skip_unchanged=True,
+        )
+        assert ids == ["1", "2", "3", "4"]
+        embed_documents.assert_called_once_with(["bar", "qux", "quux"])
+
+        # Without ids, texts are matched by their content within the collection.
+        embed_documents.reset_mock()
+        ids = other.add_texts(
+            ["foo", "corge"], metadatas=[{"page": "0"}, {}], skip_unchanged=True
+        )
+        assert ids[0] == "1"
+        embed_documents.assert_called_once_with(["corge"])
+
+    output = sorted(docsearch.get_by_ids(["2", "3"]), key=lambda doc: str(doc.id))
+    assert [doc.page_content for doc in output] == ["bar", "qux"]
+    assert output[0].metadata == {"page": "changed"}
+
+
+@pytest.mark.skipif(STAGING_DIR is None, reason="Requires a shared staging directory")
+def test_cratedb_add_embeddings_copy(engine: sa.Engine) -> None:
+    """Test adding embeddings using `COPY FROM`."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(texts)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    result = docsearch.add_embeddings_copy(
+        texts=texts,
+        embeddings=embeddings,
+        metadatas=[{"page": str(i)} for i in range(len(texts))],
+        ids=["1", "2", "3"],
+        staging_dir=cast(str, STAGING_DIR),
+        server_uri=STAGING_URI,
+        records_per_file=2,
+    )
+    assert result.ok
+    assert result.succeeded == ["1", "2", "3"]
+    output = docsearch.similarity_search("foo", k=1)
+    assert output == [Document(id="1", page_content="foo", metadata={"page": "0"})]
+
+
+def test_copy_from_staging(tmp_path: Path) -> None:
+    """Verify records are staged file by file, and files are removed on errors."""
+    records = [{"id": str(i), "document": f"foo{i}"} for i in range(5)]
+    files = write_staging_files(tmp_path, "foo", iter(records), records_per_file=2)
+    assert files == {
+        "foo-00000.json.gz": ["0", "1"],
+        "foo-00001.json.gz": ["2", "3"],
+        "foo-00002.json.gz": ["4"],
+    }
+    with gzip.open(tmp_path / "foo-00001.json.gz") as f:
+        assert [orjson.loads(line) for line in f] == records[2:4]
+
+    def fail() -> Generator[Dict[str, Any], None, None]:
+        yield from records
+        raise RuntimeError("Failed to read records")
+
+    connection = mock.Mock()
+    staging_dir = tmp_path / "staging"
+    with pytest.raises(RuntimeError, match="Failed to read records"):
+        copy_from(
+            connection,
+            ModelFactory(dimensions=3).EmbeddingStore.__table__,
+            fail(),
+            staging_dir=staging_dir,
+            records_per_file=2,
+        )
+    connection.execute.assert_not_called()
+    assert list(staging_dir.iterdir()) == []
+
+
+def test_cratedb_add_embeddings_numpy(engine: sa.Engine) -> None:
+    """Test adding and searching embeddings using `float32` NumPy arrays."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = np.array(
+        FakeEmbeddingsWithAdaDimension().embed_documents(texts), dtype=np.float32
+    )
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_embeddings(texts=texts[:2], embeddings=embeddings[:2], ids=["1", "2"])
+    result = docsearch.add_embeddings_bulk(
+        texts=texts[2:], embeddings=embeddings[2:], ids=["3"]
+    )
+    assert result.ok
+    output = docsearch.similarity_search_by_vector(embeddings[2], k=1)  # type: ignore[arg-type]
+    assert output == [Document(id="3", page_content="baz")]
+    assert docsearch.get_by_ids(["1"]) == [Document(id="1", page_content="foo")]
+
+
+def test_cratedb_similarity_search_by_vectors(engine: sa.Engine) -> None:
+    """Test running multiple similarity searches using a single query."""
+    texts = ["foo", "bar", "baz"]
+    metadatas = [{"page": str(i)} for i in range(len(texts))]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection_filter",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_texts(texts=texts, metadatas=metadatas, ids=["1", "2", "3"])
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(["foo", "baz"])
+    output = docsearch.similarity_search_with_score_by_vectors(
+        embeddings, k=[1, 2], filter=[None, {"page": "2"}]
+    )
+    assert output == [
+        docsearch.similarity_search_with_score_by_vector(embeddings[0], k=1),
+        docsearch.similarity_search_with_score_by_vector(
+            embeddings[1], k=2, filter={"page": "2"}
+        ),
+    ]
+    assert docsearch.similarity_search_by_vectors(embeddings, k=1) == [
+        [Document(id="1", page_content="foo", metadata={"page": "0"})],
+        [Document(id="3", page_content="baz", metadata={"page": "2"})],
+    ]
+    assert docsearch.similarity_search_by_vectors([]) == []
+    with pytest.raises(ValueError, match="must match the number of query vectors"):
+        docsearch.similarity_search_by_vectors(embeddings, k=[1])
+
+
+def test_cratedb_collection_cache(engine: sa.Engine) -> None:
+    """Test searching with a single statement, using cached collection UUIDs."""
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_texts(texts=["foo", "bar", "baz"], ids=["1", "2", "3"])
+    docsearch.similarity_search("foo", k=1)
+
+    statements: List[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    sa.event.listen(engine, "before_cursor_execute", record)
+    try:
+        output = docsearch.similarity_search("foo", k=1)
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", record)
+    assert output == [Document(id="1", page_content="foo")]
+    assert len(statements) == 1
+    assert "langchain_collection" not in statements[0]
+
+    # Deleting the collection forgets about its UUID.
+    docsearch.delete_collection()
+    with pytest.raises(ValueError, match="Collection not found"):
+        docsearch.similarity_search("foo", k=1)
+
+
+def test_cratedb_search_statement_cached(engine: sa.Engine) -> None:
+    """Test searches with different vectors and `k` reuse the compiled statement."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(texts)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_embeddings(texts=texts, embeddings=embeddings, ids=["1", "2", "3"])
+    docsearch.similarity_search_by_vector(embeddings[0], k=1, filter={"page": "0"})
+
+    cache_stats: List[CacheStats] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        cache_stats.append(args[1].cache_hit)
+
+    sa.event.listen(engine, "before_cursor_execute", record)
+    try:
+        output = docsearch.similarity_search_by_vector(embeddings[2], k=2)
+        docsearch.similarity_search_by_vector(embeddings[1], k=3)
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", record)
+    assert output == [
+        Document(id="3", page_content="baz"),
+        Document(id="2", page_content="bar"),
+    ]
+    assert cache_stats == [CacheStats.CACHE_MISS, CacheStats.CACHE_HIT]
+
+
+def test_cratedb_search_projection(engine: sa.Engine) -> None:
+    """Test embeddings are only retrieved by searches when needed."""
+    texts = ["foo", "bar", "baz"]
+    embeddings = FakeEmbeddingsWithAdaDimension().embed_documents(texts)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_embeddings(texts=texts, embeddings=embeddings, ids=["1", "2", "3"])
+    collection_uuids = docsearch._get_collection_uuids()
+    statement = docsearch._make_query_statement(collection_uuids, embeddings[0])
+    assert list(statement.selected_columns.keys()) == [
+        "id",
+        "document",
+        "cmetadata",
+        "similarity",
+    ]
+    statement = docsearch._make_query_statement(
+        collection_uuids, embeddings[0], include_embeddings=True
+    )
+    assert "embedding" in statement.selected_columns
+
+    output = docsearch.similarity_search_with_score_by_vector(
+        embeddings[0], k=1, include_embeddings=True
+    )
+    assert output[0][0].metadata["embedding"] == pytest.approx(embeddings[0])
+    assert docsearch.max_marginal_relevance_search_by_vector(embeddings[0], k=1) == [
+        Document(id="1", page_content="foo")
+    ]
+
+
+def test_cratedb_yield_pages(engine: sa.Engine) -> None:
+    """Test yielding search results and documents page by page."""
+    texts = ["foo", "bar", "baz", "qux", "quux"]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    ids = [str(i) for i in range(len(texts))]
+    docsearch.add_texts(texts=texts, ids=ids)
+    assert list(docsearch.yield_similarity_search("foo", k=4, page_size=3)) == (
+        docsearch.similarity_search("foo", k=4)
+    )
+    assert [doc.id for doc in docsearch.yield_documents(page_size=2)] == ids
+    output = docsearch.yield_by_ids(iter(["4", "1", "9"]), page_size=2)
+    assert sorted(doc.id for doc in output) == ["1", "4"]  # type: ignore[type-var]
+
+
+def test_cratedb_similarity_search_page(engine: sa.Engine) -> None:
+    """Test retrieving successive pages of search results using cursors."""
+    texts = ["foo", "bar", "baz", "qux", "quux"]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_texts(texts=texts, ids=[str(i) for i in range(len(texts))])
+    expected = docsearch.similarity_search_with_score("foo", k=5)
+
+    page = docsearch.similarity_search_page("foo", page_size=2)
+    assert page.results == expected[:2]
+    assert page.cursor is not None
+    cursor = SearchCursor.from_token(page.cursor.to_token())
+    assert cursor == page.cursor
+    page = docsearch.similarity_search_page("foo", page_size=2, cursor=cursor)
+    assert page.results == expected[2:4]
+    assert page.cursor is not None
+    page = docsearch.similarity_search_page("foo", page_size=2, cursor=page.cursor)
+    assert page.results == expected[4:]
+    assert page.cursor is None
+
+    with pytest.raises(ValueError, match="Invalid search cursor"):
+        SearchCursor.from_token("foo")
+
+
+def test_rerank_similarity_scores() -> None:
+    """Verify exact scores and rankings of candidates, per similarity metric."""
+    candidates = np.array([[3.0, 0.0], [1.0, 1.0], [0.9, 0.0]], dtype=np.float32)
+    query = [1.0, 0.0]
+    assert similarity_scores(query, candidates, "l2") == pytest.approx(
+        [1 / 5, 1 / 2, 1 / 1.01]
+    )
+    assert rerank(query, candidates, 2, "l2") == [
+        (2, pytest.approx(1 / 1.01)),
+        (1, 0.5),
+    ]
+    assert [i for i, _ in rerank(query, candidates, 3, "cosine")] == [0, 2, 1]
+    assert [i for i, _ in rerank(query, candidates, 2, "inner")] == [0, 1]
+
+
+def test_cratedb_similarity_search_oversample(engine: sa.Engine) -> None:
+    """Test searching using oversampled candidates, re-ranked exactly."""
+    texts = ["foo", "bar", "baz"]
+    docsearch = CrateDBVectorStore(
+        embeddings=ConsistentFakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_texts(texts=texts, ids=["1", "2", "3"])
+    embedding = docsearch.embeddings.embed_query("foo")
+    output = docsearch.similarity_search_with_score_by_vector(
+        embedding, k=1, oversample=3
+    )
+    assert output == docsearch.similarity_search_with_score_by_vector(embedding, k=1)
+    output = docsearch.similarity_search_with_score_by_vector(
+        embedding, k=2, oversample=1.5, distance_strategy="cosine"
+    )
+    assert [document.id for document, _ in output][0] == "1"
+    assert output[0][1] == pytest.approx(1.0)
+    with pytest.raises(ValueError, match="Oversampling factor must be at least 1"):
+        docsearch.similarity_search_with_score_by_vector(embedding, oversample=0.5)
+
+
+def test_cratedb_async_engine_rejected() -> None:
+    """Verify async engines are rejected, lacking an async dialect for CrateDB."""
+    with pytest.raises(NotImplementedError, match="do not support async engines"):
+        CrateDBVectorStore(
+            embeddings=FakeEmbeddingsWithAdaDimension(),
+            connection=mock.Mock(spec=AsyncEngine),
+        )
+    with pytest.raises(NotImplementedError, match="do not support async engines"):
+        CrateDBVectorStoreMultiCollection(
+            embeddings=FakeEmbeddingsWithAdaDimension(),
+            connection=CONNECTION_STRING,
+            async_mode=True,
+        )
+
+
+def test_similarity_search_forwards_options() -> None:
+    """Verify all search methods forward the options of the vector search."""
+    docsearch = CrateDBVectorStore(
+        embeddings=ConsistentFakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+    options: Dict[str, Any] = {
+        "include_embeddings": True,
+        "oversample": 3.0,
+        "distance_strategy": "cosine",
+    }
+    embedding = docsearch.embeddings.embed_query("foo")
+    output = [(Document(id="1", page_content="foo"), 1.0)]
+    with mock.patch.object(
+        CrateDBVectorStore,
+        "similarity_search_with_score_by_vector",
+        return_value=output,
+    ) as search:
+        assert docsearch.similarity_search("foo", k=2, **options) == [output[0][0]]
+        assert docsearch.similarity_search_with_score("foo", k=2, **options) == output
+        docsearch.similarity_search_by_vector(embedding, k=2, **options)
+    assert search.call_count == 3
+    for call in search.call_args_list:
+        assert call == mock.call(embedding, k=2, filter=None, **options)
+
+
+def test_filter_planner_plans() -> None:
+    """Verify searches are planned by the selectivity of filters."""
+    planner = FilterPlanner(exact_threshold=100, max_candidates=5000)
+    assert planner.plan(k=10, limit=10, matching=100, total=10_000).exact
+    plan = planner.plan(k=10, limit=10, matching=1000, total=100_000)
+    assert plan == SearchPlan(exact=False, candidates=2000)
+    plan = planner.deepen(plan, limit=10, found=4, matching=1000, total=100_000)  # type: ignore[assignment]
+    assert plan == SearchPlan(exact=False, candidates=5000, round=2)
+    assert planner.deepen(plan, limit=10, found=4, matching=1000, total=100_000) is None
+    assert (
+        planner.deepen(plan, limit=10, found=10, matching=1000, total=100_000) is None
+    )
+
+
+def test_cratedb_similarity_search_filter_planner(engine: sa.Engine) -> None:
+    """Test filtered searches planned by the selectivity of the filter."""
+    texts = [f"foo{i}" for i in range(20)]
+    metadatas = [{"page": str(i % 10)} for i in range(len(texts))]
+    planner = FilterPlanner(exact_threshold=2)
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+        filter_planner=planner,
+    )
+    docsearch.add_texts(texts=texts, metadatas=metadatas)
+    # Two records match, which are scored exactly.
+    output = docsearch.similarity_search("foo", k=5, filter={"page": "3"})
+    assert sorted(doc.page_content for doc in output) == ["foo13", "foo3"]
+    collection_uuids = docsearch._get_collection_uuids()
+    key = docsearch._statistics_key(collection_uuids, {"page": "3"})
+    assert planner.get_statistics(key) == (2, 20)
+    # Two records match, out of enlarged nearest neighbour candidates.
+    output = docsearch.similarity_search(
+        "foo", k=5, filter={"page": {"$in": ["1", "2"]}}
+    )
+    assert len(output) == 4
+
+
+def test_hybrid_fusion_statement() -> None:
+    """Verify hits are fused within a single statement, using a fulltext index."""
+    dialect = sa.create_engine(CONNECTION_STRING).dialect
+    table = ModelFactory(dimensions=3).EmbeddingStore.__table__
+    assert "INDEX document_ft USING FULLTEXT (document)" in str(
+        sa.schema.CreateTable(table).compile(dialect=dialect)
+    )
+
+    hits = sa.table("hits", sa.column("id"), sa.column("score"))
+    vector_hits = sa.select(hits).subquery("vector_hits")
+    text_hits = sa.select(hits).subquery("text_hits")
+    sql = str(fuse_hits(vector_hits, text_hits, k=4).compile(dialect=dialect))
+    assert "UNION ALL" in sql
+    assert "row_number() OVER (ORDER BY vector_hits.score DESC)" in sql
+    sql = str(
+        fuse_hits(vector_hits, text_hits, k=4, fusion="weighted").compile(
+            dialect=dialect
+        )
+    )
+    assert "max(text_hits.score) OVER ()" in sql
+    with pytest.raises(ValueError):
+        fuse_hits(vector_hits, text_hits, k=4, fusion="foo")
+    with pytest.raises(ValueError):
+        fuse_hits(vector_hits, text_hits, k=4, alpha=1.5)
+
+
+def test_hybrid_fusion_zero_scores() -> None:
+    """Verify weighted fusion of a search whose best score is zero."""
+    engine = sa.create_engine("sqlite://")
+
+    def hits(name: str, scores: Dict[str, float]) -> sa.Subquery:
+        return sa.union_all(
+            *[
+                sa.select(sa.literal(id_).label("id"), sa.literal(score).label("score"))
+                for id_, score in scores.items()
+            ]
+        ).subquery(name)
+
+    statement = fuse_hits(
+        hits("vector_hits", {"1": 0.5, "2": 0.25}),
+        hits("text_hits", {"2": 0.0, "3": 0.0}),
+        k=3,
+        fusion="weighted",
+    )
+    with engine.connect() as connection:
+        results = connection.execute(statement).all()
+    assert [(row.id, row.similarity) for row in results] == [
+        ("1", 0.5),
+        ("2", 0.25),
+        ("3", 0.0),
+    ]
+
+
+def test_cratedb_hybrid_search(engine: sa.Engine) -> None:
+    """Test hybrid search, combining fulltext and vector search."""
+    texts = ["foo", "bar", "baz"]
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+    )
+    docsearch.add_texts(
+        texts=texts, metadatas=[{"page": str(i)} for i in range(len(texts))]
+    )
+    # The query embedding is nearest to "foo", but the text matches "bar".
+    output = docsearch.hybrid_search("bar", k=2)
+    prune_document_ids(output)
+    assert output == [
+        Document(page_content="bar", metadata={"page": "1"}),
+        Document(page_content="foo", metadata={"page": "0"}),
+    ]
+    output = docsearch.hybrid_search("bar", k=1, alpha=1.0)
+    assert [doc.page_content for doc in output] == ["foo"]
+    output_with_scores = docsearch.hybrid_search_with_score(
+        "bar", k=1, fusion=FusionMethod.WEIGHTED, filter={"page": "2"}
+    )
+    assert [doc.page_content for doc, _ in output_with_scores] == ["baz"]
+
+
+def test_hybrid_search_without_fulltext_index() -> None:
+    """Verify searching tables without fulltext index reports it clearly."""
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+
+    def search(message: str) -> None:
+        error = sa.exc.ProgrammingError("SELECT", {}, Exception(message))
+        session = mock.Mock(**{"execute.side_effect": error})
+        with (
+            mock.patch.object(docsearch, "_get_collection_uuids", return_value=[]),
+            mock.patch.object(
+                docsearch,
+                "_make_sync_session",
+                return_value=contextlib.nullcontext(session),
+            ),
+        ):
+            docsearch.hybrid_search("foo")
+
+    with pytest.raises(ValueError, match="Re-create the table"):
+        search("ColumnUnknownException[Column document_ft unknown]")
+    with pytest.raises(sa.exc.ProgrammingError, match="SQLParseException"):
+        search("SQLParseException[line 1:1: mismatched input]")
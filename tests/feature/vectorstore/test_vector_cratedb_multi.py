@@ -10,6 +10,7 @@ from tests.feature.vectorstore.fake_embeddings import (
     FakeEmbeddingsWithAdaDimension,
 )
 from tests.feature.vectorstore.util import prune_document_ids
+from tests.settings import CONNECTION_STRING
 
 
 @pytest.mark.flaky(reruns=5)
@@ -82,6 +83,25 @@ def test_cratedb_multicollection_fail_indexing_not_permitted(engine: sa.Engine)
     )
 
 
+def test_cratedb_multicollection_add_not_permitted() -> None:
+    """
+    Inherited methods adding documents fail with the same error.
+    """
+    multisearch = CrateDBVectorStoreMultiCollection(
+        collection_names=["test_collection"],
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        connection=CONNECTION_STRING,
+    )
+    assert multisearch.batch_sizer is None
+    message = "can not be used for _indexing_ documents"
+    with pytest.raises(NotImplementedError, match=message):
+        multisearch.add_texts(["foo"])
+    with pytest.raises(NotImplementedError, match=message):
+        multisearch.add_embeddings_bulk(["foo"], [[1.0] * 1536])
+    with pytest.raises(NotImplementedError, match=message):
+        list(multisearch.add_documents_stream([Document(page_content="foo")]))
+
+
 def test_cratedb_multicollection_search_table_does_not_exist(engine: sa.Engine) -> None:
     """
     `CrateDBVectorStoreMultiCollection` will fail when the `collection`
@@ -0,0 +1,100 @@
+"""
+Validate caching results of vector searches.
+"""
+
+from typing import Any, List
+from unittest import mock
+
+import sqlalchemy as sa
+from langchain_core.documents import Document
+
+from langchain_cratedb.vectorstores import CrateDBVectorStore, SearchResultCache
+from tests.feature.vectorstore.fake_embeddings import FakeEmbeddingsWithAdaDimension
+
+
+def test_result_cache_keys() -> None:
+    """Verify keys tolerate floating point noise, and results are evicted."""
+    cache = SearchResultCache(maxsize=2)
+    results = [(Document(id="1", page_content="foo"), 1.0)]
+    key = cache.make_key(["foo"], [0.1, -0.0, 0.3], 4, {"a": 1, "b": 2})
+    assert key == cache.make_key(["foo"], [0.1000001, 0.0, 0.3], 4, {"b": 2, "a": 1})
+    assert key != cache.make_key(["foo"], [0.1, 0.0, 0.3], 5, {"a": 1, "b": 2})
+
+    assert cache.get(key) is None
+    cache.put(key, results)
+    cached = cache.get(key)
+    assert cached == results
+    # Modifying returned documents does not modify cached ones.
+    cached[0][0].metadata["foo"] = "bar"  # type: ignore[index]
+    assert cache.get(key) == results
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.put(cache.make_key(["bar"], [0.2], 4), results)
+    cache.put(cache.make_key(["bar"], [0.3], 4), results)
+    assert len(cache) == 2
+    assert cache.get(key) is None
+    assert cache.invalidate(["bar"]) == 2
+    assert len(cache) == 0
+
+
+def test_result_cache_generation() -> None:
+    """Verify stale results are not stored, and per-entry expiry."""
+    cache = SearchResultCache(ttl=10)
+    results = [(Document(id="1", page_content="foo"), 1.0)]
+    key = cache.make_key(["foo"], [0.1], 4)
+
+    # Results of a search which started before invalidating are not stored.
+    generation = cache.generation
+    cache.invalidate(["foo"])
+    cache.put(key, results, generation=generation)
+    assert cache.get(key) is None
+    cache.put(key, results, generation=cache.generation)
+    assert cache.get(key) == results
+    cache.clear()
+    assert cache.generation == generation + 2
+
+    # Results are not stored with a zero ttl, and the cache's ttl caps others.
+    cache.put(key, results, ttl=0)
+    assert len(cache) == 0
+    with mock.patch("time.monotonic", return_value=100.0):
+        cache.put(key, results, ttl=60)
+    with mock.patch("time.monotonic", return_value=109.0):
+        assert cache.get(key) == results
+    with mock.patch("time.monotonic", return_value=110.0):
+        assert cache.get(key) is None
+
+
+def test_cratedb_result_cache(engine: sa.Engine) -> None:
+    """Test repeated searches are answered from the cache, until writing."""
+    cache = SearchResultCache()
+    docsearch = CrateDBVectorStore(
+        embeddings=FakeEmbeddingsWithAdaDimension(),
+        collection_name="test_collection",
+        connection=engine,
+        pre_delete_collection=True,
+        result_cache=cache,
+    )
+    docsearch.add_texts(texts=["foo", "bar"], ids=["1", "2"])
+
+    statements: List[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    sa.event.listen(engine, "before_cursor_execute", record)
+    try:
+        output = docsearch.similarity_search("foo", k=1)
+        statements.clear()
+        assert docsearch.similarity_search("foo", k=1) == output
+        assert statements == []
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # Writing into the collection invalidates its results.
+        docsearch.delete(["1"], collection_only=True)
+        statements.clear()
+        assert docsearch.similarity_search("foo", k=1) == [
+            Document(id="2", page_content="bar")
+        ]
+        assert any("vector_similarity" in statement for statement in statements)
+    finally:
+        sa.event.remove(engine, "before_cursor_execute", record)
@@ -6,6 +6,7 @@ from langchain_core.documents import Document
 from langchain_cratedb.vectorstores.model import (
     COLLECTION_TABLE_NAME,
     EMBEDDING_TABLE_NAME,
+    FULLTEXT_INDEX_NAME,
 )
 
 
@@ -34,7 +35,8 @@ def ensure_collection(session: sa.orm.Session, name: str) -> None:
                 collection_id TEXT,
                 embedding FLOAT_VECTOR(123),
                 document TEXT,
-                cmetadata OBJECT
+                cmetadata OBJECT,
+                INDEX {FULLTEXT_INDEX_NAME} USING FULLTEXT (document)
             );
             """
         )
@@ -12,3 +12,8 @@ CONNECTION_STRING = CrateDBVectorStore.connection_string_from_db_params(
     user=os.environ.get("TEST_CRATEDB_USER", "crate"),
     password=os.environ.get("TEST_CRATEDB_PASSWORD", ""),
 )
+
+# Local directory which is readable by the CrateDB cluster, for testing `COPY FROM`,
+# and the URI under which the cluster can read it.
+STAGING_DIR = os.environ.get("TEST_CRATEDB_STAGING_DIR")
+STAGING_URI = os.environ.get("TEST_CRATEDB_STAGING_URI")